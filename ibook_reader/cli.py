@@ -6,7 +6,7 @@ import subprocess
 import shutil
 import signal
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Tuple
 
 from .config import Config
 from .services.auth_service import AuthService
@@ -16,6 +16,10 @@ from .parsers.factory import ParserFactory
 # 忽略 SIGPIPE 信号，避免管道关闭时的错误
 signal.signal(signal.SIGPIPE, signal.SIG_DFL)
 
+# 阅读时分页器的内存预算（字节）：后台排版会依次为每章计算断行标记和宽度索引，
+# 超出预算时淘汰其他章节的这些缓存，避免整本书的缓存一直留在内存中
+LAYOUT_MEMORY_BUDGET = 64 * 1024 * 1024
+
 
 def main():
     """主入口函数"""
@@ -204,8 +208,13 @@ def start_reader(file_path: Path, jump_options: dict = None) -> int:
         saved_progress = progress_service.load_progress(file_path)
 
         if saved_progress and saved_progress.current_page > 1:
-            # 有保存的进度，加载完整文档但从上次位置开始
-            return output_full_document_with_resume(document, file_path, saved_progress.current_page)
+            # 有保存的进度，加载完整文档但从上次位置开始（优先按章内字符偏移定位）
+            start_position = None
+            if saved_progress.chapter_offset is not None:
+                start_position = (saved_progress.current_chapter, saved_progress.chapter_offset)
+            return output_full_document_with_resume(
+                document, file_path, saved_progress.current_page, start_position=start_position
+            )
         else:
             # 没有进度或从第一页开始，输出全部内容
             return output_full_document(document, file_path)
@@ -224,108 +233,173 @@ def output_full_document(document, file_path: Path = None) -> int:
     return output_full_document_with_resume(document, file_path, start_page=1)
 
 
-def output_full_document_with_resume(document, file_path: Path, start_page: int = 1) -> int:
+def _get_cache_file_hash(file_path: Path) -> Optional[str]:
+    """计算页表缓存使用的文件指纹，加载与保存缓存共用
+
+    只读取文件首尾各一块（见 get_file_fingerprint），显示第一屏前不必读完整本书
+
+    Args:
+        file_path: 文件路径
+
+    Returns:
+        文件指纹，无文件或读取失败时返回None
+    """
+    if not file_path:
+        return None
+    try:
+        from .utils.file_utils import get_file_fingerprint
+        return get_file_fingerprint(file_path)
+    except Exception:
+        return None
+
+
+def _load_layout_cache(paginator, file_path: Path, file_hash: Optional[str]) -> bool:
+    """从磁盘缓存加载页表，命中时分页器跳过排版
+
+    Args:
+        paginator: 分页器
+        file_path: 文件路径
+        file_hash: 文件指纹（见 _get_cache_file_hash）
+
+    Returns:
+        是否命中缓存
+    """
+    if not file_path or not file_hash:
+        return False
+    try:
+        from .services.layout_cache_service import LayoutCacheService
+        return LayoutCacheService().load(file_path, paginator, file_hash)
+    except Exception:
+        return False
+
+
+def _save_layout_cache(paginator, file_path: Path, file_hash: Optional[str]) -> None:
+    """把分页器的页表保存到磁盘缓存
+
+    Args:
+        paginator: 分页器
+        file_path: 文件路径
+        file_hash: 文件指纹（见 _get_cache_file_hash）
+    """
+    # 只保存已完成的排版，不为写缓存而排版剩余章节
+    if not file_path or not file_hash or not paginator.is_layout_complete():
+        return
+    try:
+        from .services.layout_cache_service import LayoutCacheService
+        LayoutCacheService().save(file_path, paginator, file_hash)
+    except Exception:
+        pass
+
+
+def output_full_document_with_resume(
+    document,
+    file_path: Path,
+    start_page: int = 1,
+    paginator=None,
+    start_position: Optional[Tuple[int, int]] = None,
+    file_hash: Optional[str] = None
+) -> int:
     """输出完整文档，支持从指定页码恢复
 
     Args:
         document: 文档对象
         file_path: 文件路径（用于保存进度）
         start_page: 起始页码（用于恢复进度时滚动到该位置）
+        paginator: 已创建的分页器（默认新建）
+        start_position: 起始位置 (章节索引, 章内字符偏移)，优先于起始页码
+        file_hash: 已计算的文件指纹，用于页表缓存（默认重新计算）
 
     Returns:
         退出码
     """
     from .core.paginator import Paginator
+    from .core.background_layout import BackgroundLayout
 
-    # 创建分页器
-    paginator = Paginator(document)
-    all_pages = paginator.paginate()
-    total_pages = len(all_pages)
-
-    # 验证起始页码
-    if start_page < 1 or start_page > total_pages:
-        start_page = 1
-
-    # 构建完整内容（所有页面）
-    content_parts = []
-    page_start_lines = []  # 记录每页的起始行号
-    current_line_count = 0
-    prev_chapter_index = -1
-
-    for page in all_pages:
-        page_start_lines.append(current_line_count)
-
-        # 输出章节标题
-        if page.chapter_index != prev_chapter_index:
-            chapter = document.get_chapter(page.chapter_index)
-            if chapter:
-                if content_parts:
-                    content_parts.append("")
-                    current_line_count += 1
-                content_parts.append(chapter.title)
-                content_parts.append("")
-                current_line_count += 2
-            prev_chapter_index = page.chapter_index
-
-        # 输出页面内容
-        content_parts.append(page.content)
-        current_line_count += page.content.count('\n') + 1
-
-    full_content = '\n'.join(content_parts)
-
-    # 计算恢复位置的起始行
-    if start_page > 1 and start_page <= len(page_start_lines):
-        resume_line = page_start_lines[start_page - 1]
+    if file_hash is None:
+        file_hash = _get_cache_file_hash(file_path)
+
+    # 创建分页器，优先使用磁盘缓存中的页表
+    if paginator is None:
+        paginator = Paginator(document, memory_budget=LAYOUT_MEMORY_BUDGET)
+        cache_hit = _load_layout_cache(paginator, file_path, file_hash)
     else:
-        resume_line = 0
+        cache_hit = False
 
     # 检查是否是管道输出或重定向
     if not sys.stdout.isatty():
-        # 管道或重定向，直接输出全部内容
-        print(full_content)
+        # 管道或重定向，边排版边逐页输出分页器生成的显示行
+        last_page = None
+        try:
+            for page, lines in paginator.iter_render_pages():
+                print('\n'.join(lines))
+                last_page = page
+        except BrokenPipeError:
+            return 0
+
+        if not cache_hit:
+            _save_layout_cache(paginator, file_path, file_hash)
 
         # 保存进度（管道模式保存最后一页）
         if file_path:
             try:
                 from .services.progress_service import ProgressService
                 progress_service = ProgressService()
-                last_chapter = all_pages[-1].chapter_index if all_pages else 0
+                total_pages = last_page.page_number if last_page else 0
+                last_chapter = last_page.chapter_index if last_page else 0
+                last_offset = last_page.start_offset if last_page else None
                 progress = progress_service.create_progress(
-                    file_path, document, total_pages, last_chapter, total_pages
+                    file_path, document, total_pages, last_chapter, total_pages, last_offset
                 )
                 progress_service.save_progress(progress)
             except Exception:
                 pass
     else:
-        # 终端输出，使用交互式分页器
+        # 终端输出，使用交互式分页器，排版在后台进行
         from .core.interactive_pager import InteractivePager
         from .services.progress_service import ProgressService
 
+        # 分页器生成的显示行（含章节标题）逐页写入行序列
+        layout = BackgroundLayout(paginator)
+
+        if start_position is not None:
+            # 按章内字符偏移恢复时先排版该位置附近的几页，不等待之前的内容排版完成
+            resume_line = layout.start_at(*start_position)
+        else:
+            layout.start()
+
+            # 验证起始页码，只需等待到起始页排版完成
+            if start_page < 1 or not layout.wait_for_page(start_page):
+                start_page = 1
+                layout.wait_for_page(1)
+
+            # 计算恢复位置的起始行
+            if start_page > 1:
+                resume_line = layout.positions.page_start_line(start_page)
+            else:
+                resume_line = 0
+
         # 运行分页器，从恢复位置开始
-        pager = InteractivePager(full_content, start_line=resume_line)
+        pager = InteractivePager(layout, start_line=resume_line)
         final_line = pager.run()
 
-        # 退出时保存进度
+        # 退出时停止后台排版，不等待排版完成（未完成的排版不写入磁盘缓存）
+        layout.stop()
         if file_path:
+            if not cache_hit:
+                _save_layout_cache(paginator, file_path, file_hash)
+
             try:
                 progress_service = ProgressService()
 
-                # 根据最终行号找到对应的页码
-                estimated_page = 1
-                for i, line_start in enumerate(page_start_lines):
-                    if final_line >= line_start:
-                        estimated_page = i + 1
-                    else:
-                        break
+                # 根据最终行号找到对应的页码、章节和章内偏移
+                estimated_page = layout.page_at_line(final_line) or 1
+                estimated_chapter, chapter_offset = layout.position_at_line(final_line) or (0, None)
 
-                # 找到对应的章节
-                if estimated_page > 0 and estimated_page <= len(all_pages):
-                    estimated_chapter = all_pages[estimated_page - 1].chapter_index
-                else:
-                    estimated_chapter = 0
+                # 排版未完成时总页数使用估算值
+                total_pages = max(paginator.estimate_total_pages()[0], estimated_page)
 
                 progress = progress_service.create_progress(
-                    file_path, document, estimated_page, estimated_chapter, total_pages
+                    file_path, document, estimated_page, estimated_chapter, total_pages, chapter_offset
                 )
                 progress_service.save_progress(progress)
             except Exception:
@@ -347,27 +421,28 @@ def output_with_jump(document, file_path: Path, jump_options: dict) -> int:
     """
     from .core.paginator import Paginator
 
-    # 创建分页器
-    paginator = Paginator(document)
-    all_pages = paginator.paginate()
-    total_pages = len(all_pages)
+    # 创建分页器（按需排版，管道输出时只排版到需要输出的页）
+    paginator = Paginator(document, memory_budget=LAYOUT_MEMORY_BUDGET)
+    file_hash = _get_cache_file_hash(file_path)
+    cache_hit = _load_layout_cache(paginator, file_path, file_hash)
 
     # 处理跳转，计算起始页码
     start_page = 1
     if 'page' in jump_options:
         page_num = jump_options['page']
-        if 1 <= page_num <= total_pages:
+        if page_num >= 1 and paginator.get_pages(page_num, 1):
             start_page = page_num
         else:
+            total_pages = paginator.get_total_pages()
             print(f"✗ 错误：无效的页码: {page_num} (共 {total_pages} 页)", file=sys.stderr)
             return 1
 
     elif 'chapter' in jump_options:
         chapter_num = jump_options['chapter']
         if 0 <= chapter_num < document.total_chapters:
-            chapter_page = paginator.get_page_by_chapter(chapter_num)
+            chapter_page = paginator.get_chapter_start_page(chapter_num)
             if chapter_page:
-                start_page = chapter_page.page_number
+                start_page = chapter_page
             else:
                 print(f"✗ 错误：无法跳转到章节: {chapter_num}", file=sys.stderr)
                 return 1
@@ -378,9 +453,11 @@ def output_with_jump(document, file_path: Path, jump_options: dict) -> int:
     elif 'percent' in jump_options:
         percent = jump_options['percent']
         if 0 <= percent <= 100:
+            # 按估算的总页数定位，无需先排版整本书
+            total_pages, _ = paginator.estimate_total_pages()
             start_page = max(1, int(total_pages * percent / 100))
-            if start_page == 0:
-                start_page = 1
+            if not paginator.get_pages(start_page, 1):
+                start_page = max(1, paginator.get_total_pages())
         else:
             print(f"✗ 错误：无效的百分比: {percent} (请输入 0-100)", file=sys.stderr)
             return 1
@@ -388,34 +465,24 @@ def output_with_jump(document, file_path: Path, jump_options: dict) -> int:
     # 检查是否使用管道或重定向
     if sys.stdout.isatty():
         # 终端模式：加载完整文档，跳转到指定位置
-        return output_full_document_with_resume(document, file_path, start_page)
+        return output_full_document_with_resume(document, file_path, start_page, paginator, file_hash=file_hash)
     else:
         # 管道模式：只输出从起始页到末尾（或指定页数）的内容
         if 'pages' in jump_options:
-            end_page = min(start_page + jump_options['pages'] - 1, total_pages)
+            stop_page = start_page + jump_options['pages']
         else:
-            end_page = total_pages
+            stop_page = None
 
-        prev_chapter_index = -1
+        end_page = start_page
+        end_chapter = 0
+        end_offset = None
         try:
-            for page_num in range(start_page, end_page + 1):
-                if page_num < 1 or page_num > len(all_pages):
-                    continue
-
-                page = all_pages[page_num - 1]
-
-                # 输出章节标题
-                if page.chapter_index != prev_chapter_index:
-                    chapter = document.get_chapter(page.chapter_index)
-                    if chapter:
-                        if prev_chapter_index != -1:
-                            print()
-                        print(chapter.title)
-                        print()
-                    prev_chapter_index = page.chapter_index
-
-                # 输出页面内容
-                print(page.content)
+            for page, lines in paginator.iter_render_pages(start_page, stop_page):
+                # 输出页面的显示行（含章节标题）
+                print('\n'.join(lines))
+                end_page = page.page_number
+                end_chapter = page.chapter_index
+                end_offset = page.start_offset
         except BrokenPipeError:
             pass
 
@@ -424,18 +491,18 @@ def output_with_jump(document, file_path: Path, jump_options: dict) -> int:
             from .services.progress_service import ProgressService
             progress_service = ProgressService()
 
-            if end_page > 0 and end_page <= len(all_pages):
-                end_chapter = all_pages[end_page - 1].chapter_index
-            else:
-                end_chapter = 0
-
+            # 只输出了部分页面时，总页数使用估算值
+            total_pages, _ = paginator.estimate_total_pages()
             progress = progress_service.create_progress(
-                file_path, document, end_page, end_chapter, total_pages
+                file_path, document, end_page, end_chapter, max(total_pages, end_page), end_offset
             )
             progress_service.save_progress(progress)
         except Exception:
             pass
 
+        if not cache_hit:
+            _save_layout_cache(paginator, file_path, file_hash)
+
     return 0
 
 
@@ -443,34 +510,17 @@ def _output_with_jump_pipe_mode(document, file_path: Path, jump_options: dict) -
     """管道模式下的跳转输出（保留旧逻辑用于兼容）"""
     from .core.paginator import Paginator
 
-    paginator = Paginator(document)
-    all_pages = paginator.paginate()
-    total_pages = len(all_pages)
+    paginator = Paginator(document, memory_budget=LAYOUT_MEMORY_BUDGET)
 
     start_page = jump_options.get('page', 1)
     if 'pages' in jump_options:
-        end_page = min(start_page + jump_options['pages'] - 1, total_pages)
+        stop_page = start_page + jump_options['pages']
     else:
-        end_page = total_pages
+        stop_page = None
 
-    prev_chapter_index = -1
     try:
-        for page_num in range(start_page, end_page + 1):
-            if page_num < 1 or page_num > len(all_pages):
-                continue
-
-            page = all_pages[page_num - 1]
-
-            if page.chapter_index != prev_chapter_index:
-                chapter = document.get_chapter(page.chapter_index)
-                if chapter:
-                    if prev_chapter_index != -1:
-                        print()
-                    print(chapter.title)
-                    print()
-                prev_chapter_index = page.chapter_index
-
-            print(page.content)
+        for _, lines in paginator.iter_render_pages(start_page, stop_page):
+            print('\n'.join(lines))
     except BrokenPipeError:
         pass
 
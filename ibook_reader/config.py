@@ -22,6 +22,7 @@ class Config:
         self.config_file = self.config_dir / 'config.json'
         self.progress_file = self.config_dir / 'progress.json'
         self.bookmarks_dir = self.config_dir / 'bookmarks'
+        self.layout_cache_dir = self.config_dir / 'layout_cache'
         self.log_file = self.config_dir / 'app.log'
         
         # 确保目录存在
@@ -2,5 +2,7 @@
 
 from .format_detector import FormatDetector
 from .paginator import Paginator, Page
+from .page_table import PageTable
+from .layout_manager import LayoutManager
 
-__all__ = ['FormatDetector', 'Paginator', 'Page']
+__all__ = ['FormatDetector', 'Paginator', 'Page', 'PageTable', 'LayoutManager']
@@ -0,0 +1,803 @@
+"""后台排版"""
+
+import threading
+from collections import OrderedDict
+from itertools import islice
+from typing import Iterator, List, Optional, Tuple
+
+from .page_table import PageTable
+from .paginator import Paginator, Page
+from .position_index import PositionIndex
+
+
+class BackgroundLayout:
+    """
+    后台排版
+
+    在后台线程中逐页排版，只记录每页的章节偏移和起始显示行号，交互式分页器
+    可以在排版完成前就开始显示已生成的部分。对外表现为一个不断增长的行序列，
+    显示行（含章节标题）按需由分页器从页面记录重新生成，只缓存最近使用的几页，
+    内存占用与屏幕大小有关，与书的大小无关。
+
+    从书的中间开始显示（恢复进度、终端尺寸变化）时，先单独排版阅读位置附近的
+    几页（提前排版的片段），按之前内容的估计行数放在行序列中，不必等待之前的
+    内容排版完成；阅读位置接近片段末尾时片段继续向后排版，后台仍从头顺序排版，
+    追上片段后由 sync() 合并，换成实际行号。
+
+    分页器不是线程安全的：后台线程每排版一页、显示方每生成一页显示行或排版片段，
+    都在持有 _condition 的锁时使用分页器，两边不会同时修改分页器的缓存。
+    """
+
+    # 缓存显示行的页数
+    PAGE_CACHE_SIZE = 8
+
+    # 提前排版时阅读位置之后至少排版的页数（章节较短时继续排版后面的章节）
+    AHEAD_PAGES = 8
+
+    # 提前排版时阅读位置之前保留的字符数，阅读位置在章内更靠后时片段从章节中间开始
+    AHEAD_CHARS = 1 << 16
+
+    def __init__(self, paginator: Paginator):
+        """
+        初始化后台排版
+
+        Args:
+            paginator: 分页器
+        """
+        self.paginator = paginator
+        self.document = paginator.document
+
+        self._condition = threading.Condition()
+        self._thread = None
+        self._reset()
+
+    def _reset(self) -> None:
+        """清空排版结果（分页器尺寸变化后重新排版前调用）"""
+        paginator = self.paginator
+
+        # 已生成的显示行数，页面、显示行、章节偏移之间的位置索引，以及最近使用的页面显示行
+        # （键为 (是否属于提前排版的片段, 页码)）
+        self._line_count = 0
+        self.positions = PositionIndex()
+        self._page_lines: 'OrderedDict[Tuple[bool, int], List[str]]' = OrderedDict()
+
+        # 提前排版的片段：各页的章节偏移与片段内的起始行号，片段在行序列中的起始行号
+        # 与第一页的页码（均按之前内容的估计值），以及片段的显示行数
+        self._ahead: Optional[PositionIndex] = None
+        self._ahead_line = 0
+        self._ahead_page = 1
+        self._ahead_line_count = 0
+        # 片段之后尚未取用的页面（片段已排到书的末尾时为None）
+        self._ahead_pages: Optional[Iterator[Tuple[int, Tuple[int, int, int]]]] = None
+        # 片段向前扩展时行号的平移量，由下一次 sync() 换算显示方的行号
+        self._pending_shift = 0
+
+        # 用于估算总行数：各章节及其之后所有章节的估计行数（另加标题行），
+        # 排版过程中已生成部分换成实际行数
+        chapter_count = len(self.document.chapters)
+        self._chapter_line_estimates = [paginator.estimate_chapter_lines(i) for i in range(chapter_count)]
+        self._remaining_line_estimates = [0] * (chapter_count + 1)
+        for i in range(chapter_count - 1, -1, -1):
+            self._remaining_line_estimates[i] = (
+                self._remaining_line_estimates[i + 1]
+                + self._chapter_line_estimates[i]
+                + len(paginator.get_heading_lines(i))
+            )
+        self._last_end_offset = 0
+
+        self._complete = False
+        self._stopped = False
+
+    def __len__(self) -> int:
+        if self._ahead is not None:
+            return self._ahead_line + self._ahead_line_count
+        return self._line_count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("行号超出范围")
+
+        with self._condition:
+            location = self._locate_line(index)
+            if location is None:
+                # 提前排版的片段之前尚未排版的部分，向前扩展片段
+                self._extend_ahead_back(index)
+                location = self._locate_line(index)
+                if location is None:
+                    return ''
+            ahead, page_number = location
+            return self.page_lines(page_number, ahead)[index - self._page_start_line(page_number, ahead)]
+
+    def page_lines(self, page_number: int, ahead: bool = False) -> List[str]:
+        """
+        获取一页的显示行（含章节标题），未缓存时由分页器重新生成
+
+        Args:
+            page_number: 页码（从1开始，须已排版）
+            ahead: 是否为提前排版的片段中的页码
+
+        Returns:
+            显示行列表
+        """
+        key = (ahead, page_number)
+        with self._condition:
+            lines = self._page_lines.get(key)
+            if lines is None:
+                if ahead:
+                    lines = self.paginator.get_render_lines(self._ahead, page_number, self._ahead_page)
+                else:
+                    lines = self.paginator.get_render_lines(self.positions, page_number)
+                self._cache_page_lines(key, lines)
+            else:
+                self._page_lines.move_to_end(key)
+            return lines
+
+    def _cache_page_lines(self, key: Tuple[bool, int], lines: List[str]) -> None:
+        """
+        缓存一页的显示行，按最近使用顺序淘汰（调用方需持有锁）
+
+        Args:
+            key: (是否属于提前排版的片段, 页码)
+            lines: 显示行列表
+        """
+        self._page_lines[key] = lines
+        while len(self._page_lines) > self.PAGE_CACHE_SIZE:
+            self._page_lines.popitem(last=False)
+
+    def _locate_line(self, line: int) -> Optional[Tuple[bool, int]]:
+        """
+        查找显示行所在的页（调用方需持有锁）
+
+        Args:
+            line: 显示行号（须小于总行数）
+
+        Returns:
+            (是否属于提前排版的片段, 页码) 元组，尚未排版的部分返回None
+        """
+        if self._ahead is None:
+            return False, self.positions.page_at_line(line)
+        if line >= self._ahead_line:
+            return True, self._ahead.page_at_line(line - self._ahead_line)
+        # 顺序排版的部分只显示到片段之前
+        if line < self._line_count:
+            return False, self.positions.page_at_line(line)
+        return None
+
+    def _locate_offset(self, chapter_index: int, offset: int) -> Optional[Tuple[bool, int]]:
+        """
+        查找包含章节内字符偏移的页（调用方需持有锁）
+
+        Args:
+            chapter_index: 章节索引（从0开始）
+            offset: 章节内容中的字符偏移
+
+        Returns:
+            (是否属于提前排版的片段, 页码) 元组，该位置尚未排版或不可见时返回None
+        """
+        ahead = self._ahead
+        if ahead is not None:
+            first_chapter, first_offset, _ = ahead.get(0)
+            if (first_chapter, first_offset) <= (chapter_index, offset) and chapter_index <= ahead.chapter_indices[-1]:
+                page_number = ahead.page_at_offset(chapter_index, offset)
+                return None if page_number is None else (True, page_number)
+
+        page_number = self.positions.page_at_offset(chapter_index, offset)
+        if page_number is None:
+            return None
+        if ahead is not None and self.positions.page_start_line(page_number) >= self._ahead_line:
+            return None
+        return False, page_number
+
+    def _page_start_line(self, page_number: int, ahead: bool = False) -> int:
+        """
+        获取页面（含章节标题）的起始显示行号（调用方需持有锁）
+
+        Args:
+            page_number: 页码（从1开始）
+            ahead: 是否为提前排版的片段中的页码
+
+        Returns:
+            显示行号
+        """
+        if ahead:
+            return self._ahead_line + self._ahead.page_start_line(page_number)
+        return self.positions.page_start_line(page_number)
+
+    @property
+    def complete(self) -> bool:
+        """排版是否已完成（提前排版的片段已合并）"""
+        return self._complete and self._ahead is None
+
+    @property
+    def total_pages(self) -> int:
+        """已顺序生成的页数（排版完成后即总页数）"""
+        return len(self.positions)
+
+    def estimated_total_lines(self) -> int:
+        """
+        估算排版完成后的总行数
+
+        Returns:
+            已生成的行数加上剩余部分的估计行数，排版完成后为实际行数
+        """
+        if self.complete:
+            return self._line_count
+        if self._ahead is not None:
+            # 片段之后的部分按估计行数计算
+            chapter_index, _, end_offset = self._ahead.get(len(self._ahead) - 1)
+            return len(self) + self._estimate_lines_after(chapter_index, end_offset)
+        if not self.positions:
+            return max(0, self._remaining_line_estimates[0] - 1)
+
+        chapter_index = self.positions.chapter_indices[-1]
+        estimate = self._line_count + self._estimate_lines_after(chapter_index, self._last_end_offset)
+        return max(self._line_count, estimate)
+
+    def _estimate_lines_after(self, chapter_index: int, offset: int) -> int:
+        """
+        估算章节内某一偏移之后的显示行数（含之后的章节）
+
+        Args:
+            chapter_index: 章节索引（从0开始）
+            offset: 章节内容中的字符偏移
+
+        Returns:
+            估计行数
+        """
+        # 当前章节按剩余字符的比例估算
+        content_length = len(self.document.chapters[chapter_index].content)
+        remaining_ratio = 1 - offset / content_length if content_length else 0
+        remaining = self._chapter_line_estimates[chapter_index] * remaining_ratio
+        return int(remaining) + self._remaining_line_estimates[chapter_index + 1]
+
+    def start(self) -> None:
+        """在后台线程中开始排版"""
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+
+    def start_at(self, chapter_index: int, offset: int) -> int:
+        """
+        从阅读位置开始显示，在后台线程中排版
+
+        位置不在书的开头附近时先提前排版该位置附近的几页，不等待之前的内容排版完成。
+
+        Args:
+            chapter_index: 章节索引（从0开始）
+            offset: 章节内容中的字符偏移
+
+        Returns:
+            该位置的显示行号
+        """
+        line = self._place_ahead(chapter_index, offset)
+        self.start()
+        if line is None:
+            self.wait_for_offset(chapter_index, offset)
+            line = self.line_at_position(chapter_index, offset) or 0
+        return line
+
+    def stop(self) -> None:
+        """停止后台排版并等待线程结束（已生成的部分保留）"""
+        self._stopped = True
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def run(self) -> None:
+        """在当前线程中完成排版"""
+        try:
+            with self._condition:
+                paginator = self.paginator
+                cached = paginator.is_layout_complete() and paginator.get_page_table().has_line_counts()
+            if cached:
+                self._append_page_table(paginator.get_page_table())
+            else:
+                self._append_rendered_pages()
+        finally:
+            with self._condition:
+                self.positions.finish(len(self.document.chapters))
+                self._complete = True
+                self._condition.notify_all()
+
+    def _append_rendered_pages(self) -> None:
+        """由分页器逐页排版并追加显示行"""
+        pages = self.paginator.iter_render_pages()
+        try:
+            while not self._stopped:
+                # 排版一页期间持有锁，显示方此时不使用分页器
+                with self._condition:
+                    rendered = next(pages, None)
+                    if rendered is None:
+                        break
+                    self._append_page(*rendered)
+        finally:
+            with self._condition:
+                pages.close()
+
+    def _append_page_table(self, table: PageTable) -> None:
+        """
+        按已有的页表（如磁盘缓存中的页表）追加各页，不换行
+
+        除章节最后一页外每页都是满页，页面的显示行数可以直接由页表得出。
+
+        Args:
+            table: 当前尺寸下的完整页表（须记录各章节最后一页的显示行数）
+        """
+        paginator = self.paginator
+        rows = paginator.available_rows
+        positions = self.positions
+
+        with self._condition:
+            for index in range(len(table)):
+                if self._stopped:
+                    break
+                chapter_index, start, end = table.get(index)
+                positions.append_page(chapter_index, start, end, self._line_count)
+                # 与 Paginator.get_render_lines() 相同，章节第一页含章节标题
+                if start == 0 and (index == 0 or table.chapter_indices[index - 1] != chapter_index):
+                    self._line_count += len(paginator.get_heading_lines(chapter_index, first=index == 0))
+                self._line_count += table.page_line_count(index, rows)
+                self._last_end_offset = end
+            self._condition.notify_all()
+
+    def _append_page(self, page: Page, lines: List[str]) -> None:
+        """
+        追加一页的显示行
+
+        Args:
+            page: 页面对象
+            lines: 该页的显示行（含章节标题）
+        """
+        with self._condition:
+            self.positions.append_page(page.chapter_index, page.start_offset, page.end_offset, self._line_count)
+            self._line_count += len(lines)
+            self._last_end_offset = page.end_offset
+            self._cache_page_lines((False, page.page_number), lines)
+            self._condition.notify_all()
+
+    def _place_ahead(self, chapter_index: int, offset: int) -> Optional[int]:
+        """
+        提前排版阅读位置附近的几页（调用方需确保后台排版未在进行）
+
+        片段从阅读位置所在章节的开头开始，阅读位置在章内更靠后时从其前 AHEAD_CHARS
+        个字符处的原始行开头开始，逐页换行到阅读位置之后至少有 AHEAD_PAGES 页，
+        按之前内容的估计行数放在行序列中。
+
+        Args:
+            chapter_index: 章节索引（从0开始）
+            offset: 章节内容中的字符偏移
+
+        Returns:
+            该位置的显示行号，位置在书的开头附近（不需要提前排版）时返回None
+        """
+        chapters = self.document.chapters
+        if not 0 <= chapter_index < len(chapters):
+            return None
+
+        content = chapters[chapter_index].content
+        start = 0
+        if offset > self.AHEAD_CHARS:
+            start = content.rfind('\n', 0, offset - self.AHEAD_CHARS) + 1
+        if chapter_index == 0 and start == 0:
+            return None
+
+        paginator = self.paginator
+        rows = paginator.available_rows
+
+        # 之前内容的估计行数（第一个标题前没有空行）与估计页数，章内部分按字符比例估算
+        chapter_lines = self._chapter_line_estimates[chapter_index] * start // len(content) if start else 0
+        ahead_line = self._remaining_line_estimates[0] - self._remaining_line_estimates[chapter_index] - 1
+        if start:
+            ahead_line += len(paginator.get_heading_lines(chapter_index)) + chapter_lines
+        ahead_page = 1 + chapter_lines // rows
+        ahead_page += sum((lines + rows - 1) // rows for lines in self._chapter_line_estimates[:chapter_index])
+
+        pages = (
+            (index, page)
+            for index in range(chapter_index, len(chapters))
+            for page in paginator.iter_chapter_pages(index, start if index == chapter_index else 0)
+        )
+        ahead = PositionIndex()
+        line_count = 0
+        anchor_page = None
+        remaining = None
+        for index, page in pages:
+            line_count = self._append_ahead_page(ahead, ahead_page, line_count, index, page)
+
+            if anchor_page is None and (index > chapter_index or page[1] > offset):
+                anchor_page = len(ahead)
+            if anchor_page is not None and len(ahead) - anchor_page >= self.AHEAD_PAGES:
+                remaining = pages
+                break
+
+        if not ahead:
+            return None
+
+        with self._condition:
+            self._ahead = ahead
+            self._ahead_line = max(0, ahead_line)
+            self._ahead_page = ahead_page
+            self._ahead_line_count = line_count
+            self._ahead_pages = remaining
+
+        line = self.line_at_position(chapter_index, offset)
+        return self._ahead_line if line is None else line
+
+    def _append_ahead_page(
+        self,
+        ahead: PositionIndex,
+        ahead_page: int,
+        line_count: int,
+        chapter_index: int,
+        page: Tuple[int, int, int]
+    ) -> int:
+        """
+        向提前排版的片段追加一页
+
+        Args:
+            ahead: 片段的位置索引
+            ahead_page: 片段第一页的页码
+            line_count: 片段已有的显示行数
+            chapter_index: 章节索引（从0开始）
+            page: Paginator.iter_chapter_pages() 生成的 (起始偏移, 结束偏移, 显示行数) 元组
+
+        Returns:
+            追加后片段的显示行数
+        """
+        page_start, page_end, page_lines = page
+        ahead.append_page(chapter_index, page_start, page_end, line_count)
+        if page_start == 0:
+            # 章节第一页含章节标题
+            first = ahead_page + len(ahead) - 1 == 1
+            line_count += len(self.paginator.get_heading_lines(chapter_index, first=first))
+        return line_count + page_lines
+
+    def _extend_ahead(self, line: int) -> None:
+        """
+        阅读位置距片段末尾不足 AHEAD_PAGES 的一半时，继续排版片段之后的 AHEAD_PAGES 页
+        （调用方需持有锁）
+
+        Args:
+            line: 显示方当前的行号
+        """
+        rows = self.paginator.available_rows
+        end_line = self._ahead_line + self._ahead_line_count
+        if self._ahead_pages is None or end_line - line > self.AHEAD_PAGES * rows // 2:
+            return
+
+        appended = 0
+        line_count = self._ahead_line_count
+        for index, page in islice(self._ahead_pages, self.AHEAD_PAGES):
+            line_count = self._append_ahead_page(self._ahead, self._ahead_page, line_count, index, page)
+            appended += 1
+
+        self._ahead_line_count = line_count
+        if appended < self.AHEAD_PAGES:
+            # 已排到书的末尾
+            self._ahead_pages = None
+        self._condition.notify_all()
+
+    def _extend_ahead_back(self, line: int) -> None:
+        """
+        向前扩展提前排版的片段，直到片段覆盖显示行或到达书的开头（调用方需持有锁）
+
+        每次从片段起点之前 AHEAD_CHARS 个字符处的原始行开头（不跨章节）排版到片段起点，
+        片段的起始行号随之前移，已有行的行号不变；起始行号不够前移或到达书的开头时
+        整个片段的行号平移，由下一次 sync() 换算显示方的行号。
+
+        Args:
+            line: 需要显示的行号（在片段之前）
+        """
+        paginator = self.paginator
+        chapters = self.document.chapters
+        chapter_index, start, _ = self._ahead.get(0)
+
+        pages = []
+        line_count = 0
+        while self._ahead_line - line_count > line:
+            end = start
+            if start == 0:
+                if chapter_index == 0:
+                    break
+                chapter_index -= 1
+                end = None
+
+            content = chapters[chapter_index].content
+            limit = len(content) if end is None else end
+            start = content.rfind('\n', 0, limit - self.AHEAD_CHARS) + 1 if limit > self.AHEAD_CHARS else 0
+            chunk = []
+            for page_start, page_end, page_lines in paginator.iter_chapter_pages(chapter_index, start, end):
+                if page_start == 0:
+                    # 章节第一页含章节标题，书的第一个标题前没有空行
+                    first = not any(chapter.content.strip('\n') for chapter in chapters[:chapter_index])
+                    page_lines += len(paginator.get_heading_lines(chapter_index, first=first))
+                chunk.append((chapter_index, page_start, page_end, page_lines))
+                line_count += page_lines
+            pages[:0] = chunk
+
+        if not pages:
+            return
+
+        # 新的片段：之前的页面在前，原有页面的行号后移
+        ahead = PositionIndex()
+        start_line = 0
+        for index, page_start, page_end, page_lines in pages:
+            ahead.append_page(index, page_start, page_end, start_line)
+            start_line += page_lines
+        previous = self._ahead
+        for i in range(len(previous)):
+            index, page_start, page_end = previous.get(i)
+            ahead.append_page(index, page_start, page_end, previous.start_lines[i] + line_count)
+
+        ahead_line = self._ahead_line - line_count
+        at_book_start = start == 0 and not any(chapter.content.strip('\n') for chapter in chapters[:chapter_index])
+        if at_book_start or ahead_line < 0:
+            # 片段之前的估计行数有误差，整个片段平移
+            self._pending_shift -= ahead_line
+            ahead_line = 0
+        self._ahead = ahead
+        self._ahead_line = ahead_line
+        self._ahead_page = 1 if at_book_start else max(1, self._ahead_page - len(pages))
+        self._ahead_line_count += line_count
+        for key in [key for key in self._page_lines if key[0]]:
+            del self._page_lines[key]
+        self._condition.notify_all()
+
+    def sync(self, line: int) -> int:
+        """
+        合并已被顺序排版追上的提前排版片段
+
+        合并后片段中的行换成实际行号。行号只在这里变化，显示方（如交互式分页器）
+        应在两帧之间调用，并按返回值更新当前行号。没有合并时，阅读位置接近片段
+        末尾则继续向后排版片段，行序列随之增长。
+
+        Args:
+            line: 显示方当前的行号
+
+        Returns:
+            该行在合并后的行号（没有合并时不变）
+        """
+        with self._condition:
+            if self._pending_shift:
+                line = max(0, line + self._pending_shift)
+                self._pending_shift = 0
+
+            ahead = self._ahead
+            positions = self.positions
+            if ahead is None:
+                return line
+
+            # 顺序排版越过片段的末尾或排完全书后才合并（片段从章节中间开始分页，
+            # 最后一页可能落在末尾的空行中，其结束偏移比顺序排版的最后一页更靠后）
+            chapter_index, _, end = ahead.get(len(ahead) - 1)
+            finished = self._complete and not self._stopped
+            if not finished and (
+                not positions or (positions.chapter_indices[-1], positions.end_offsets[-1]) < (chapter_index, end)
+            ):
+                self._extend_ahead(line)
+                return line
+
+            # 片段换行与顺序排版相同，行号相差片段起始位置的估计误差
+            chapter_index, start, _ = ahead.get(0)
+            page_number = positions.page_at_offset(chapter_index, start)
+            shift = self._offset_line(False, page_number, chapter_index, start) - self._page_content_line(1, ahead=True)
+            if line >= self._ahead_line:
+                line += shift
+
+            self._ahead = None
+            self._ahead_pages = None
+            for key in [key for key in self._page_lines if key[0]]:
+                del self._page_lines[key]
+            self._condition.notify_all()
+            return line
+
+    def wait_for_page(self, page_number: int) -> bool:
+        """
+        等待指定页排版完成
+
+        Args:
+            page_number: 页码（从1开始）
+
+        Returns:
+            该页是否存在
+        """
+        with self._condition:
+            while len(self.positions) < page_number and not self._complete:
+                self._condition.wait()
+            return len(self.positions) >= page_number
+
+    def wait_for_offset(self, chapter_index: int, offset: int) -> Optional[int]:
+        """
+        等待包含章节内字符偏移的页面顺序排版完成
+
+        Args:
+            chapter_index: 章节索引（从0开始）
+            offset: 章节内容中的字符偏移
+
+        Returns:
+            该页的页码，位置不存在时返回None
+        """
+        positions = self.positions
+        with self._condition:
+            while not self._complete:
+                # 已排版到该偏移之后（或之后的章节）时即可确定页码
+                if positions and (
+                    positions.chapter_indices[-1] > chapter_index
+                    or (positions.chapter_indices[-1] == chapter_index and positions.end_offsets[-1] > offset)
+                ):
+                    break
+                self._condition.wait()
+            return positions.page_at_offset(chapter_index, offset)
+
+    def page_at_line(self, line: int) -> Optional[int]:
+        """
+        查找显示行所在的页码
+
+        Args:
+            line: 显示行号
+
+        Returns:
+            页码（提前排版的片段中为估计页码），该行尚未排版时返回None
+        """
+        with self._condition:
+            if not 0 <= line < len(self):
+                return None
+            location = self._locate_line(line)
+            if location is None:
+                return self._ahead_page
+            ahead, page_number = location
+            return self._ahead_page + page_number - 1 if ahead else page_number
+
+    def position_at_line(self, line: int) -> Optional[Tuple[int, int]]:
+        """
+        查找显示行在章节内容中的位置
+
+        Args:
+            line: 显示行号
+
+        Returns:
+            (章节索引, 章内字符偏移) 元组，该行是章节标题时为章节第一页的起始偏移，
+            在提前排版的片段之前尚未排版的部分时为片段的起始位置，该行尚未排版时返回None
+        """
+        with self._condition:
+            if not 0 <= line < len(self):
+                return None
+            location = self._locate_line(line)
+            if location is None:
+                chapter_index, offset, _ = self._ahead.get(0)
+                return chapter_index, offset
+
+            ahead, page_number = location
+            table = self._ahead if ahead else self.positions
+            chapter_index, offset, _ = table.get(page_number - 1)
+            start_line = self._page_content_line(page_number, ahead)
+            page_start_line = self._page_start_line(page_number, ahead)
+            lines = self.page_lines(page_number, ahead)[start_line - page_start_line:line - page_start_line]
+
+            # 从页首按显示行的长度前进，行尾紧跟换行符时跳过换行符
+            content = self.document.chapters[chapter_index].content
+            for text in lines:
+                offset += len(text)
+                if offset < len(content) and content[offset] == '\n':
+                    offset += 1
+            return chapter_index, offset
+
+    def line_at_position(self, chapter_index: int, offset: int) -> Optional[int]:
+        """
+        查找章节内字符偏移所在的显示行
+
+        Args:
+            chapter_index: 章节索引（从0开始）
+            offset: 章节内容中的字符偏移
+
+        Returns:
+            显示行号，该位置尚未排版时返回None
+        """
+        with self._condition:
+            location = self._locate_offset(chapter_index, offset)
+            if location is None:
+                return None
+            return self._offset_line(*location, chapter_index, offset)
+
+    def _offset_line(self, ahead: bool, page_number: int, chapter_index: int, offset: int) -> int:
+        """
+        在包含章节内字符偏移的页中查找该偏移所在的显示行（调用方需持有锁）
+
+        Args:
+            ahead: 是否为提前排版的片段中的页码
+            page_number: 页码（从1开始）
+            chapter_index: 章节索引（从0开始）
+            offset: 章节内容中的字符偏移
+
+        Returns:
+            显示行号
+        """
+        table = self._ahead if ahead else self.positions
+        _, position, end = table.get(page_number - 1)
+        line = self._page_content_line(page_number, ahead)
+        page_start_line = self._page_start_line(page_number, ahead)
+        lines = self.page_lines(page_number, ahead)
+
+        content = self.document.chapters[chapter_index].content
+        while line + 1 - page_start_line < len(lines):
+            # 下一显示行的起始偏移
+            position += len(lines[line - page_start_line])
+            if position < len(content) and content[position] == '\n':
+                position += 1
+            if position > offset or position >= end:
+                break
+            line += 1
+        return line
+
+    def _page_content_line(self, page_number: int, ahead: bool = False) -> int:
+        """
+        获取页面内容（不含章节标题）的起始显示行号（调用方需持有锁）
+
+        Args:
+            page_number: 页码（从1开始）
+            ahead: 是否为提前排版的片段中的页码
+
+        Returns:
+            显示行号
+        """
+        table = self._ahead if ahead else self.positions
+        first_page = self._ahead_page if ahead else 1
+        start_line = self._page_start_line(page_number, ahead)
+        chapter_index = table.page_chapter(page_number)
+        # 与 Paginator.get_render_lines() 相同，从章节开头开始的页含章节标题
+        if table.start_offsets[page_number - 1] == 0 and (
+            page_number == 1 or table.page_chapter(page_number - 1) != chapter_index
+        ):
+            first = first_page + page_number - 1 == 1
+            start_line += len(self.paginator.get_heading_lines(chapter_index, first=first))
+        return start_line
+
+    def resize(self, rows: int, cols: int, line: int) -> int:
+        """
+        终端尺寸变化时按新列宽重新排版，停留在同一段文字上
+
+        显示行只与列宽有关，列数不变时不重新排版。列数变化时停止当前排版，
+        只提前排版原位置附近的几页，其余部分在后台从头按新尺寸重新排版，
+        耗时与原位置在书中的远近无关。
+
+        Args:
+            rows: 新的终端行数
+            cols: 新的终端列数
+            line: 当前显示的行号
+
+        Returns:
+            原位置在新排版中的显示行号
+        """
+        if cols == self.paginator.terminal_cols:
+            return line
+
+        position = self.position_at_line(line)
+        restart = self._thread is not None or not self._complete
+        self.stop()
+        self.paginator.update_terminal_size(rows, cols)
+        self._reset()
+
+        new_line = None if position is None else self._place_ahead(*position)
+        if restart:
+            self.start()
+        else:
+            self.run()
+            if new_line is not None:
+                return self.sync(new_line)
+
+        if new_line is not None:
+            return new_line
+        if position is None:
+            return 0
+        self.wait_for_offset(*position)
+        return self.line_at_position(*position) or 0
+
+    def wait(self) -> None:
+        """等待排版全部完成（并合并提前排版的片段）"""
+        with self._condition:
+            while not self._complete:
+                self._condition.wait()
+        self.sync(0)
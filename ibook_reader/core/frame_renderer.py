@@ -0,0 +1,158 @@
+"""差量帧渲染"""
+
+import os
+import re
+import sys
+from typing import List, Optional
+
+from ..utils.text_utils import get_display_width, truncate_text
+
+
+# 控制序列（如状态栏的反显），不占显示宽度
+_ESCAPE_PATTERN = re.compile(r'(\033\[[0-9;?]*[A-Za-z])')
+
+
+def clip_row(text: str, width: int) -> str:
+    """
+    按显示宽度截断一行，超出终端宽度的部分不输出（避免折行打乱其他行）
+
+    控制序列不占宽度，截断处之后的控制序列仍然保留（如恢复属性的序列）。
+
+    Args:
+        text: 一行文本，可以包含控制序列
+        width: 终端宽度
+
+    Returns:
+        截断后的文本
+    """
+    if '\033' not in text:
+        if get_display_width(text) <= width:
+            return text
+        return truncate_text(text, width, '')
+
+    parts = []
+    remaining = width
+    for i, part in enumerate(_ESCAPE_PATTERN.split(text)):
+        if i % 2:
+            parts.append(part)
+        elif remaining > 0 and part:
+            part_width = get_display_width(part)
+            if part_width > remaining:
+                part = truncate_text(part, remaining, '')
+            parts.append(part)
+            remaining -= part_width
+    return ''.join(parts)
+
+
+class FrameRenderer:
+    """
+    差量帧渲染
+
+    记住终端上已经画出的每一行，新的一帧只重绘内容变化的行：
+    用光标定位序列把这些行拼进一个字节缓冲区，一次 os.write 写入终端。
+    """
+
+    def __init__(self, fd: Optional[int] = None, encoding: Optional[str] = None):
+        """
+        初始化帧渲染
+
+        Args:
+            fd: 终端的文件描述符（默认使用标准输出）
+            encoding: 终端编码（默认与标准输出一致，如 GB18030 终端）
+        """
+        self.fd = fd
+        self.encoding = encoding or getattr(sys.stdout, 'encoding', None) or 'utf-8'
+
+        # 屏幕上每一行当前显示的文本，None 表示内容未知、需要重绘
+        self._screen: List[Optional[str]] = []
+
+        # 累计写入次数与字节数
+        self.writes = 0
+        self.bytes_written = 0
+
+    def invalidate(self) -> None:
+        """屏幕内容未知（如被其他程序改写），下一帧全部重绘"""
+        self._screen = []
+
+    def scroll(self, delta: int, region_rows: int) -> str:
+        """
+        在滚动区域内滚动已显示的内容，并同步记录的屏幕内容
+
+        Args:
+            delta: 滚动的行数，正数内容上移（删除顶部行），负数内容下移（在顶部插入行）
+            region_rows: 滚动区域的行数（从第一行开始）
+
+        Returns:
+            执行滚动的转义序列，需放在下一帧的开头输出
+        """
+        count = abs(delta)
+        region = self._screen[:region_rows]
+        region += [None] * (region_rows - len(region))
+        if delta > 0:
+            region = region[count:] + [''] * count
+            sequence = f"\033[1;1H\033[{count}M"
+        else:
+            region = [''] * count + region[:region_rows - count]
+            sequence = f"\033[1;1H\033[{count}L"
+        self._screen[:region_rows] = region
+        return sequence
+
+    def render(self, rows: List[str], prefix: str = '', width: Optional[int] = None) -> int:
+        """
+        输出一帧，只重绘与屏幕上不同的行
+
+        Args:
+            rows: 新一帧每一行的文本（从屏幕第一行开始）
+            prefix: 放在帧开头的转义序列（如滚动）
+            width: 终端宽度，超出的部分截断（默认不截断）
+
+        Returns:
+            写入的字节数
+        """
+        if width is not None:
+            rows = [clip_row(text, width) for text in rows]
+
+        screen = self._screen
+        if not screen:
+            # 屏幕内容未知时先清屏
+            prefix += '\033[2J'
+            screen = [''] * len(rows)
+        screen += [None] * (len(rows) - len(screen))
+
+        parts = [prefix]
+        for i, text in enumerate(rows):
+            if screen[i] != text:
+                parts.append(f"\033[{i + 1};1H\033[2K{text}")
+        self._screen = list(rows)
+
+        data = ''.join(parts).encode(self.encoding, 'replace')
+        if data:
+            self._write(data)
+        return len(data)
+
+    def _write(self, data: bytes) -> None:
+        """
+        把一帧写入终端
+
+        Args:
+            data: 帧数据
+        """
+        fd = self.fd
+        if fd is None:
+            try:
+                sys.stdout.flush()
+                fd = sys.stdout.fileno()
+            except (AttributeError, OSError, ValueError):
+                # 标准输出没有文件描述符（如被替换为内存缓冲）时按文本写入
+                sys.stdout.write(data.decode(self.encoding))
+                sys.stdout.flush()
+                self.writes += 1
+                self.bytes_written += len(data)
+                return
+
+        view = memoryview(data)
+        while view:
+            written = os.write(fd, view)
+            view = view[written:]
+            self.writes += 1
+        self.bytes_written += len(data)
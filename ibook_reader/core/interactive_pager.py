@@ -2,28 +2,57 @@
 
 import sys
 import os
+import select
 import shutil
+import signal
 import tty
 import termios
 import subprocess
-from typing import Optional, Callable
+from typing import Optional, Callable, List, Sequence, Union
+
+from .frame_renderer import FrameRenderer
 
 
 class InteractivePager:
     """交互式分页器，支持实时进度追踪"""
 
-    def __init__(self, content: str, on_position_change: Optional[Callable[[int, int], None]] = None, start_line: int = 0):
+    # 内容仍在增长时，等待按键的超时时间（秒），超时后刷新状态栏
+    GROWING_REFRESH_INTERVAL = 0.2
+
+    # 终端尺寸连续变化（如拖动窗口边缘）时，等待信号停止的时间（秒），之后只重新排版一次
+    RESIZE_SETTLE_INTERVAL = 0.05
+
+    # 一次最多读取并合并处理的按键字节数
+    KEY_BATCH_BYTES = 4096
+
+    # 退出键（q、Q、Ctrl+C）
+    QUIT_KEYS = 'qQ\x03'
+
+    def __init__(
+        self,
+        content: Union[str, Sequence[str]],
+        on_position_change: Optional[Callable[[int, int], None]] = None,
+        start_line: int = 0
+    ):
         """
         初始化分页器
 
         Args:
-            content: 要显示的完整内容（字符串）
+            content: 要显示的完整内容（字符串），或按行组织的行序列。
+                行序列只需支持 len() 和按行号取行，分页器每次只读取屏幕上的行，
+                行可以按需生成（如 BackgroundLayout 从页表取回）而不必全部驻留内存。
+                行序列可以在显示过程中继续增长，此时应提供 complete 属性
+                和 estimated_total_lines() 方法；提供 resize(rows, cols, line)
+                方法时，终端尺寸变化后由它按新尺寸重新排版并返回同一位置的行号；
+                提供 sync(line) 方法时，行号可能在两帧之间变化（如提前排版的部分
+                换成实际位置），由它返回当前行的新行号
             on_position_change: 位置改变时的回调函数，参数为 (当前行号, 总行数)
             start_line: 初始显示的行号（用于恢复进度）
         """
-        self.content = content
-        self.lines = content.split('\n')
-        self.total_lines = len(self.lines)
+        if isinstance(content, str):
+            self.lines = content.split('\n')
+        else:
+            self.lines = content
         self.current_line = max(0, min(start_line, max(0, self.total_lines - 1)))
         self.on_position_change = on_position_change
         
@@ -38,38 +67,95 @@ class InteractivePager:
         
         # 可显示行数（留一行给状态栏）
         self.display_lines = max(1, self.terminal_height - 1)
+
+        # 屏幕上当前显示内容的起始行号（尚未显示时为None），用于增量刷新
+        self._painted_line: Optional[int] = None
+        # 屏幕上的状态栏是否显示内容仍在排版（估算的总行数）
+        self._painted_growing = False
+        self.renderer = FrameRenderer()
+
+        # 终端尺寸变化信号的唤醒管道与原有设置，运行时安装
+        self._resize_state = None
+
+    @property
+    def total_lines(self) -> int:
+        """当前可显示的总行数（内容增长时随之变化）"""
+        return len(self.lines)
+
+    @property
+    def is_growing(self) -> bool:
+        """内容是否仍在增长"""
+        return not getattr(self.lines, 'complete', True)
     
-    def display_page(self):
-        """显示当前页"""
-        # 使用 ANSI 转义序列清屏并移动光标到左上角
-        # \033[2J 清屏，\033[H 移动光标到 (0,0)
-        sys.stdout.write('\033[2J\033[H')
-        sys.stdout.flush()
+    def _frame_rows(self) -> List[str]:
+        """
+        生成当前位置的一帧
 
-        # 计算结束行
+        Returns:
+            屏幕每一行的文本，最后一行为状态栏
+        """
         end_line = min(self.current_line + self.display_lines, self.total_lines)
-
-        # 显示内容
-        for i in range(self.current_line, end_line):
-            if i < self.total_lines:
-                # 使用 write 而不是 print，确保精确控制输出
-                sys.stdout.write(self.lines[i] + '\r\n')
+        rows = [self.lines[i] for i in range(self.current_line, end_line)]
 
         # 填充剩余空行（保持状态栏在底部）
-        shown_lines = end_line - self.current_line
-        for _ in range(self.display_lines - shown_lines):
-            sys.stdout.write('\r\n')
+        rows.extend([''] * (self.display_lines - len(rows)))
 
-        # 显示状态栏
-        percentage = int((end_line / self.total_lines) * 100) if self.total_lines > 0 else 100
-        status = f"\033[7m {self.current_line + 1}-{end_line}/{self.total_lines} ({percentage}%) | b:上一页/space:下一页 k:上一行/j:下一行 g:首/G:尾 q:退出 \033[0m"
-        sys.stdout.write(status)
-        sys.stdout.flush()
+        # 显示状态栏（内容仍在排版时显示估算的总行数）
+        if self.is_growing:
+            total = max(self.lines.estimated_total_lines(), self.total_lines)
+            total_text = f"~{total}"
+        else:
+            total = self.total_lines
+            total_text = str(total)
+        percentage = int((end_line / total) * 100) if total > 0 else 100
+        status = f"\033[7m {self.current_line + 1}-{end_line}/{total_text} ({percentage}%) | b:上一页/space:下一页 k:上一行/j:下一行 g:首/G:尾 q:退出 \033[0m"
+        rows.append(status)
+        return rows
+
+    def _paint(self, prefix: str = ''):
+        """
+        输出当前位置的一帧（只重绘变化的行）并触发位置回调
+
+        Args:
+            prefix: 放在帧开头的转义序列
+        """
+        self._painted_growing = self.is_growing
+        self.renderer.render(self._frame_rows(), prefix, self.terminal_width)
+        self._painted_line = self.current_line
 
         # 触发回调
         if self.on_position_change:
             self.on_position_change(self.current_line, self.total_lines)
-    
+
+    def display_page(self):
+        """清屏并重绘整个屏幕"""
+        self.renderer.invalidate()
+        self._paint()
+
+    def scroll_display(self, delta: int):
+        """
+        按滚动距离增量刷新屏幕
+
+        内容区设为终端滚动区域，通过删除行/插入行让终端自行移动已显示的内容，
+        之后只需输出新露出的行和状态栏。
+
+        Args:
+            delta: 滚动的行数，正数向下（内容上移），负数向上
+        """
+        self._paint(self.renderer.scroll(delta, self.display_lines))
+
+    def render(self):
+        """刷新屏幕：小距离滚动时让终端移动内容，其余情况只重绘变化的行"""
+        if self._painted_line is None:
+            self.display_page()
+            return
+
+        delta = self.current_line - self._painted_line
+        if 0 < abs(delta) <= self.display_lines // 2:
+            self.scroll_display(delta)
+        else:
+            self._paint()
+
     def next_page(self):
         """下一页"""
         max_start = max(0, self.total_lines - self.display_lines)
@@ -117,6 +203,193 @@ class InteractivePager:
             return True
         return False
     
+    def handle_key(self, ch: str) -> bool:
+        """
+        处理一个移动按键
+
+        Args:
+            ch: 按键字符
+
+        Returns:
+            位置是否改变
+        """
+        if ch == ' ' or ch == 'f':  # 空格或f: 下一页
+            return self.next_page()
+        elif ch == 'b':  # b: 上一页
+            return self.prev_page()
+        elif ch == 'j' or ch == '\r':  # j或回车: 下一行
+            return self.next_line()
+        elif ch == 'k':  # k: 上一行
+            return self.prev_line()
+        elif ch == 'g':  # g: 跳到开头
+            return self.goto_start()
+        elif ch == 'G':  # G: 跳到结尾
+            return self.goto_end()
+        return False
+
+    def handle_keys(self, keys: str) -> bool:
+        """
+        依次处理一批按键，只移动位置不刷新屏幕
+
+        Args:
+            keys: 按键字符序列
+
+        Returns:
+            是否按下了退出键（退出键之后的按键不再处理）
+        """
+        for ch in keys:
+            if ch in self.QUIT_KEYS:
+                return True
+            self.handle_key(ch)
+        return False
+
+    def _read_keys(self, fd: int) -> str:
+        """
+        读取按键：等待至少一个按键，再读出所有已排队的按键
+
+        按住按键自动重复时，积压的按键一次读出、合并处理，只刷新一次屏幕，
+        松开按键后不会继续滚动。
+
+        Args:
+            fd: 终端输入的文件描述符
+
+        Returns:
+            按键字符序列（按键都是单字节字符），输入结束时为空
+        """
+        data = os.read(fd, self.KEY_BATCH_BYTES)
+        while data and len(data) < self.KEY_BATCH_BYTES and select.select([fd], [], [], 0)[0]:
+            chunk = os.read(fd, self.KEY_BATCH_BYTES - len(data))
+            if not chunk:
+                break
+            data += chunk
+        return data.decode('latin-1')
+
+    def handle_resize(self, rows: Optional[int] = None, cols: Optional[int] = None) -> bool:
+        """
+        终端尺寸变化后按新尺寸重新排版并重绘，停留在同一段文字上
+
+        Args:
+            rows: 新的终端行数（默认查询终端）
+            cols: 新的终端列数（默认查询终端）
+
+        Returns:
+            尺寸是否发生变化
+        """
+        if rows is None or cols is None:
+            try:
+                # 直接查询终端，环境变量中的 LINES/COLUMNS 只是启动时的尺寸
+                terminal_size = os.get_terminal_size(sys.stdout.fileno())
+            except (AttributeError, OSError, ValueError):
+                terminal_size = shutil.get_terminal_size()
+            rows, cols = terminal_size.lines, terminal_size.columns
+
+        if (rows, cols) == (self.terminal_height, self.terminal_width):
+            return False
+
+        self.terminal_height = rows
+        self.terminal_width = cols
+        self.display_lines = max(1, rows - 1)
+
+        # 按新列宽重新换行，只等待排版到当前位置
+        resize = getattr(self.lines, 'resize', None)
+        if resize is not None:
+            self.current_line = resize(rows, cols, self.current_line)
+        max_start = max(0, self.total_lines - self.display_lines)
+        self.current_line = max(0, min(self.current_line, max_start))
+
+        # 更新滚动区域并重绘整个屏幕
+        if self._painted_line is not None:
+            sys.stdout.write(f'\033[1;{self.display_lines}r')
+            sys.stdout.flush()
+            self.display_page()
+        return True
+
+    def _sync_lines(self) -> bool:
+        """
+        让行序列更新行号（见 content 参数的说明），屏幕上的内容随之平移
+
+        Returns:
+            当前行号是否发生变化
+        """
+        sync = getattr(self.lines, 'sync', None)
+        if sync is None:
+            return False
+        line = sync(self.current_line)
+        if line == self.current_line:
+            return False
+
+        # 同一段文字只是换了行号，已显示的内容仍然有效
+        if self._painted_line is not None:
+            self._painted_line += line - self.current_line
+        self.current_line = line
+        return True
+
+    def _status_outdated(self) -> bool:
+        """
+        排版已经完成而状态栏仍显示估算的总行数（此后不再定期刷新，需要立即重绘）
+
+        Returns:
+            状态栏是否过时
+        """
+        return self._painted_growing and not self.is_growing
+
+    def _wait_resize_settled(self, wake_fd: int) -> None:
+        """
+        读空唤醒管道，并等待连续到达的终端尺寸变化信号停止
+
+        Args:
+            wake_fd: 唤醒管道的读端
+        """
+        while True:
+            while True:
+                try:
+                    if not os.read(wake_fd, 64):
+                        break
+                except BlockingIOError:
+                    break
+            if not select.select([wake_fd], [], [], self.RESIZE_SETTLE_INTERVAL)[0]:
+                return
+
+    def _install_resize_handler(self) -> Optional[int]:
+        """
+        安装终端尺寸变化（SIGWINCH）的处理
+
+        信号到达时向唤醒管道写入一个字节，等待按键的 select 随即返回。
+
+        Returns:
+            唤醒管道的读端，不支持时返回None
+        """
+        sigwinch = getattr(signal, 'SIGWINCH', None)
+        if sigwinch is None:
+            return None
+
+        read_fd, write_fd = os.pipe()
+        os.set_blocking(read_fd, False)
+        os.set_blocking(write_fd, False)
+        try:
+            old_wakeup_fd = signal.set_wakeup_fd(write_fd)
+            old_handler = signal.signal(sigwinch, lambda signum, frame: None)
+        except ValueError:
+            # 只有主线程可以设置信号处理
+            os.close(read_fd)
+            os.close(write_fd)
+            return None
+
+        self._resize_state = (read_fd, write_fd, old_wakeup_fd, old_handler)
+        return read_fd
+
+    def _remove_resize_handler(self) -> None:
+        """恢复原有的信号处理并关闭唤醒管道"""
+        if self._resize_state is None:
+            return
+
+        read_fd, write_fd, old_wakeup_fd, old_handler = self._resize_state
+        signal.signal(signal.SIGWINCH, old_handler)
+        signal.set_wakeup_fd(old_wakeup_fd)
+        os.close(read_fd)
+        os.close(write_fd)
+        self._resize_state = None
+
     def run(self) -> int:
         """
         运行分页器
@@ -126,7 +399,10 @@ class InteractivePager:
         """
         if not sys.stdin.isatty():
             # 非终端模式，直接打印所有内容
-            print(self.content)
+            wait = getattr(self.lines, 'wait', None)
+            if wait is not None:
+                wait()
+            print('\n'.join(self.lines))
             return 0
         
         # 保存终端设置
@@ -136,7 +412,8 @@ class InteractivePager:
         try:
             # 启用 alternate screen buffer（备用屏幕缓冲区）
             # 这样退出时会自动恢复到之前的屏幕状态，就像 vim/less 一样
-            sys.stdout.write('\033[?1049h')
+            # 并把内容区设为滚动区域，状态栏不随内容滚动
+            sys.stdout.write(f'\033[?1049h\033[1;{self.display_lines}r')
             sys.stdout.flush()
 
             # 设置为原始模式
@@ -145,37 +422,49 @@ class InteractivePager:
             # 显示第一页
             self.display_page()
             
+            shown_total = self.total_lines
+
+            # 等待按键的同时等待终端尺寸变化
+            wake_fd = self._install_resize_handler()
+            inputs = [fd] if wake_fd is None else [fd, wake_fd]
+
             while True:
-                # 读取按键
-                ch = sys.stdin.read(1)
+                # 内容仍在增长时定期刷新状态栏
+                waiting = self.is_growing or shown_total != self.total_lines
+                ready, _, _ = select.select(inputs, [], [], self.GROWING_REFRESH_INTERVAL if waiting else None)
 
-                changed = False
+                if wake_fd is not None and wake_fd in ready:
+                    self._wait_resize_settled(wake_fd)
+                    self.handle_resize()
+                    shown_total = self.total_lines
 
-                # 处理按键
-                if ch == 'q' or ch == 'Q':
-                    break
-                elif ch == ' ' or ch == 'f':  # 空格或f: 下一页
-                    changed = self.next_page()
-                elif ch == 'b':  # b: 上一页
-                    changed = self.prev_page()
-                elif ch == 'j' or ch == '\r':  # j或回车: 下一行
-                    changed = self.next_line()
-                elif ch == 'k':  # k: 上一行
-                    changed = self.prev_line()
-                elif ch == 'g':  # g: 跳到开头
-                    changed = self.goto_start()
-                elif ch == 'G':  # G: 跳到结尾
-                    changed = self.goto_end()
-                elif ch == '\x03':  # Ctrl+C
+                synced = self._sync_lines()
+                if fd not in ready:
+                    if synced or self._status_outdated() or (
+                        not ready and (shown_total != self.total_lines or not self.is_growing)
+                    ):
+                        shown_total = self.total_lines
+                        self.render()
+                    continue
+
+                # 读取按键（合并已排队的按键），输入结束时退出
+                keys = self._read_keys(fd)
+                if not keys:
                     break
 
-                # 只在内容改变时重新显示
-                if changed:
-                    self.display_page()
+                # 依次应用所有按键的移动，最后只刷新一次
+                previous_line = self.current_line
+                if self.handle_keys(keys):
+                    break
+                if synced or self.current_line != previous_line or self._status_outdated():
+                    shown_total = self.total_lines
+                    self.render()
 
         finally:
-            # 禁用 alternate screen buffer，恢复到之前的屏幕状态
-            sys.stdout.write('\033[?1049l')
+            self._remove_resize_handler()
+
+            # 恢复滚动区域，禁用 alternate screen buffer，恢复到之前的屏幕状态
+            sys.stdout.write('\033[r\033[?1049l')
             sys.stdout.flush()
 
             # 恢复终端设置
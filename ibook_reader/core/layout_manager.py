@@ -0,0 +1,144 @@
+"""多尺寸排版管理"""
+
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from ..models.document import Document
+from .page_table import PageTable
+from .paginator import Paginator
+
+
+class LayoutManager:
+    """
+    多尺寸排版管理
+
+    为共享的文档按 (可用行数, 可用列数) 缓存页表，同一尺寸只排版一次。
+    页表按最近使用顺序保存在 LRU 中，总字节数超过预算时淘汰最久未使用的页表。
+    只保存文档的弱引用，文档被回收后其页表随之淘汰。可以在多个线程之间共享。
+    """
+
+    # 页表缓存的默认字节预算
+    DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+    def __init__(self, max_bytes: Optional[int] = None, **paginator_options):
+        """
+        初始化排版管理
+
+        Args:
+            max_bytes: 页表缓存的字节预算（默认 DEFAULT_MAX_BYTES）
+            **paginator_options: 创建分页器时的其他参数（如 vectorized、parallel）
+        """
+        self.max_bytes = self.DEFAULT_MAX_BYTES if max_bytes is None else max_bytes
+        self.paginator_options = paginator_options
+
+        # (文档 id, 可用行数, 可用列数) -> (文档弱引用, 页表)；取用时核对文档，避免 id 被复用
+        self._tables: 'OrderedDict[Tuple[int, int, int], Tuple[weakref.ref, PageTable]]' = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get_paginator(self, document: Document, rows: Optional[int] = None, cols: Optional[int] = None) -> Paginator:
+        """
+        获取指定尺寸的分页器，已缓存该尺寸的页表时不再排版
+
+        Args:
+            document: 文档对象
+            rows: 终端行数（默认从环境获取）
+            cols: 终端列数（默认从环境获取）
+
+        Returns:
+            已排版的分页器
+        """
+        paginator = Paginator(document, rows=rows, cols=cols, **self.paginator_options)
+        key = (id(document), paginator.available_rows, paginator.available_cols)
+
+        with self._lock:
+            entry = self._tables.get(key)
+            if entry is not None and entry[0]() is document:
+                self._tables.move_to_end(key)
+                self.hits += 1
+                paginator.set_page_table(entry[1])
+                return paginator
+            self.misses += 1
+
+        # 排版在锁外进行，不阻塞其他尺寸的请求
+        table = paginator.get_page_table()
+
+        with self._lock:
+            self._store(key, document, table)
+
+        return paginator
+
+    def _store(self, key: Tuple[int, int, int], document: Document, table: PageTable) -> None:
+        """
+        保存页表并按字节预算淘汰（调用方需持有锁）
+
+        Args:
+            key: 缓存键
+            document: 文档对象
+            table: 页表
+        """
+        previous = self._tables.pop(key, None)
+        if previous is not None:
+            self._total_bytes -= previous[1].nbytes
+
+        self._tables[key] = (weakref.ref(document), table)
+        self._total_bytes += table.nbytes
+        self._purge()
+
+        # 淘汰最久未使用的页表，刚保存的页表始终保留
+        while self._total_bytes > self.max_bytes and len(self._tables) > 1:
+            _, (_, evicted) = self._tables.popitem(last=False)
+            self._total_bytes -= evicted.nbytes
+
+    def _purge(self) -> None:
+        """淘汰文档已被回收的页表（调用方需持有锁）"""
+        for key in [key for key, (ref, _) in self._tables.items() if ref() is None]:
+            self._total_bytes -= self._tables.pop(key)[1].nbytes
+
+    def invalidate(self, document: Document) -> int:
+        """
+        删除文档的所有缓存页表
+
+        Args:
+            document: 文档对象
+
+        Returns:
+            删除的页表数量
+        """
+        with self._lock:
+            keys = [key for key, (ref, _) in self._tables.items() if ref() is document]
+            for key in keys:
+                self._total_bytes -= self._tables.pop(key)[1].nbytes
+            return len(keys)
+
+    def clear(self) -> None:
+        """清空所有缓存页表（保留命中统计）"""
+        with self._lock:
+            self._tables.clear()
+            self._total_bytes = 0
+
+    @property
+    def total_bytes(self) -> int:
+        """缓存页表占用的总字节数"""
+        return self._total_bytes
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        获取缓存统计
+
+        Returns:
+            包含命中数、未命中数、缓存页表数和占用字节数的字典
+        """
+        with self._lock:
+            self._purge()
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._tables),
+                'bytes': self._total_bytes,
+            }
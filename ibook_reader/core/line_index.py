@@ -0,0 +1,238 @@
+"""换行索引"""
+
+import bisect
+from array import array
+from typing import Iterator, List, Sequence, Tuple
+
+from ..models.document import Chapter
+from .page_table import PageTable
+
+
+class WrappedLineIndex:
+    """
+    换行索引
+
+    记录某一列宽下每个章节所有显示行的起始偏移，与终端行数无关。
+    任意可用行数下的页表都可以由它按行号直接算出，无需重新换行。
+    """
+
+    __slots__ = ('cols', 'chapter_line_starts', 'trailing_empty_lines', 'nbytes', '_page_starts', '_page_rows')
+
+    def __init__(self, cols: int):
+        """
+        初始化换行索引
+
+        Args:
+            cols: 换行使用的可用列数
+        """
+        self.cols = cols
+        self.chapter_line_starts: List[array] = []
+        self.trailing_empty_lines = array('l')
+        # 各章节行起始偏移占用的字节数
+        self.nbytes = 0
+        # 某一可用行数下各章节第一页的下标（页数前缀和，比章节数多一项，最后一项为总页数）
+        self._page_starts = array('q', [0])
+        self._page_rows = 0
+
+    def add_chapter(self, line_starts: array, trailing_empty: int) -> None:
+        """
+        追加一个章节的换行结果
+
+        Args:
+            line_starts: 章节每个显示行的起始偏移
+            trailing_empty: 章节末尾连续空行的数量
+        """
+        self.chapter_line_starts.append(line_starts)
+        self.trailing_empty_lines.append(trailing_empty)
+        self.nbytes += len(line_starts) * line_starts.itemsize
+
+    @property
+    def chapter_count(self) -> int:
+        """已换行的章节数"""
+        return len(self.chapter_line_starts)
+
+    def page_starts(self, rows: int) -> array:
+        """
+        获取各已换行章节第一页的下标（页数前缀和）
+
+        前缀和按最近一次使用的可用行数保存，追加章节后只补上新章节，
+        可用行数变化时才重新计算。
+
+        Args:
+            rows: 每页可用行数
+
+        Returns:
+            比已换行章节数多一项的数组，最后一项为这些章节的总页数（调用方不能修改）
+        """
+        page_starts = self._page_starts
+        if rows != self._page_rows:
+            del page_starts[1:]
+            self._page_rows = rows
+        for i in range(len(page_starts) - 1, self.chapter_count):
+            page_starts.append(page_starts[-1] + self.chapter_page_count(i, rows))
+        return page_starts
+
+    def find_chapter(self, page: int, rows: int) -> int:
+        """
+        二分查找页下标所在的章节（没有页面的章节不会被选中）
+
+        Args:
+            page: 页下标（从0开始，须小于已换行章节的总页数）
+            rows: 每页可用行数
+
+        Returns:
+            章节索引
+        """
+        return bisect.bisect_right(self.page_starts(rows), page) - 1
+
+    @property
+    def total_lines(self) -> int:
+        """所有章节的显示行总数"""
+        return sum(len(line_starts) for line_starts in self.chapter_line_starts)
+
+    @staticmethod
+    def line_end(content: str, line_starts: array, line: int) -> int:
+        """
+        计算显示行的结束偏移
+
+        下一显示行若从新的一行开始，两者之间隔着一个换行符；
+        否则是同一行的换行段，首尾相接。
+
+        Args:
+            content: 章节内容
+            line_starts: 章节每个显示行的起始偏移
+            line: 显示行下标
+
+        Returns:
+            显示行的结束偏移（不含）
+        """
+        if line + 1 < len(line_starts):
+            next_start = line_starts[line + 1]
+            if content[next_start - 1] == '\n':
+                return next_start - 1
+            return next_start
+        return len(content)
+
+    def chapter_page_count(self, chapter_index: int, rows: int) -> int:
+        """
+        计算章节在指定可用行数下的页数
+
+        Args:
+            chapter_index: 章节索引
+            rows: 每页可用行数
+
+        Returns:
+            章节页数（末尾多余的空行不单独成页）
+        """
+        return self.page_count(
+            len(self.chapter_line_starts[chapter_index]),
+            self.trailing_empty_lines[chapter_index],
+            rows
+        )
+
+    @staticmethod
+    def page_count(line_count: int, trailing_empty: int, rows: int) -> int:
+        """
+        由显示行数计算页数
+
+        Args:
+            line_count: 显示行数
+            trailing_empty: 末尾连续空行的数量
+            rows: 每页可用行数
+
+        Returns:
+            页数（最后一页只剩空行时不单独成页）
+        """
+        full_pages, remainder = divmod(line_count, rows)
+        if remainder > trailing_empty:
+            return full_pages + 1
+        return full_pages
+
+    def iter_chapter_pages(self, chapter_index: int, content: str, rows: int) -> Iterator[Tuple[int, int]]:
+        """
+        按可用行数依次生成章节每页的起止偏移
+
+        Args:
+            chapter_index: 章节索引
+            content: 章节内容
+            rows: 每页可用行数
+
+        Yields:
+            (起始偏移, 结束偏移) 元组
+        """
+        line_starts = self.chapter_line_starts[chapter_index]
+        trailing_empty = self.trailing_empty_lines[chapter_index]
+
+        for page in range(self.chapter_page_count(chapter_index, rows)):
+            first_line, last_line = self.page_lines(page, len(line_starts), trailing_empty, rows)
+            yield line_starts[first_line], self.line_end(content, line_starts, last_line)
+
+    def chapter_page(self, chapter_index: int, content: str, rows: int, page: int) -> Tuple[int, int]:
+        """
+        计算章节内某一页的起止偏移
+
+        Args:
+            chapter_index: 章节索引
+            content: 章节内容
+            rows: 每页可用行数
+            page: 章内页下标（从0开始，须小于章节页数）
+
+        Returns:
+            (起始偏移, 结束偏移) 元组
+        """
+        line_starts = self.chapter_line_starts[chapter_index]
+        first_line, last_line = self.page_lines(
+            page, len(line_starts), self.trailing_empty_lines[chapter_index], rows
+        )
+        return line_starts[first_line], self.line_end(content, line_starts, last_line)
+
+    @staticmethod
+    def page_lines(page: int, line_count: int, trailing_empty: int, rows: int) -> Tuple[int, int]:
+        """
+        计算章节内某一页的首末显示行
+
+        Args:
+            page: 章内页下标（从0开始，须小于章节页数）
+            line_count: 章节显示行数
+            trailing_empty: 章节末尾连续空行的数量
+            rows: 每页可用行数
+
+        Returns:
+            (首行下标, 末行下标) 元组
+        """
+        first_line = page * rows
+        last_line = min(first_line + rows, line_count) - 1
+        if last_line == line_count - 1 and last_line - first_line + 1 < rows:
+            # 最后一页不完整时去掉末尾多余的空行
+            last_line -= trailing_empty
+        return first_line, last_line
+
+    def build_page_table(self, chapters: Sequence[Chapter], rows: int) -> PageTable:
+        """
+        按可用行数生成页表
+
+        Args:
+            chapters: 章节列表（与换行索引一一对应）
+            rows: 每页可用行数
+
+        Returns:
+            页表
+        """
+        table = PageTable()
+
+        for i, chapter in enumerate(chapters):
+            table.start_chapter()
+            for start, end in self.iter_chapter_pages(i, chapter.content, rows):
+                table.append(chapter.index, start, end)
+
+            # 最后一页的显示行数
+            page_count = self.chapter_page_count(i, rows)
+            last_lines = 0
+            if page_count:
+                first_line, last_line = self.page_lines(
+                    page_count - 1, len(self.chapter_line_starts[i]), self.trailing_empty_lines[i], rows
+                )
+                last_lines = last_line - first_line + 1
+            table.chapter_last_lines.append(last_lines)
+
+        return table
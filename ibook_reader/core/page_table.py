@@ -0,0 +1,201 @@
+"""紧凑页表"""
+
+import bisect
+import struct
+from array import array
+from typing import Optional, Tuple
+
+
+# 序列化头部：魔数、页数、章节数、末页行数的章节数（各列之后按 int64 原样存放）
+_HEADER = struct.Struct('<4sQQQ')
+_MAGIC = b'IBP2'
+
+
+class PageTable:
+    """
+    紧凑页表
+
+    每页只记录所属章节索引和在章节内容中的起止字符偏移，
+    按列存放在 array 中，页面文本在需要时再从章节内容切出。
+    另外记录每个章节第一页的下标（页数前缀和），用于章节与页码互查；由换行索引
+    生成时还记录每个章节最后一页的显示行数（其余各页都是满页），不换行即可得出
+    每页的显示行数。
+    """
+
+    __slots__ = ('chapter_indices', 'start_offsets', 'end_offsets', 'chapter_starts', 'chapter_last_lines')
+
+    def __init__(self):
+        self.chapter_indices = array('l')
+        self.start_offsets = array('q')
+        self.end_offsets = array('q')
+        self.chapter_starts = array('q')
+        # 各章节最后一页的显示行数（不含章节标题，没有页面的章节为0），没有记录时为空
+        self.chapter_last_lines = array('q')
+
+    def __len__(self) -> int:
+        return len(self.chapter_indices)
+
+    @property
+    def nbytes(self) -> int:
+        """页表占用的字节数"""
+        return sum(
+            len(column) * column.itemsize
+            for column in self._columns()
+        )
+
+    def _columns(self) -> Tuple[array, ...]:
+        """按序列化顺序返回各列"""
+        return (
+            self.chapter_indices, self.start_offsets, self.end_offsets,
+            self.chapter_starts, self.chapter_last_lines
+        )
+
+    def start_chapter(self) -> None:
+        """开始一个新章节，记录其第一页的下标"""
+        self.chapter_starts.append(len(self.chapter_indices))
+
+    def append(self, chapter_index: int, start: int, end: int) -> None:
+        """
+        追加一页
+
+        Args:
+            chapter_index: 章节索引
+            start: 页面在章节内容中的起始偏移
+            end: 页面在章节内容中的结束偏移（不含）
+        """
+        self.chapter_indices.append(chapter_index)
+        self.start_offsets.append(start)
+        self.end_offsets.append(end)
+
+    def has_line_counts(self) -> bool:
+        """是否记录了每个章节最后一页的显示行数"""
+        return len(self.chapter_last_lines) == len(self.chapter_starts)
+
+    def page_line_count(self, index: int, rows: int) -> int:
+        """
+        获取页面的显示行数（不含章节标题），须已记录各章节最后一页的显示行数
+
+        Args:
+            index: 页下标（从0开始）
+            rows: 生成页表时的每页可用行数
+
+        Returns:
+            显示行数
+        """
+        chapter_index = self.chapter_indices[index]
+        if index + 1 < len(self.chapter_indices) and self.chapter_indices[index + 1] == chapter_index:
+            return rows
+        return self.chapter_last_lines[chapter_index]
+
+    def get(self, index: int) -> Tuple[int, int, int]:
+        """
+        获取指定下标的页记录
+
+        Args:
+            index: 页下标（从0开始）
+
+        Returns:
+            (章节索引, 起始偏移, 结束偏移) 元组
+        """
+        return (
+            self.chapter_indices[index],
+            self.start_offsets[index],
+            self.end_offsets[index]
+        )
+
+    def chapter_page_range(self, chapter_index: int) -> Tuple[int, int]:
+        """
+        获取章节的页下标范围
+
+        Args:
+            chapter_index: 章节索引（从0开始）
+
+        Returns:
+            (起始页下标, 结束页下标) 元组，不含结束页；章节没有页面时两者相等
+        """
+        start = self.chapter_starts[chapter_index]
+        if chapter_index + 1 < len(self.chapter_starts):
+            return start, self.chapter_starts[chapter_index + 1]
+        return start, len(self.chapter_indices)
+
+    def find_page_index(self, chapter_index: int, offset: int) -> Optional[int]:
+        """
+        查找包含章节内指定字符偏移的页下标（二分查找）
+
+        Args:
+            chapter_index: 章节索引（从0开始）
+            offset: 章节内容中的字符偏移
+
+        Returns:
+            页下标（从0开始）；章节没有页面时返回其前一页，文档开头没有页面时返回None
+        """
+        start, end = self.chapter_page_range(chapter_index)
+        if start == end:
+            return start - 1 if start > 0 else None
+        index = bisect.bisect_right(self.start_offsets, offset, start, end) - 1
+        return max(index, start)
+
+    def clear(self) -> None:
+        """清空页表"""
+        del self.chapter_indices[:]
+        del self.start_offsets[:]
+        del self.end_offsets[:]
+        del self.chapter_starts[:]
+        del self.chapter_last_lines[:]
+
+    def to_bytes(self) -> bytes:
+        """
+        序列化页表
+
+        Returns:
+            页表的二进制表示
+        """
+        parts = [_HEADER.pack(
+            _MAGIC, len(self.chapter_indices), len(self.chapter_starts), len(self.chapter_last_lines)
+        )]
+        for column in self._columns():
+            parts.append(array('q', column).tobytes())
+        return b''.join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'PageTable':
+        """
+        从二进制数据还原页表
+
+        Args:
+            data: to_bytes 生成的数据
+
+        Returns:
+            页表
+
+        Raises:
+            ValueError: 数据格式不正确
+        """
+        if len(data) < _HEADER.size:
+            raise ValueError("页表数据不完整")
+
+        magic, page_count, chapter_count, line_count = _HEADER.unpack_from(data)
+        item_size = array('q').itemsize
+        expected_size = _HEADER.size + (page_count * 3 + chapter_count + line_count) * item_size
+        if magic != _MAGIC or len(data) != expected_size or line_count not in (0, chapter_count):
+            raise ValueError("页表数据格式不正确")
+
+        table = cls()
+        position = _HEADER.size
+        for name, count in (
+            ('chapter_indices', page_count),
+            ('start_offsets', page_count),
+            ('end_offsets', page_count),
+            ('chapter_starts', chapter_count),
+            ('chapter_last_lines', line_count),
+        ):
+            column = array('q')
+            column.frombytes(data[position:position + count * item_size])
+            position += count * item_size
+            target = getattr(table, name)
+            if target.typecode == column.typecode:
+                target.extend(column)
+            else:
+                target.fromlist(column.tolist())
+
+        return table
@@ -1,15 +1,38 @@
 """分页引擎"""
 
+import bisect
+import math
 import os
-from typing import List, Tuple, Optional
+import sys
+import threading
+from array import array
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Iterator, List, Tuple, Optional, Sequence
 from ..models.document import Document, Chapter
-from ..utils.text_utils import get_display_width
+from ..utils.text_utils import (
+    get_width_table, get_code_point_width, get_display_width, is_narrow_text, get_break_flags
+)
+from .page_table import PageTable
+from .line_index import WrappedLineIndex
+from .width_index import HAS_NUMPY, WidthIndex
+
+
+# 一个换行段 (起始偏移, 结束偏移) 元组的大致字节数
+_SEGMENT_NBYTES = sys.getsizeof((0, 0)) + 2 * sys.getsizeof(1 << 20)
 
 
 class Page:
     """页面模型"""
     
-    def __init__(self, content: str, page_number: int, chapter_index: int):
+    def __init__(
+        self,
+        content: str,
+        page_number: int,
+        chapter_index: int,
+        start_offset: int = 0,
+        end_offset: int = 0
+    ):
         """
         初始化页面
         
@@ -17,10 +40,14 @@ class Page:
             content: 页面内容
             page_number: 页码（从1开始）
             chapter_index: 所属章节索引
+            start_offset: 页面在章节内容中的起始偏移
+            end_offset: 页面在章节内容中的结束偏移（不含）
         """
         self.content = content
         self.page_number = page_number
         self.chapter_index = chapter_index
+        self.start_offset = start_offset
+        self.end_offset = end_offset
 
 
 class Paginator:
@@ -32,7 +59,41 @@ class Paginator:
     # 大文档缓存窗口（前后各缓存的页数）
     CACHE_WINDOW = 3
     
-    def __init__(self, document: Document, rows: Optional[int] = None, cols: Optional[int] = None):
+    # 并行排版阈值（待换行的字符数），超过时自动把章节分配到进程池
+    PARALLEL_THRESHOLD = 4_000_000
+    
+    # 并行排版最少章节数
+    PARALLEL_MIN_CHAPTERS = 2
+    
+    # 排版算法版本，换行或分页规则变化时递增，使持久化的页表失效
+    LAYOUT_VERSION = 2
+    
+    # 估算页数时抽样换行的总行数，以及每个章节至少抽样的行数
+    ESTIMATE_SAMPLE_LINES = 512
+    ESTIMATE_MIN_SAMPLES = 4
+    
+    # 按偏移定位时，目标章节之前尚未换行的字符数超过该值则不再先补齐之前的章节，
+    # 而是从估计的页码开始编号（见 find_page_by_offset）
+    ANCHOR_GAP_CHARS = 1 << 18
+    
+    # 换行结果缓存的条目数，以及参与缓存的最长行（更长的段落很少重复）
+    WRAP_CACHE_SIZE = 4096
+    WRAP_CACHE_MAX_LINE = 80
+    
+    # 超长行流式换行的阈值与窗口大小（字符数）；超过阈值的章节不缓存整章的
+    # 断行标记和宽度索引，逐行切片换行，内存占用与单行长度无关
+    STREAM_WRAP_THRESHOLD = 1 << 20
+    STREAM_WRAP_WINDOW = 1 << 16
+    
+    def __init__(
+        self,
+        document: Document,
+        rows: Optional[int] = None,
+        cols: Optional[int] = None,
+        vectorized: Optional[bool] = None,
+        parallel: Optional[bool] = None,
+        memory_budget: Optional[int] = None
+    ):
         """
         初始化分页器
         
@@ -40,8 +101,14 @@ class Paginator:
             document: 文档对象
             rows: 终端行数（默认从环境获取）
             cols: 终端列数（默认从环境获取）
+            vectorized: 是否使用 NumPy 累计宽度排版（默认在 NumPy 可用时使用，不可用时自动退回逐字符换行）
+            parallel: 是否并行换行各章节（默认按文档大小自动决定）
+            memory_budget: 内存预算（字节），超出时淘汰已生成的页面和可重建的缓存，默认不限制
         """
         self.document = document
+        self.vectorized = HAS_NUMPY if vectorized is None else vectorized and HAS_NUMPY
+        self.parallel = parallel
+        self.memory_budget = memory_budget
         self.terminal_rows = rows or self._get_terminal_rows()
         self.terminal_cols = cols or self._get_terminal_cols()
         
@@ -49,10 +116,53 @@ class Paginator:
         self.available_rows = self._calculate_available_rows()
         self.available_cols = self._calculate_available_cols()
         
-        # 页面缓存
-        self._pages_cache: List[Page] = []
+        # 换行索引（只与列宽有关，行数变化时保留）
+        self._line_index: Optional[WrappedLineIndex] = None
+        
+        # 先于前面章节换行的章节（章节索引 -> 换行结果），轮到时直接并入换行索引
+        self._wrapped_ahead: Dict[int, Tuple[array, int]] = {}
+        
+        # 提前定位的章节 (章节索引, 估计的第一页下标, 定位时已换行章节的总页数)：之前的章节
+        # 尚未全部换行时，该章节前后的页码相对于估计的第一页编号（见 find_page_by_offset）
+        self._anchor: Optional[Tuple[int, int, int]] = None
+        # 从定位章节起向后、以及从其前一章起向前已换行章节的页数前缀和
+        self._anchor_pages = array('q', [0])
+        self._anchor_back_pages = array('q', [0])
+        # 尚未交给调用方的页码变化 [(不变的最大页码, 之后页码的偏移量)]，见 sync_page_number()
+        self._page_shifts: List[Tuple[int, int]] = []
+        
+        # 尚未换行章节的显示行数估计（章节索引 -> (估计行数, 方差)），列宽变化时清空
+        self._line_estimates: Dict[int, Tuple[float, float]] = {}
+        self._document_chars: Optional[int] = None
+        
+        # 估计页数与方差的后缀和 (列宽, 行数, 起始章节, 页数后缀和, 方差后缀和)，
+        # 每次估算总页数时不必再逐章累加
+        self._estimate_suffix: Optional[Tuple[int, int, int, array, array]] = None
+        
+        # 页表缓存（排版后常驻）
+        self._page_table: Optional[PageTable] = None
         self._cache_valid = False
         self._is_small_doc = False
+        
+        # 已生成的页面缓存（大文档只保留当前位置附近的窗口）
+        self._page_cache: 'OrderedDict[int, Page]' = OrderedDict()
+        self._page_cache_bytes = 0
+        self._last_page_number = 0
+        # 最近获取的页面所在的章节，超出内存预算时不丢弃其缓存
+        self._active_chapter: Optional[int] = None
+        
+        # 章节累计宽度索引（与列宽无关，尺寸变化后仍可复用）
+        self._width_indexes: Dict[int, WidthIndex] = {}
+        
+        # 章节断行位置标记（与列宽无关，尺寸变化后仍可复用）
+        self._break_flags: Dict[int, bytes] = {}
+        self._chapter_cache_bytes = 0
+        
+        # 整行换行结果的LRU缓存 ((行文本, 列宽) -> 换行段)，重复的行不再重新换行
+        self._wrap_cache: 'OrderedDict[Tuple[str, int], List[Tuple[int, int]]]' = OrderedDict()
+        self._wrap_cache_bytes = 0
+        self.wrap_cache_hits = 0
+        self.wrap_cache_misses = 0
     
     def _get_terminal_rows(self) -> int:
         """获取终端行数"""
@@ -84,7 +194,7 @@ class Paginator:
     
     def update_terminal_size(self, rows: int, cols: int) -> None:
         """
-        更新终端尺寸并重新计算分页
+        更新终端尺寸并重新计算分页（只改变行数时不重新换行）
         
         Args:
             rows: 新的行数
@@ -95,148 +205,896 @@ class Paginator:
         self.available_rows = self._calculate_available_rows()
         self.available_cols = self._calculate_available_cols()
         
-        # 使缓存失效
+        # 使页表缓存失效（列宽未变时换行索引继续使用），原有页码全部失效
         self._cache_valid = False
-        self._pages_cache.clear()
+        self._page_table = None
+        self._clear_anchor()
+        self._page_shifts.clear()
+        self._page_cache.clear()
+        self._page_cache_bytes = 0
+        self._last_page_number = 0
     
-    def paginate(self) -> List[Page]:
+    def paginate(self) -> Sequence[Page]:
         """
         执行分页
+
+        Returns:
+            页面序列（按需从页表生成页面内容）
+        """
+        return _PageView(self, self._get_page_table())
+    
+    def _get_page_table(self) -> PageTable:
+        """
+        获取页表，必要时由换行索引重新生成
         
         Returns:
-            页面列表
+            页表
         """
         # 如果缓存有效，直接返回
-        if self._cache_valid and self._pages_cache:
-            return self._pages_cache
+        if self._cache_valid and self._page_table is not None:
+            return self._page_table
         
-        pages = []
-        page_number = 1
+        line_index = self._get_line_index()
+        table = line_index.build_page_table(self.document.chapters, self.available_rows)
+        
+        # 判断是否为小文档（小文档缓存全部页面，大文档只缓存窗口）
+        self._is_small_doc = line_index.total_lines < self.SMALL_DOC_THRESHOLD
+        
+        self._page_table = table
+        self._cache_valid = True
+        
+        return table
+    
+    def get_page_table(self) -> PageTable:
+        """
+        获取当前尺寸下的完整页表（尚未排版时先完成排版）
+        
+        Returns:
+            页表
+        """
+        return self._get_page_table()
+    
+    def set_page_table(self, table: PageTable) -> None:
+        """
+        使用已有的页表（如磁盘缓存中的页表），跳过排版
+        
+        页表必须是同一文档在当前尺寸下由相同版本的排版算法生成的。
+        
+        Args:
+            table: 页表
+            
+        Raises:
+            ValueError: 页表的章节数与文档不一致
+        """
+        if len(table.chapter_starts) != len(self.document.chapters):
+            raise ValueError("页表与文档章节数不一致")
+        
+        self._page_table = table
+        self._cache_valid = True
+        self._is_small_doc = len(table) * self.available_rows < self.SMALL_DOC_THRESHOLD
+        self._page_cache.clear()
+        self._page_cache_bytes = 0
+        self._last_page_number = 0
+    
+    def _get_line_index(self, chapter_count: Optional[int] = None) -> WrappedLineIndex:
+        """
+        获取当前列宽下的换行索引，列宽变化时重新换行
+        
+        Args:
+            chapter_count: 至少需要换行的章节数（默认全部章节）
+            
+        Returns:
+            换行索引
+        """
+        if self._line_index is None or self._line_index.cols != self.available_cols:
+            self._line_index = WrappedLineIndex(self.available_cols)
+            self._wrapped_ahead.clear()
+            self._line_estimates.clear()
+            self._clear_anchor()
+        
+        line_index = self._line_index
+        chapters = self.document.chapters
+        if chapter_count is None or chapter_count > len(chapters):
+            chapter_count = len(chapters)
+        
+        # 按顺序补齐尚未换行的章节，已提前换行的章节直接使用
+        pending = chapters[line_index.chapter_count:chapter_count]
+        ahead = self._wrapped_ahead
+        wrapped = self._iter_wrapped_chapters([c for c in pending if c.index not in ahead])
+        for chapter in pending:
+            if chapter.index in ahead:
+                self._add_wrapped_chapter(line_index, *ahead[chapter.index])
+            else:
+                self._add_wrapped_chapter(line_index, *next(wrapped))
+        
+        # 最后换行的章节通常就是接下来要显示的章节
+        if pending:
+            self._enforce_memory_budget(pending[-1].index)
+        
+        return line_index
+    
+    def _add_wrapped_chapter(self, line_index: WrappedLineIndex, line_starts: array, trailing_empty: int) -> None:
+        """
+        把下一个章节的换行结果记入换行索引，越过提前定位的章节时改为实际页码
+        
+        Args:
+            line_index: 当前列宽的换行索引
+            line_starts: 章节每个显示行的起始偏移
+            trailing_empty: 章节末尾连续空行的数量
+        """
+        line_index.add_chapter(line_starts, trailing_empty)
+        # 提前换行的结果并入后不再单独保留
+        self._wrapped_ahead.pop(line_index.chapter_count - 1, None)
+        
+        anchor = self._anchor
+        if anchor is None or line_index.chapter_count <= anchor[0]:
+            return
+        
+        # 定位章节的实际第一页与估计值之差，即之前按估计值编号的页码需要的偏移
+        chapter_index, first_page, boundary = anchor
+        shift = line_index.page_starts(self.available_rows)[chapter_index] - first_page
+        self._clear_anchor()
+        if shift:
+            self._page_shifts.append((boundary + 1, shift))
+            self._page_cache.clear()
+            self._page_cache_bytes = 0
+            self._last_page_number = 0
+    
+    def _clear_anchor(self) -> None:
+        """取消提前定位（已提前换行的章节保留）"""
+        self._anchor = None
+        del self._anchor_pages[1:]
+        del self._anchor_back_pages[1:]
+    
+    def _iter_wrapped_chapters(self, chapters: Sequence[Chapter]) -> Iterator[Tuple[array, int]]:
+        """
+        按章节顺序生成换行结果，文档较大时并行换行
+        
+        各章节的换行互不依赖，页码由换行索引中的页数前缀和得出，
+        因此可以把章节分配到进程池（或线程池）中并行处理，再按原顺序取回结果。
+        每个工作进程或线程使用自己的分页器换行，不共享本分页器的缓存。
+        
+        Args:
+            chapters: 待换行的章节（按章节顺序）
+            
+        Yields:
+            (每个显示行的起始偏移, 末尾连续空行数) 元组
+        """
+        executor = self._create_layout_executor(chapters)
+        if executor is None:
+            for chapter in chapters:
+                yield self._wrap_chapter(chapter)
+            return
+        
+        # 每批只发送其章节的文本，不把整个文档传给工作进程
+        batch_size = max(1, len(chapters) // ((os.cpu_count() or 1) * 4))
+        futures = []
+        try:
+            for batch_start in range(0, len(chapters), batch_size):
+                batch = chapters[batch_start:batch_start + batch_size]
+                futures.append(executor.submit(
+                    _wrap_chapters_task, [(chapter.index, chapter.content) for chapter in batch]
+                ))
+            for future in futures:
+                yield from future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+    
+    def _use_parallel_layout(self, chapters: Sequence[Chapter]) -> bool:
+        """
+        判断是否并行换行
+        
+        Args:
+            chapters: 待换行的章节
+            
+        Returns:
+            是否并行换行
+        """
+        if (os.cpu_count() or 1) < 2 or len(chapters) < self.PARALLEL_MIN_CHAPTERS:
+            return False
+        if self.parallel is not None:
+            return self.parallel
+        return sum(len(chapter.content) for chapter in chapters) >= self.PARALLEL_THRESHOLD
+    
+    def _create_layout_executor(self, chapters: Sequence[Chapter]) -> Optional[Executor]:
+        """
+        按需创建并行换行使用的执行器
         
-        # 遍历所有章节
-        for chapter in self.document.chapters:
-            # 对每个章节进行分页
-            chapter_pages = self._paginate_chapter(chapter, page_number)
-            pages.extend(chapter_pages)
-            page_number += len(chapter_pages)
+        Args:
+            chapters: 待换行的章节
+            
+        Returns:
+            执行器；不需要或无法并行时返回None
+        """
+        if not self._use_parallel_layout(chapters):
+            return None
         
-        # 判断是否为小文档
-        total_lines = sum(len(page.content.splitlines()) for page in pages)
-        self._is_small_doc = total_lines < self.SMALL_DOC_THRESHOLD
+        workers = min(os.cpu_count() or 1, len(chapters))
+        initargs = (self.available_cols, self.vectorized)
         
-        # 如果是小文档，缓存所有页面
-        if self._is_small_doc:
-            self._pages_cache = pages
-            self._cache_valid = True
+        # 无 GIL 的 Python 直接使用线程池；在后台线程中（如后台排版）创建进程池
+        # 会在多线程进程中 fork，同样改用线程池
+        if (
+            not getattr(sys, '_is_gil_enabled', lambda: True)()
+            or threading.current_thread() is not threading.main_thread()
+        ):
+            return ThreadPoolExecutor(
+                max_workers=workers, initializer=_init_layout_worker, initargs=initargs
+            )
         
-        return pages
+        try:
+            return ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_layout_worker, initargs=initargs
+            )
+        except (OSError, NotImplementedError, ValueError):
+            # 运行环境不支持多进程时退回单线程换行
+            return None
     
-    def _paginate_chapter(self, chapter: Chapter, start_page_number: int) -> List[Page]:
+    def _wrap_chapter(self, chapter: Chapter) -> Tuple[array, int]:
         """
-        对单个章节进行分页
+        对单个章节进行换行
         
         Args:
             chapter: 章节对象
-            start_page_number: 起始页码
             
         Returns:
-            章节的页面列表
+            (每个显示行的起始偏移, 末尾连续空行数) 元组
         """
-        pages = []
-        page_number = start_page_number
+        if self._use_width_index(chapter):
+            return self._get_width_index(chapter).wrap_chapter(self.available_cols)
         
-        # 按行分割内容，保留原始换行结构
-        lines = chapter.content.split('\n')
-        current_lines = []
+        line_starts = array('q')
+        trailing_empty = 0
         
-        for line in lines:
+        for start, end in self._iter_chapter_lines(chapter):
+            line_starts.append(start)
+            # 只有空行会产生空的换行段
+            trailing_empty = trailing_empty + 1 if end == start else 0
+        
+        return line_starts, trailing_empty
+    
+    def _iter_chapter_lines(self, chapter: Chapter) -> Iterator[Tuple[int, int]]:
+        """
+        逐行换行，依次生成章节每个显示行在章节内容中的起止偏移
+        
+        Args:
+            chapter: 章节对象
+            
+        Yields:
+            (起始偏移, 结束偏移) 元组
+        """
+        if len(chapter.content) > self.STREAM_WRAP_THRESHOLD:
+            yield from self._iter_large_chapter_lines(chapter.content)
+            return
+        
+        if self._use_width_index(chapter):
+            # 在累计宽度索引上整章批量换行
+            yield from self._get_width_index(chapter).iter_lines(self.available_cols)
+            return
+        
+        breaks = self._get_break_flags(chapter)
+        position = 0
+        
+        # 按行分割内容，保留原始换行结构
+        for line in chapter.content.split('\n'):
             # 对每行进行自动换行
-            wrapped_lines = self._wrap_line(line)
+            for start, end in self._wrap_cached(line, breaks, position):
+                yield position + start, position + end
             
-            # 将换行后的行添加到当前页
-            for wrapped_line in wrapped_lines:
-                current_lines.append(wrapped_line)
-                
-                # 如果当前页已满，创建新页
-                if len(current_lines) >= self.available_rows:
-                    page_content = '\n'.join(current_lines[:self.available_rows])
-                    pages.append(Page(page_content, page_number, chapter.index))
-                    page_number += 1
-                    current_lines = current_lines[self.available_rows:]
+            position += len(line) + 1
+    
+    def _iter_large_chapter_lines(self, content: str, start: int = 0) -> Iterator[Tuple[int, int]]:
+        """
+        逐行换行超大章节，不复制整章内容
         
-        # 创建最后一页（如果有剩余内容）
-        if current_lines:
-            # 移除末尾多余的空行
-            while current_lines and not current_lines[-1]:
-                current_lines.pop()
+        Args:
+            content: 章节内容
+            start: 起始偏移（须为原始行的开头）
             
-            if current_lines:
-                page_content = '\n'.join(current_lines)
-                pages.append(Page(page_content, page_number, chapter.index))
+        Yields:
+            (起始偏移, 结束偏移) 元组
+        """
+        length = len(content)
+        position = start
         
-        return pages
+        while True:
+            line_end = content.find('\n', position)
+            if line_end < 0:
+                line_end = length
+            
+            if line_end - position > self.STREAM_WRAP_THRESHOLD:
+                yield from self._iter_wrap_stream(content, position, line_end)
+            else:
+                for start, end in self._wrap_cached(content[position:line_end]):
+                    yield position + start, position + end
+            
+            if line_end == length:
+                return
+            position = line_end + 1
     
-    def _wrap_line(self, line: str) -> List[str]:
+    def _iter_wrap_stream(self, content: str, start: int, end: int) -> Iterator[Tuple[int, int]]:
         """
-        对单行进行自动换行
+        按固定大小的窗口流式换行超长行
+        
+        每次只切出 STREAM_WRAP_WINDOW 个字符换行，窗口最后一段可能还能接上
+        后面的字符，留到下一个窗口重新换行，其余各段与整行换行的结果相同。
+        
+        Args:
+            content: 行所在的文本
+            start: 行的起始偏移
+            end: 行的结束偏移（不含）
+            
+        Yields:
+            (起始偏移, 结束偏移) 元组
+        """
+        window = self.STREAM_WRAP_WINDOW
+        
+        # 只含空白的行与普通行一样作为一个显示行
+        if all(not content[p:min(p + window, end)].strip() for p in range(start, end, window)):
+            yield start, end
+            return
+        
+        position = start
+        size = window
+        while position < end:
+            window_end = min(position + size, end)
+            segments = self._wrap_offsets(content[position:window_end], whole_line=False)
+            if window_end < end:
+                if len(segments) == 1:
+                    # 整个窗口还放不满一行（如大量零宽字符），扩大窗口重试
+                    size *= 2
+                    continue
+                segments.pop()
+            for segment_start, segment_end in segments:
+                yield position + segment_start, position + segment_end
+            position += segments[-1][1]
+            size = window
+    
+    def _use_width_index(self, chapter: Chapter) -> bool:
+        """
+        判断章节是否使用累计宽度索引换行
+        
+        只含单宽字符的章节逐行切片更快，超大章节流式换行。
+        
+        Args:
+            chapter: 章节对象
+            
+        Returns:
+            是否使用累计宽度索引
+        """
+        content = chapter.content
+        return self.vectorized and len(content) <= self.STREAM_WRAP_THRESHOLD and not is_narrow_text(content)
+    
+    def _get_width_index(self, chapter: Chapter) -> WidthIndex:
+        """
+        获取章节的累计宽度索引（首次使用时构建）
+        
+        Args:
+            chapter: 章节对象
+            
+        Returns:
+            累计宽度索引
+        """
+        width_index = self._width_indexes.get(chapter.index)
+        if width_index is None:
+            width_index = WidthIndex(chapter.content, self._get_break_flags(chapter))
+            self._width_indexes[chapter.index] = width_index
+            self._chapter_cache_bytes += width_index.nbytes
+            self._enforce_memory_budget(chapter.index, evict_pages=False)
+        return width_index
+    
+    def _get_break_flags(self, chapter: Chapter) -> Optional[bytes]:
+        """
+        获取章节的断行位置标记（首次使用时计算）
+        
+        Args:
+            chapter: 章节对象
+            
+        Returns:
+            与章节内容等长的断行标记，超大章节返回None（由各行自行计算）
+        """
+        if len(chapter.content) > self.STREAM_WRAP_THRESHOLD:
+            return None
+        
+        breaks = self._break_flags.get(chapter.index)
+        if breaks is None:
+            breaks = get_break_flags(chapter.content)
+            self._break_flags[chapter.index] = breaks
+            self._chapter_cache_bytes += len(breaks)
+            self._enforce_memory_budget(chapter.index, evict_pages=False)
+        return breaks
+    
+    def _wrap_offsets(
+        self,
+        line: str,
+        whole_line: bool = True,
+        breaks: Optional[bytes] = None,
+        base: int = 0
+    ) -> List[Tuple[int, int]]:
+        """
+        计算单行自动换行后每段的起止偏移
+        
+        每段在放得下的前提下尽量长，并在最后一个允许断行的位置断开（避头尾、
+        不拆开西文单词）；放不下的部分没有可断位置时才在溢出处强制断开。
         
         Args:
             line: 单行文本
+            whole_line: 是否为完整的一行（行片段不做空白行判断）
+            breaks: 断行标记（默认按本行计算）
+            base: 本行在断行标记中的起始下标
             
         Returns:
-            换行后的文本列表
+            (起始偏移, 结束偏移) 列表
         """
         # 空行直接返回
-        if not line.strip():
-            return [line]
+        if whole_line and not line.strip():
+            return [(0, len(line))]
         
-        lines = []
-        current_line = []
+        cols = self.available_cols
+        if breaks is None:
+            breaks = get_break_flags(line)
+            base = 0
+        
+        # 只含单宽字符时每段最多 cols 个字符，只需在段尾之前查找断行位置
+        if is_narrow_text(line):
+            segments = []
+            segment_start = 0
+            while segment_start + cols < len(line):
+                segment_end = breaks.rfind(1, base + segment_start + 1, base + segment_start + cols + 1) - base
+                if segment_end <= segment_start:
+                    segment_end = segment_start + cols
+                segments.append((segment_start, segment_end))
+                segment_start = segment_end
+            segments.append((segment_start, len(line)))
+            return segments
+        
+        table = get_width_table()
+        bmp_size = len(table)
+        segments = []
+        segment_start = 0
         current_width = 0
         
         # 遍历行中的每个字符
-        for char in line:
-            char_width = get_display_width(char)
-            
-            # 检查是否需要换行
-            if current_width + char_width > self.available_cols:
-                # 尝试在合适的位置断行
-                if current_line:
-                    lines.append(''.join(current_line))
-                    current_line = [char]
-                    current_width = char_width
-                else:
-                    # 单个字符就超过宽度，强制添加
-                    current_line.append(char)
-                    lines.append(''.join(current_line))
-                    current_line = []
-                    current_width = 0
+        for i, char in enumerate(line):
+            code_point = ord(char)
+            char_width = table[code_point] if code_point < bmp_size else get_code_point_width(code_point)
+            
+            # 放不下当前字符时，在最后一个可断位置断行，剩余部分移到下一段
+            while current_width + char_width > cols and i > segment_start:
+                segment_end = breaks.rfind(1, base + segment_start + 1, base + i + 1) - base
+                if segment_end <= segment_start:
+                    segment_end = i
+                segments.append((segment_start, segment_end))
+                segment_start = segment_end
+                current_width = get_display_width(line[segment_end:i])
+            
+            if current_width + char_width > cols:
+                # 单个字符就超过宽度，强制添加
+                segments.append((segment_start, i + 1))
+                segment_start = i + 1
+                current_width = 0
             else:
-                current_line.append(char)
                 current_width += char_width
         
-        # 添加最后一行
-        if current_line:
-            lines.append(''.join(current_line))
+        # 添加最后一段
+        if segment_start < len(line):
+            segments.append((segment_start, len(line)))
         
-        return lines if lines else [line]
+        return segments if segments else [(0, len(line))]
+    
+    def _wrap_line(self, line: str) -> List[str]:
+        """
+        对单行进行自动换行
+        
+        Args:
+            line: 单行文本
+            
+        Returns:
+            换行后的文本列表
+        """
+        if len(line) > self.STREAM_WRAP_THRESHOLD:
+            return [line[start:end] for start, end in self._iter_wrap_stream(line, 0, len(line))]
+        return [line[start:end] for start, end in self._wrap_cached(line)]
+    
+    def _wrap_cached(self, line: str, breaks: Optional[bytes] = None, base: int = 0) -> List[Tuple[int, int]]:
+        """
+        计算整行换行后每段的起止偏移，短行的结果按 (行文本, 列宽) 缓存
+        
+        整行的断行位置只取决于行内字符，相同文本在相同列宽下的换行结果相同，
+        书中反复出现的空行、分隔符、对话和套话可以直接复用。
+        
+        Args:
+            line: 单行文本
+            breaks: 断行标记（默认按本行计算）
+            base: 本行在断行标记中的起始下标
+            
+        Returns:
+            (起始偏移, 结束偏移) 列表（与缓存共享，调用方不能修改）
+        """
+        if len(line) > self.WRAP_CACHE_MAX_LINE:
+            return self._wrap_offsets(line, breaks=breaks, base=base)
+        
+        cache = self._wrap_cache
+        key = (line, self.available_cols)
+        segments = cache.get(key)
+        if segments is not None:
+            cache.move_to_end(key)
+            self.wrap_cache_hits += 1
+            return segments
+        
+        self.wrap_cache_misses += 1
+        segments = self._wrap_offsets(line, breaks=breaks, base=base)
+        cache[key] = segments
+        self._wrap_cache_bytes += _wrap_entry_nbytes(line, segments)
+        if len(cache) > self.WRAP_CACHE_SIZE:
+            (evicted_line, _), evicted = cache.popitem(last=False)
+            self._wrap_cache_bytes -= _wrap_entry_nbytes(evicted_line, evicted)
+        
+        return segments
+    
+    def get_wrap_cache_stats(self) -> Dict[str, float]:
+        """
+        获取换行结果缓存的统计
+        
+        Returns:
+            包含命中数、未命中数、命中率和缓存条目数的字典
+        """
+        lookups = self.wrap_cache_hits + self.wrap_cache_misses
+        return {
+            'hits': self.wrap_cache_hits,
+            'misses': self.wrap_cache_misses,
+            'hit_rate': self.wrap_cache_hits / lookups if lookups else 0.0,
+            'entries': len(self._wrap_cache),
+        }
+    
+    def _materialize_page(self, table: PageTable, index: int) -> Page:
+        """
+        根据页表记录生成页面内容
+        
+        Args:
+            table: 页表
+            index: 页下标（从0开始）
+            
+        Returns:
+            页面对象
+        """
+        chapter_index, start, end = table.get(index)
+        return self._build_page(chapter_index, start, end, index + 1)
+    
+    def _build_page(self, chapter_index: int, start: int, end: int, page_number: int) -> Page:
+        """
+        从章节内容切出页面文本并换行
+        
+        Args:
+            chapter_index: 章节索引
+            start: 页面在章节内容中的起始偏移
+            end: 页面在章节内容中的结束偏移（不含）
+            page_number: 页码（从1开始）
+            
+        Returns:
+            页面对象
+        """
+        chapter = self.document.chapters[chapter_index]
+        content = chapter.content
+        # 页面内的原始行以换行符分隔，同一行的换行段之间没有分隔符
+        pieces = content[start:end].split('\n')
+        
+        # 断行标记按整章计算，行片段的断行位置与整章排版时一致
+        breaks = self._get_break_flags(chapter)
+        
+        # 页首、页尾可能落在某一行的中间，这些行片段按普通字符换行
+        first_partial = start > 0 and content[start - 1] != '\n'
+        last_partial = end < len(content) and content[end] != '\n'
+        
+        lines = []
+        last = len(pieces) - 1
+        position = start
+        for i, piece in enumerate(pieces):
+            whole_line = not ((i == 0 and first_partial) or (i == last and last_partial))
+            lines.extend(piece[s:e] for s, e in self._wrap_offsets(piece, whole_line, breaks, position))
+            position += len(piece) + 1
+        
+        return Page('\n'.join(lines), page_number, chapter_index, start, end)
     
     def get_page(self, page_number: int) -> Optional[Page]:
         """
         获取指定页码的页面
         
+        尚未排版时只对到该页为止的章节换行，之后的章节不会换行。
+        
         Args:
             page_number: 页码（从1开始）
             
         Returns:
             页面对象，如果页码无效返回None
         """
-        pages = self.paginate()
+        page = self._load_page(page_number)
+        if page is None:
+            return None
+        self._active_chapter = page.chapter_index
+        
+        # 按阅读方向预取后续页面（只预取已换行章节中的页面；已超出内存预算时
+        # 预取的页面会立即被淘汰，不再预取）
+        direction = -1 if page_number < self._last_page_number else 1
+        if self.memory_budget is None or self.memory_usage()['total'] <= self.memory_budget:
+            for offset in range(1, self.CACHE_WINDOW + 1):
+                if self._load_page(page_number + direction * offset, wrap=False) is None:
+                    break
+        
+        # 当前页放到最近使用的位置，避免被淘汰
+        self._page_cache.move_to_end(page_number)
+        self._last_page_number = page_number
+        self._enforce_memory_budget(page.chapter_index)
+        
+        return page
+    
+    def has_page(self, page_number: int) -> bool:
+        """
+        判断页码是否存在
         
-        if 1 <= page_number <= len(pages):
-            return pages[page_number - 1]
+        尚未排版时只对到该页为止的章节换行。
         
-        return None
+        Args:
+            page_number: 页码（从1开始）
+            
+        Returns:
+            页码是否有效
+        """
+        return page_number in self._page_cache or self._locate_page(page_number) is not None
+    
+    def _locate_page(self, page_number: int, wrap: bool = True) -> Optional[Tuple[int, int, int]]:
+        """
+        查找页面在章节内容中的位置
+        
+        已有页表时直接查表；否则在换行索引的页数前缀和上二分查找所在章节，
+        需要时按顺序对后面的章节换行，找到该页即停止。全部章节换行后生成页表。
+        
+        Args:
+            page_number: 页码（从1开始）
+            wrap: 是否对尚未换行的章节换行（为False时只在已换行的章节中查找）
+            
+        Returns:
+            (章节索引, 起始偏移, 结束偏移) 元组，页码无效时返回None
+        """
+        if page_number < 1:
+            return None
+        
+        chapters = self.document.chapters
+        line_index = self._get_line_index(0)
+        if (self._cache_valid and self._page_table is not None) or line_index.chapter_count == len(chapters):
+            table = self._get_page_table()
+            return table.get(page_number - 1) if page_number <= len(table) else None
+        
+        rows = self.available_rows
+        page = page_number - 1
+        if self._anchor is not None and page >= line_index.page_starts(rows)[-1]:
+            return self._locate_anchored_page(page, wrap)
+        while page >= line_index.page_starts(rows)[-1]:
+            if not wrap or line_index.chapter_count == len(chapters):
+                return None
+            line_index = self._get_line_index(line_index.chapter_count + 1)
+        
+        i = line_index.find_chapter(page, rows)
+        return (i, *line_index.chapter_page(i, chapters[i].content, rows, page - line_index.page_starts(rows)[i]))
+    
+    def _locate_anchored_page(self, page: int, wrap: bool = True) -> Optional[Tuple[int, int, int]]:
+        """
+        按提前定位的编号查找已换行部分之后的页面
+        
+        页面在定位章节之后时向后、在之前时向前逐章累加页数，只对经过的章节换行。
+        
+        Args:
+            page: 页下标（从0开始，不小于已换行章节的总页数）
+            wrap: 是否对尚未换行的章节换行
+            
+        Returns:
+            (章节索引, 起始偏移, 结束偏移) 元组，页码无效时返回None
+        """
+        anchor_index, first_page, _ = self._anchor
+        if page >= first_page:
+            page_starts = self._anchor_pages
+            while first_page + page_starts[-1] <= page:
+                if not self._extend_anchor(True, wrap):
+                    return None
+            i = anchor_index + bisect.bisect_right(page_starts, page - first_page) - 1
+            chapter_start = first_page + page_starts[i - anchor_index]
+        else:
+            page_starts = self._anchor_back_pages
+            while first_page - page_starts[-1] > page:
+                if not self._extend_anchor(False, wrap):
+                    return None
+            distance = bisect.bisect_left(page_starts, first_page - page)
+            i = anchor_index - distance
+            chapter_start = first_page - page_starts[distance]
+        
+        line_starts, trailing_empty = self._wrapped_ahead[i]
+        first_line, last_line = WrappedLineIndex.page_lines(
+            page - chapter_start, len(line_starts), trailing_empty, self.available_rows
+        )
+        content = self.document.chapters[i].content
+        return i, line_starts[first_line], WrappedLineIndex.line_end(content, line_starts, last_line)
+    
+    def _anchored_chapter_start(self, chapter_index: int, wrap: bool = True) -> Optional[int]:
+        """
+        按提前定位的编号计算尚未顺序换行的章节第一页的下标
+        
+        定位章节与该章节之间的章节都会被提前换行。
+        
+        Args:
+            chapter_index: 章节索引（不小于已换行的章节数）
+            wrap: 是否对尚未换行的章节换行
+            
+        Returns:
+            第一页的下标（从0开始），不换行而无法确定时返回None
+        """
+        anchor_index, first_page, _ = self._anchor
+        if chapter_index >= anchor_index:
+            while len(self._anchor_pages) <= chapter_index - anchor_index:
+                if not self._extend_anchor(True, wrap):
+                    return None
+            return first_page + self._anchor_pages[chapter_index - anchor_index]
+        
+        while len(self._anchor_back_pages) <= anchor_index - chapter_index:
+            if not self._extend_anchor(False, wrap):
+                return None
+        return first_page - self._anchor_back_pages[anchor_index - chapter_index]
+    
+    def _extend_anchor(self, forward: bool, wrap: bool = True) -> bool:
+        """
+        从定位章节起向后（或向前）再累加一个章节的页数，需要时提前对该章节换行
+        
+        向后第 k 项是定位章节起 k 个章节的页数和，向前第 k 项是定位章节之前 k 个章节的页数和。
+        
+        Args:
+            forward: 是否向后累加
+            wrap: 是否对尚未换行的章节换行
+            
+        Returns:
+            是否累加了一个章节（已到书的末尾、已换行部分或不换行时为False）
+        """
+        anchor_index = self._anchor[0]
+        if forward:
+            page_starts = self._anchor_pages
+            chapter_index = anchor_index + len(page_starts) - 1
+            if chapter_index >= len(self.document.chapters):
+                return False
+        else:
+            page_starts = self._anchor_back_pages
+            chapter_index = anchor_index - len(page_starts)
+            if chapter_index < self._get_line_index(0).chapter_count:
+                return False
+        
+        wrapped = self._wrapped_ahead.get(chapter_index)
+        if wrapped is None:
+            if not wrap:
+                return False
+            wrapped = self._wrap_chapter(self.document.chapters[chapter_index])
+            self._wrapped_ahead[chapter_index] = wrapped
+        
+        line_starts, trailing_empty = wrapped
+        page_starts.append(page_starts[-1] + WrappedLineIndex.page_count(
+            len(line_starts), trailing_empty, self.available_rows
+        ))
+        return True
+    
+    def sync_page_number(self, page_number: int) -> int:
+        """
+        换算之前取得的页码
+        
+        提前定位（见 find_page_by_offset）之后，定位章节前后的页码是按估计的起始页
+        编号的；之前的章节全部换行后改为实际页码。页码只在这里和完整排版时变化，
+        保存页码的调用方（如 ReaderService）应在再次使用保存的页码前调用。
+        
+        Args:
+            page_number: 之前取得的页码
+            
+        Returns:
+            该页在当前编号下的页码（没有变化时不变）
+        """
+        # 之前的章节都已提前换行时直接并入换行索引
+        if self._anchor is not None:
+            line_index = self._get_line_index(0)
+            while line_index.chapter_count in self._wrapped_ahead and self._anchor is not None:
+                self._add_wrapped_chapter(line_index, *self._wrapped_ahead.pop(line_index.chapter_count))
+        
+        for boundary, shift in self._page_shifts:
+            if page_number > boundary:
+                page_number = max(1, page_number + shift)
+        self._page_shifts.clear()
+        return page_number
+    
+    def _load_page(self, page_number: int, wrap: bool = True) -> Optional[Page]:
+        """
+        从页面缓存获取页面，未命中时生成并放入缓存
+        
+        Args:
+            page_number: 页码（从1开始）
+            wrap: 是否对尚未换行的章节换行（为False时只生成已换行章节中的页面）
+            
+        Returns:
+            页面对象，页码无效时返回None
+        """
+        page = self._page_cache.get(page_number)
+        if page is not None:
+            self._page_cache.move_to_end(page_number)
+            return page
+        
+        location = self._locate_page(page_number, wrap)
+        if location is None:
+            return None
+        page = self._build_page(*location, page_number)
+        self._page_cache[page_number] = page
+        self._page_cache_bytes += _page_nbytes(page)
+        
+        # 大文档按LRU淘汰窗口外的页面（当前页前后各 CACHE_WINDOW 页）
+        if not self._is_small_doc:
+            while len(self._page_cache) > self.CACHE_WINDOW * 2 + 1:
+                _, evicted = self._page_cache.popitem(last=False)
+                self._page_cache_bytes -= _page_nbytes(evicted)
+        
+        return page
+    
+    def memory_usage(self) -> Dict[str, int]:
+        """
+        统计分页器占用的内存
+        
+        Returns:
+            各部分占用的字节数：页表、换行索引、已生成的页面、
+            章节宽度索引与断行标记，以及合计
+        """
+        line_index_bytes = self._line_index.nbytes if self._line_index is not None else 0
+        line_index_bytes += sum(
+            len(line_starts) * line_starts.itemsize for line_starts, _ in self._wrapped_ahead.values()
+        )
+        usage = {
+            'page_table': self._page_table.nbytes if self._page_table is not None else 0,
+            'line_index': line_index_bytes,
+            'pages': self._page_cache_bytes,
+            'wrap_caches': self._chapter_cache_bytes + self._wrap_cache_bytes,
+        }
+        usage['total'] = sum(usage.values())
+        return usage
+    
+    def _enforce_memory_budget(self, keep_chapter: Optional[int] = None, evict_pages: bool = True) -> None:
+        """
+        超出内存预算时淘汰缓存
+        
+        先按最近使用顺序淘汰已生成的页面（预取的页面先于当前页，保留最近使用的
+        一页），页面之后可由页表中的偏移重新生成；仍然超出时再丢弃其他章节的宽度
+        索引和断行标记。正在使用的章节和当前页所在章节的缓存、页表与换行索引
+        不会被淘汰，否则每翻一页都要对整章重新计算。
+        
+        Args:
+            keep_chapter: 正在使用、不能丢弃缓存的章节索引
+            evict_pages: 是否淘汰已生成的页面（生成页面的过程中不淘汰）
+        """
+        budget = self.memory_budget
+        if budget is None:
+            return
+        
+        usage = self.memory_usage()['total']
+        while evict_pages and usage > budget and len(self._page_cache) > 1:
+            _, evicted = self._page_cache.popitem(last=False)
+            freed = _page_nbytes(evicted)
+            self._page_cache_bytes -= freed
+            usage -= freed
+        
+        for cache in (self._width_indexes, self._break_flags):
+            for chapter_index in list(cache):
+                if usage <= budget:
+                    return
+                if chapter_index == keep_chapter or chapter_index == self._active_chapter:
+                    continue
+                evicted = cache.pop(chapter_index)
+                freed = evicted.nbytes if isinstance(evicted, WidthIndex) else len(evicted)
+                self._chapter_cache_bytes -= freed
+                usage -= freed
+        
+        if usage > budget:
+            self._wrap_cache.clear()
+            self._wrap_cache_bytes = 0
     
     def get_total_pages(self) -> int:
         """
@@ -245,8 +1103,363 @@ class Paginator:
         Returns:
             总页数
         """
-        pages = self.paginate()
-        return len(pages)
+        return len(self._get_page_table())
+    
+    def is_layout_complete(self) -> bool:
+        """
+        当前尺寸下是否已完成全部章节的排版
+        
+        Returns:
+            是否已完成排版
+        """
+        if self._cache_valid and self._page_table is not None:
+            return True
+        line_index = self._line_index
+        return (
+            line_index is not None
+            and line_index.cols == self.available_cols
+            and line_index.chapter_count == len(self.document.chapters)
+        )
+    
+    def estimate_total_pages(self) -> Tuple[int, int]:
+        """
+        估算总页数，不做完整排版
+        
+        已换行的章节按实际页数计算，其余章节由抽样换行的行估算显示行数。
+        排版完成后返回精确页数。
+        
+        Returns:
+            (估计页数, 误差界) 元组，误差界约为三倍标准差，精确时为0
+        """
+        if self._cache_valid and self._page_table is not None:
+            return len(self._page_table), 0
+        
+        rows = self.available_rows
+        line_index = self._get_line_index(0)
+        _, _, first, page_suffix, variance_suffix = self._get_estimate_suffix(line_index.chapter_count)
+        
+        chapter_count = line_index.chapter_count
+        pages = line_index.page_starts(rows)[-1] + page_suffix[chapter_count - first]
+        variance = variance_suffix[chapter_count - first]
+        return pages, math.ceil(3 * math.sqrt(variance))
+    
+    def _get_estimate_suffix(self, first: int) -> Tuple[int, int, int, array, array]:
+        """
+        获取从某一章节起各章节估计页数与方差的后缀和（列宽或行数变化时重新计算）
+        
+        Args:
+            first: 后缀和至少需要覆盖的第一个章节（即尚未换行的第一个章节）
+            
+        Returns:
+            (列宽, 行数, 起始章节, 页数后缀和, 方差后缀和) 元组
+        """
+        cols, rows = self.available_cols, self.available_rows
+        cached = self._estimate_suffix
+        if cached is not None and cached[:2] == (cols, rows) and cached[2] <= first:
+            return cached
+        
+        chapters = self.document.chapters
+        page_suffix = array('q', [0]) * (len(chapters) - first + 1)
+        variance_suffix = array('d', [0.0]) * (len(chapters) - first + 1)
+        
+        # 方差以页为单位：抽样误差，加上按行数取整到页时每章约 1/12 页²
+        for i in range(len(chapters) - 1, first - 1, -1):
+            chapter = chapters[i]
+            lines, line_variance = self._estimate_chapter_lines(chapter)
+            page_suffix[i - first] = page_suffix[i - first + 1] + WrappedLineIndex.page_count(
+                round(lines), self._count_trailing_empty_lines(chapter.content), rows
+            )
+            variance_suffix[i - first] = variance_suffix[i - first + 1]
+            if line_variance:
+                variance_suffix[i - first] += line_variance / (rows * rows) + 1 / 12
+        
+        self._estimate_suffix = (cols, rows, first, page_suffix, variance_suffix)
+        return self._estimate_suffix
+    
+    def estimate_chapter_lines(self, chapter_index: int) -> int:
+        """
+        估算章节的显示行数（已换行的章节返回实际行数）
+        
+        Args:
+            chapter_index: 章节索引（从0开始）
+            
+        Returns:
+            显示行数
+        """
+        line_index = self._get_line_index(0)
+        if chapter_index < line_index.chapter_count:
+            return len(line_index.chapter_line_starts[chapter_index])
+        
+        lines, _ = self._estimate_chapter_lines(self.document.chapters[chapter_index])
+        return round(lines)
+    
+    @staticmethod
+    def _count_trailing_empty_lines(content: str) -> int:
+        """
+        统计章节末尾连续空行的数量（与换行结果中的末尾空行一致）
+        
+        Args:
+            content: 章节内容
+            
+        Returns:
+            末尾连续空行数
+        """
+        end = len(content)
+        while end > 0 and content[end - 1] == '\n':
+            end -= 1
+        
+        # 内容全是换行符时，第一行也是空行
+        trailing = len(content) - end
+        return trailing + 1 if end == 0 else trailing
+    
+    def _estimate_chapter_lines(self, chapter: Chapter) -> Tuple[float, float]:
+        """
+        抽样估算章节的显示行数
+        
+        原始行数可以直接数出来，只需估算自动换行多出的行数：在章节内容上
+        等距取样，对取样点所在的原始行实际换行。取样点落在某行的概率与行长
+        （含换行符）成正比，因此按行长加权即得到多出行数的无偏估计，宽字符
+        比例和平均行长的影响都体现在抽样行中。
+        
+        Args:
+            chapter: 章节对象
+            
+        Returns:
+            (估计行数, 方差) 元组
+        """
+        cached = self._line_estimates.get(chapter.index)
+        if cached is not None:
+            return cached
+        
+        content = chapter.content
+        if self._document_chars is None:
+            self._document_chars = sum(len(c.content) for c in self.document.chapters)
+        samples = max(
+            self.ESTIMATE_MIN_SAMPLES,
+            round(self.ESTIMATE_SAMPLE_LINES * len(content) / max(1, self._document_chars))
+        )
+        source_lines = content.count('\n') + 1
+        
+        if source_lines <= samples and len(content) <= self.STREAM_WRAP_THRESHOLD:
+            # 行数不多时直接换行计算
+            result = (float(sum(len(self._wrap_offsets(line)) for line in content.split('\n'))), 0.0)
+        else:
+            # 每行按“内容 + 换行符”计长，最后一行没有换行符，补一个位置
+            total = len(content) + 1
+            values = []
+            for j in range(samples):
+                position = (2 * j + 1) * total // (2 * samples)
+                line_start = content.rfind('\n', 0, position) + 1
+                line_end = content.find('\n', position)
+                if line_end < 0:
+                    line_end = len(content)
+                if line_end - line_start > self.STREAM_WRAP_THRESHOLD:
+                    # 超长行只对取样点附近的一个窗口换行，按窗口内的行密度计算
+                    window_start = max(line_start, min(position, line_end) - self.STREAM_WRAP_WINDOW // 2)
+                    window_end = min(line_end, window_start + self.STREAM_WRAP_WINDOW)
+                    window_lines = len(self._wrap_offsets(content[window_start:window_end], whole_line=False))
+                    values.append(window_lines / (window_end - window_start))
+                    continue
+                extra_lines = len(self._wrap_offsets(content[line_start:line_end])) - 1
+                values.append(extra_lines / (line_end - line_start + 1))
+            
+            mean = sum(values) / samples
+            sample_variance = sum((value - mean) ** 2 for value in values) / (samples - 1)
+            result = (source_lines + total * mean, total * total * sample_variance / samples)
+        
+        self._line_estimates[chapter.index] = result
+        return result
+    
+    def iter_pages(self, start: int = 1, stop: Optional[int] = None) -> Iterator[Page]:
+        """
+        按页码顺序逐页生成页面
+        
+        尚未排版时只按需对章节换行，生成到 stop 之前即停止，不会排版整本书。
+        
+        Args:
+            start: 起始页码（从1开始）
+            stop: 结束页码（不含），默认到最后一页
+            
+        Yields:
+            页面对象
+        """
+        start = max(1, start)
+        
+        # 已有页表时直接从页表生成
+        if self._cache_valid and self._page_table is not None:
+            table = self._page_table
+            end = len(table) if stop is None else min(stop - 1, len(table))
+            for page_number in range(start, end + 1):
+                yield self._materialize_page(table, page_number - 1)
+            return
+        
+        rows = self.available_rows
+        line_index = self._get_line_index(0)
+        chapters = self.document.chapters
+        page_number = 1
+        
+        # 剩余章节较多时并行换行，按章节顺序取回结果（已提前换行的章节直接使用）
+        ahead = self._wrapped_ahead
+        pending = [chapter for chapter in chapters[line_index.chapter_count:] if chapter.index not in ahead]
+        wrapped = self._iter_wrapped_chapters(pending) if self._use_parallel_layout(pending) else None
+        
+        try:
+            for i, chapter in enumerate(chapters):
+                if stop is not None and page_number >= stop:
+                    return
+                
+                if i >= line_index.chapter_count:
+                    if i in ahead:
+                        self._add_wrapped_chapter(line_index, *ahead[i])
+                    elif wrapped is not None:
+                        self._add_wrapped_chapter(line_index, *next(wrapped))
+                
+                if i < line_index.chapter_count:
+                    # 已换行的章节直接按行号计算页面，跳过起始页之前的整章
+                    page_count = line_index.chapter_page_count(i, rows)
+                    if page_number + page_count <= start:
+                        page_number += page_count
+                        continue
+                    page_ranges = line_index.iter_chapter_pages(i, chapter.content, rows)
+                else:
+                    # 未换行的章节边换行边分页
+                    page_ranges = self._stream_chapter_pages(chapter, line_index)
+                
+                for page_start, page_end in page_ranges:
+                    if stop is not None and page_number >= stop:
+                        return
+                    if page_number >= start:
+                        yield self._build_page(chapter.index, page_start, page_end, page_number)
+                    page_number += 1
+        finally:
+            if wrapped is not None:
+                wrapped.close()
+    
+    def get_heading_lines(self, chapter_index: int, first: bool = False) -> List[str]:
+        """
+        获取章节标题的显示行
+        
+        Args:
+            chapter_index: 章节索引（从0开始）
+            first: 是否为输出中的第一个标题（前面不加空行）
+            
+        Returns:
+            标题及其前后空行，章节不存在时返回空列表
+        """
+        chapter = self.document.get_chapter(chapter_index)
+        if chapter is None:
+            return []
+        if first:
+            return [chapter.title, ""]
+        return ["", chapter.title, ""]
+    
+    def iter_render_pages(self, start: int = 1, stop: Optional[int] = None) -> Iterator[Tuple[Page, List[str]]]:
+        """
+        按页码顺序逐页生成页面及其显示行
+        
+        显示行是终端或管道实际输出的内容：输出中每个章节的第一页之前
+        加入章节标题，之后是页面内容的各行。
+        
+        Args:
+            start: 起始页码（从1开始）
+            stop: 结束页码（不含），默认到最后一页
+            
+        Yields:
+            (页面对象, 显示行列表) 元组
+        """
+        prev_chapter_index = -1
+        for page in self.iter_pages(start, stop):
+            lines = []
+            if page.chapter_index != prev_chapter_index:
+                lines = self.get_heading_lines(page.chapter_index, first=prev_chapter_index == -1)
+                prev_chapter_index = page.chapter_index
+            lines.extend(page.content.split('\n'))
+            yield page, lines
+    
+    def get_render_lines(self, table: PageTable, page_number: int, first_page: int = 1) -> List[str]:
+        """
+        按页表记录生成某一页的显示行
+        
+        与 iter_render_pages() 从第一页开始输出时该页的显示行相同，
+        用于按需取回已输出过的页面，不需要保留全部显示行。
+        
+        Args:
+            table: 页表（可以是排版过程中逐页生成的部分页表，或从书中间开始的片段）
+            page_number: 页面在表中的页码（从1开始）
+            first_page: 表中第一页在全书中的页码（表从书中间开始时使用）
+            
+        Returns:
+            显示行列表（章节第一页含章节标题）
+        """
+        chapter_index, start, end = table.get(page_number - 1)
+        page = self._build_page(chapter_index, start, end, first_page + page_number - 1)
+        lines = []
+        # 片段从章节中间开始时，第一页不是章节第一页，没有标题
+        if start == 0 and (page_number == 1 or table.chapter_indices[page_number - 2] != chapter_index):
+            lines = self.get_heading_lines(chapter_index, first=page.page_number == 1)
+        lines.extend(page.content.split('\n'))
+        return lines
+    
+    def _stream_chapter_pages(self, chapter: Chapter, line_index: WrappedLineIndex) -> Iterator[Tuple[int, int]]:
+        """
+        边换行边分页，依次生成章节每页的起止偏移
+        
+        整章换行完成后把结果记入换行索引。
+        
+        Args:
+            chapter: 章节对象
+            line_index: 当前列宽的换行索引
+            
+        Yields:
+            (起始偏移, 结束偏移) 元组
+        """
+        rows = self.available_rows
+        line_starts = array('q')
+        trailing_empty = 0
+        
+        page_lines = 0
+        page_start = 0
+        # 当前页最后一个非空行的结束偏移
+        last_content_end = -1
+        
+        for start, end in self._iter_chapter_lines(chapter):
+            line_starts.append(start)
+            if page_lines == 0:
+                page_start = start
+                last_content_end = -1
+            page_lines += 1
+            
+            # 只有空行会产生空的换行段
+            if end > start:
+                last_content_end = end
+                trailing_empty = 0
+            else:
+                trailing_empty += 1
+            
+            # 如果当前页已满，生成新页
+            if page_lines >= rows:
+                yield page_start, end
+                page_lines = 0
+        
+        if line_index.chapter_count == chapter.index:
+            self._add_wrapped_chapter(line_index, line_starts, trailing_empty)
+        
+        # 最后一页（末尾多余的空行不计入）
+        if page_lines and last_content_end >= 0:
+            yield page_start, last_content_end
+    
+    def get_pages(self, start: int, count: int) -> List[Page]:
+        """
+        获取从指定页码开始的若干页
+        
+        Args:
+            start: 起始页码（从1开始）
+            count: 页数
+            
+        Returns:
+            页面列表（超出末页的部分省略）
+        """
+        return list(self.iter_pages(start, start + count))
     
     def get_page_by_chapter(self, chapter_index: int) -> Optional[Page]:
         """
@@ -258,17 +1471,151 @@ class Paginator:
         Returns:
             章节第一页，如果章节不存在返回None
         """
+        page_number = self.get_chapter_start_page(chapter_index)
+        if page_number is None:
+            return None
+        
+        return self.get_page(page_number)
+    
+    def get_chapter_start_page(self, chapter_index: int) -> Optional[int]:
+        """
+        获取指定章节第一页的页码
+        
+        Args:
+            chapter_index: 章节索引（从0开始）
+            
+        Returns:
+            章节第一页的页码，如果章节不存在或没有内容返回None
+        """
+        if chapter_index < 0 or chapter_index >= self.document.total_chapters:
+            return None
+        
+        if self._cache_valid and self._page_table is not None:
+            start, end = self._page_table.chapter_page_range(chapter_index)
+            return start + 1 if start < end else None
+        
+        # 尚未排版时只对目标章节及之前的章节换行，提前定位后只对定位章节与目标章节之间的章节换行
+        rows = self.available_rows
+        line_index = self._get_line_index(0)
+        if self._anchor is not None and chapter_index >= line_index.chapter_count:
+            start = self._anchored_chapter_start(chapter_index)
+            if start is None or self._anchored_chapter_start(chapter_index + 1) == start:
+                return None
+            return start + 1
+        
+        line_index = self._get_line_index(chapter_index + 1)
+        if line_index.chapter_page_count(chapter_index, rows) == 0:
+            return None
+        
+        return 1 + line_index.page_starts(rows)[chapter_index]
+    
+    def iter_chapter_pages(
+        self,
+        chapter_index: int,
+        start: int = 0,
+        end: Optional[int] = None
+    ) -> Iterator[Tuple[int, int, int]]:
+        """
+        从章节中某一原始行的开头起逐页换行，不对之前的章节和该行之前的内容换行
+        
+        页面从起始位置起每 available_rows 行一页，从章节开头开始时与顺序排版的
+        分页相同。只对取用到的页面换行，用于在排版完成前先显示书中间的位置。
+        
+        Args:
+            chapter_index: 章节索引（从0开始）
+            start: 起始偏移（须为原始行的开头）
+            end: 结束偏移（须为原始行的开头，默认到章节末尾），最后一页在此之前结束，
+                可能不满一页，末尾的空行保留
+            
+        Yields:
+            (起始偏移, 结束偏移, 显示行数) 元组，显示行数不含章节标题
+        """
+        rows = self.available_rows
+        page_start = start
+        page_lines = 0
+        # 当前页最后一个非空行的结束偏移与行数
+        last_content_end = -1
+        content_lines = 0
+        
+        for line_start, line_end in self._iter_large_chapter_lines(self.document.chapters[chapter_index].content, start):
+            if end is not None and line_start >= end:
+                # 之后的内容已在别处排版，最后一页的空行不是章节末尾的空行
+                if page_lines:
+                    yield page_start, end - 1, page_lines
+                return
+            if page_lines == 0:
+                page_start = line_start
+                last_content_end = -1
+            page_lines += 1
+            
+            # 只有空行会产生空的换行段
+            if line_end > line_start:
+                last_content_end = line_end
+                content_lines = page_lines
+            
+            if page_lines >= rows:
+                yield page_start, line_end, page_lines
+                page_lines = 0
+        
+        # 最后一页（末尾多余的空行不计入）
+        if page_lines and last_content_end >= 0:
+            yield page_start, last_content_end, content_lines
+    
+    def find_page_by_offset(self, chapter_index: int, offset: int) -> Optional[int]:
+        """
+        查找包含章节内指定字符偏移的页码
+        
+        尚未排版时先对目标章节换行。之前尚未换行的内容不多时随后补齐（页码准确），
+        否则不再换行，从估计的起始页开始编号（提前定位），之前的章节在向前翻页时
+        才逐章换行，全部换行后改为实际页码（见 sync_page_number）。之后的章节不会换行。
+        
+        Args:
+            chapter_index: 章节索引（从0开始）
+            offset: 章节内容中的字符偏移
+            
+        Returns:
+            页码，如果章节不存在返回None
+        """
         if chapter_index < 0 or chapter_index >= self.document.total_chapters:
             return None
         
-        pages = self.paginate()
+        if self._cache_valid and self._page_table is not None:
+            index = self._page_table.find_page_index(chapter_index, offset)
+            return 1 if index is None else index + 1
+        
+        # 目标章节优先换行
+        rows = self.available_rows
+        chapters = self.document.chapters
+        line_index = self._get_line_index(0)
+        if chapter_index >= line_index.chapter_count and chapter_index not in self._wrapped_ahead:
+            self._wrapped_ahead[chapter_index] = self._wrap_chapter(chapters[chapter_index])
+        
+        if chapter_index >= line_index.chapter_count and self._anchor is None:
+            gap = chapters[line_index.chapter_count:chapter_index]
+            if sum(len(chapter.content) for chapter in gap) > self.ANCHOR_GAP_CHARS:
+                # 之前的章节按估计页数计算起始页，不在这里换行
+                first = line_index.chapter_count
+                _, _, suffix_first, page_suffix, _ = self._get_estimate_suffix(first)
+                boundary = line_index.page_starts(rows)[-1]
+                estimate = page_suffix[first - suffix_first] - page_suffix[chapter_index - suffix_first]
+                self._anchor = (chapter_index, boundary + estimate, boundary)
+        
+        if chapter_index >= line_index.chapter_count and self._anchor is not None:
+            first_page = 1 + self._anchored_chapter_start(chapter_index)
+            line_starts, trailing_empty = self._wrapped_ahead[chapter_index]
+        else:
+            # 补齐之前的章节
+            line_index = self._get_line_index(chapter_index + 1)
+            first_page = 1 + line_index.page_starts(rows)[chapter_index]
+            line_starts = line_index.chapter_line_starts[chapter_index]
+            trailing_empty = line_index.trailing_empty_lines[chapter_index]
         
-        # 查找该章节的第一页
-        for page in pages:
-            if page.chapter_index == chapter_index:
-                return page
+        page_count = WrappedLineIndex.page_count(len(line_starts), trailing_empty, rows)
+        if page_count == 0:
+            return max(1, first_page - 1)
         
-        return None
+        line = bisect.bisect_right(line_starts, offset) - 1
+        return first_page + min(max(line, 0) // rows, page_count - 1)
     
     def find_page_position(self, page_number: int) -> Optional[Tuple[int, int]]:
         """
@@ -280,19 +1627,99 @@ class Paginator:
         Returns:
             (章节索引, 章内页码) 元组，如果页码无效返回None
         """
-        page = self.get_page(page_number)
-        if page is None:
+        location = self._locate_page(page_number)
+        if location is None:
             return None
         
         # 计算章内页码
-        pages = self.paginate()
-        chapter_start_page = 1
+        chapter_index = location[0]
+        chapter_page = page_number - self.get_chapter_start_page(chapter_index) + 1
         
-        for p in pages:
-            if p.chapter_index == page.chapter_index:
-                chapter_start_page = p.page_number
-                break
+        return (chapter_index, chapter_page)
+
+
+# 并行换行的工作进程或线程中使用的分页器（每个工作线程各自一个，换行缓存不在线程间共享）
+_worker_state = threading.local()
+
+
+def _init_layout_worker(available_cols: int, vectorized: bool) -> None:
+    """
+    进程池子进程或线程池工作线程初始化：创建只用于换行的分页器
+    
+    Args:
+        available_cols: 换行使用的可用列数
+        vectorized: 是否使用 NumPy 累计宽度排版
+    """
+    # 章节文本随任务发送，分页器的文档只是占位
+    document = Document("并行换行", chapters=[Chapter(0, "", "")])
+    paginator = Paginator(document, vectorized=vectorized)
+    paginator.available_cols = available_cols
+    _worker_state.paginator = paginator
+
+
+def _wrap_chapters_task(chapters: List[Tuple[int, str]]) -> List[Tuple[array, int]]:
+    """
+    进程池或线程池任务：对一批章节换行
+    
+    Args:
+        chapters: (章节索引, 章节内容) 列表
         
-        chapter_page = page_number - chapter_start_page + 1
+    Returns:
+        各章节的换行结果
+    """
+    paginator = _worker_state.paginator
+    results = []
+    for index, content in chapters:
+        results.append(paginator._wrap_chapter(Chapter(index, "", content)))
+        # 每个章节只换行一次，不保留其宽度索引和断行标记
+        paginator._width_indexes.clear()
+        paginator._break_flags.clear()
+        paginator._chapter_cache_bytes = 0
+    return results
+
+
+def _wrap_entry_nbytes(line: str, segments: List[Tuple[int, int]]) -> int:
+    """
+    估算换行结果缓存条目占用的字节数
+    
+    Args:
+        line: 行文本
+        segments: 换行段列表
+        
+    Returns:
+        行文本与换行段占用的字节数（不含共享的小整数）
+    """
+    return sys.getsizeof(line) + sys.getsizeof(segments) + len(segments) * _SEGMENT_NBYTES
+
+
+def _page_nbytes(page: Page) -> int:
+    """
+    估算已生成页面占用的字节数
+    
+    Args:
+        page: 页面对象
         
-        return (page.chapter_index, chapter_page)
+    Returns:
+        页面对象及其文本占用的字节数
+    """
+    return sys.getsizeof(page) + sys.getsizeof(page.__dict__) + sys.getsizeof(page.content)
+
+
+class _PageView(Sequence):
+    """页面序列视图，按下标访问时才生成页面内容"""
+    
+    def __init__(self, paginator: Paginator, table: PageTable):
+        self._paginator = paginator
+        self._table = table
+    
+    def __len__(self) -> int:
+        return len(self._table)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("页码超出范围")
+        return self._paginator._materialize_page(self._table, index)
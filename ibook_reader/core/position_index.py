@@ -0,0 +1,131 @@
+"""位置索引"""
+
+import bisect
+from array import array
+from typing import Optional, Tuple
+
+from .page_table import PageTable
+
+
+class PositionIndex(PageTable):
+    """
+    位置索引
+
+    在页表之外记录每页在显示行序列（含章节标题）中的起始行号，由排版过程逐页
+    生成。字符偏移、显示行、页码和章节之间的互查都在有序数组上二分查找完成。
+    行号与偏移的换算以页为单位：显示行对应其所在页的起始偏移。
+    """
+
+    __slots__ = ('start_lines',)
+
+    def __init__(self):
+        super().__init__()
+        self.start_lines = array('q')
+
+    def append_page(self, chapter_index: int, start: int, end: int, start_line: int) -> None:
+        """
+        追加一页（页面须按页码顺序追加）
+
+        Args:
+            chapter_index: 章节索引
+            start: 页面在章节内容中的起始偏移
+            end: 页面在章节内容中的结束偏移（不含）
+            start_line: 页面在显示行序列中的起始行号
+        """
+        # 补齐之前没有页面的章节
+        self.finish(chapter_index + 1)
+        self.append(chapter_index, start, end)
+        self.start_lines.append(start_line)
+
+    def finish(self, chapter_count: int) -> None:
+        """
+        补齐章节记录，使前 chapter_count 个章节都可以查询
+
+        Args:
+            chapter_count: 章节数
+        """
+        while len(self.chapter_starts) < chapter_count:
+            self.start_chapter()
+
+    def page_at_line(self, line: int) -> Optional[int]:
+        """
+        查找显示行所在的页码
+
+        Args:
+            line: 显示行号（从0开始）
+
+        Returns:
+            页码（从1开始），还没有页面时返回None
+        """
+        if not self.start_lines:
+            return None
+        return max(1, bisect.bisect_right(self.start_lines, line))
+
+    def page_start_line(self, page_number: int) -> int:
+        """
+        获取页面的起始显示行号
+
+        Args:
+            page_number: 页码（从1开始）
+
+        Returns:
+            起始显示行号
+        """
+        return self.start_lines[page_number - 1]
+
+    def page_chapter(self, page_number: int) -> int:
+        """
+        获取页面所属的章节索引
+
+        Args:
+            page_number: 页码（从1开始）
+
+        Returns:
+            章节索引
+        """
+        return self.chapter_indices[page_number - 1]
+
+    def page_at_offset(self, chapter_index: int, offset: int) -> Optional[int]:
+        """
+        查找包含章节内字符偏移的页码
+
+        Args:
+            chapter_index: 章节索引（从0开始）
+            offset: 章节内容中的字符偏移
+
+        Returns:
+            页码（从1开始），该章节尚未排版时返回None
+        """
+        if not 0 <= chapter_index < len(self.chapter_starts):
+            return None
+        index = self.find_page_index(chapter_index, offset)
+        return None if index is None else index + 1
+
+    def line_at_offset(self, chapter_index: int, offset: int) -> Optional[int]:
+        """
+        查找章节内字符偏移所在页的起始显示行号
+
+        Args:
+            chapter_index: 章节索引（从0开始）
+            offset: 章节内容中的字符偏移
+
+        Returns:
+            显示行号，该章节尚未排版时返回None
+        """
+        page_number = self.page_at_offset(chapter_index, offset)
+        return None if page_number is None else self.page_start_line(page_number)
+
+    def position_at_line(self, line: int) -> Optional[Tuple[int, int]]:
+        """
+        查找显示行所在页的章节和起始偏移
+
+        Args:
+            line: 显示行号（从0开始）
+
+        Returns:
+            (章节索引, 章内字符偏移) 元组，还没有页面时返回None
+        """
+        page_number = self.page_at_line(line)
+        if page_number is None:
+            return None
+        return self.chapter_indices[page_number - 1], self.start_offsets[page_number - 1]
@@ -0,0 +1,154 @@
+"""基于 NumPy 的累计显示宽度索引（可选排版后端）"""
+
+from array import array
+from typing import Iterator, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from ..utils.text_utils import get_width_table, get_code_point_width
+
+
+# NumPy 是否可用
+HAS_NUMPY = np is not None
+
+_width_lut = None
+
+
+def _get_width_lut():
+    """获取 NumPy 格式的 BMP 宽度表"""
+    global _width_lut
+
+    if _width_lut is None:
+        _width_lut = np.frombuffer(bytes(get_width_table()), dtype=np.uint8)
+
+    return _width_lut
+
+
+class WidthIndex:
+    """
+    章节累计显示宽度索引
+
+    对章节内容的码位数组一次性计算累计显示宽度和断行位置，之后任意列宽的
+    换行都在整章上按段批量 searchsorted：每一轮所有未排完的行同时前进一段，
+    轮数只取决于最长一行的段数，不再逐行、逐字符遍历文本。
+    """
+
+    def __init__(self, text: str, breaks: bytes):
+        """
+        构建累计宽度索引
+
+        Args:
+            text: 章节内容
+            breaks: 章节断行标记（与内容等长）
+        """
+        code_points = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+        lut = _get_width_lut()
+        widths = lut[np.minimum(code_points, len(lut) - 1)]
+
+        # 辅助平面字符单独查宽度
+        for i in np.flatnonzero(code_points >= len(lut)):
+            widths[i] = get_code_point_width(int(code_points[i]))
+
+        # 累计宽度单调不减，可以直接二分查找断行位置
+        dtype = np.int32 if len(text) * 2 < 2 ** 31 else np.int64
+        self.cumulative = np.cumsum(widths, dtype=dtype)
+
+        # 每个位置之前（含）最后一个可断位置，没有时为 -1
+        positions = np.arange(len(text), dtype=dtype)
+        flags = np.frombuffer(breaks, dtype=np.uint8)
+        self.last_break = np.maximum.accumulate(np.where(flags != 0, positions, -1)) if len(text) else positions
+
+        # 原始行的起止偏移，只含空白的行不换行
+        newlines = np.flatnonzero(code_points == 10)
+        self.line_starts = np.concatenate(([0], newlines + 1)).astype(np.int64)
+        self.line_ends = np.append(newlines, len(text)).astype(np.int64)
+        self.blank_lines = np.fromiter(
+            (not line.strip() for line in text.split('\n')), dtype=bool, count=len(self.line_starts)
+        )
+
+    @property
+    def nbytes(self) -> int:
+        """索引占用的字节数"""
+        return (
+            self.cumulative.nbytes + self.last_break.nbytes + self.line_starts.nbytes
+            + self.line_ends.nbytes + self.blank_lines.nbytes
+        )
+
+    def wrap_chapter(self, cols: int) -> Tuple[array, int]:
+        """
+        按列宽换行整章
+
+        Args:
+            cols: 可用列数
+
+        Returns:
+            (每个显示行的起始偏移, 末尾连续空行数) 元组
+        """
+        starts, ends = self._wrap(cols)
+        # 只有空行会产生空的换行段
+        non_empty = np.flatnonzero(ends > starts)
+        trailing_empty = len(starts) - (int(non_empty[-1]) + 1 if len(non_empty) else 0)
+        return array('q', starts.tobytes()), trailing_empty
+
+    def iter_lines(self, cols: int) -> Iterator[Tuple[int, int]]:
+        """
+        按列宽换行整章，依次生成每个显示行的起止偏移
+
+        Args:
+            cols: 可用列数
+
+        Yields:
+            (起始偏移, 结束偏移) 元组
+        """
+        starts, ends = self._wrap(cols)
+        yield from zip(starts.tolist(), ends.tolist())
+
+    def _wrap(self, cols: int) -> Tuple['np.ndarray', 'np.ndarray']:
+        """
+        按列宽贪心换行整章，在段内最后一个可断位置断行
+
+        与 Paginator._wrap_offsets() 逐行换行的结果相同。
+
+        Args:
+            cols: 可用列数
+
+        Returns:
+            按显示顺序排列的 (起始偏移数组, 结束偏移数组) 元组
+        """
+        cumulative = self.cumulative
+        last_break = self.last_break
+        # 查找值与数组类型一致，避免 searchsorted 整体转换数组类型
+        as_width = cumulative.dtype.type
+
+        wrap = ~self.blank_lines
+        segment_starts = [self.line_starts[~wrap]]
+        segment_ends = [self.line_ends[~wrap]]
+        position = self.line_starts[wrap]
+        end = self.line_ends[wrap]
+
+        while len(position):
+            base = np.where(position > 0, cumulative[position - 1], 0)
+            # 累计宽度不超过 base + cols 的字符都能放进当前段
+            segment_end = np.minimum(cumulative.searchsorted((base + cols).astype(as_width), side='right'), end)
+            # 单个字符就超过宽度时强制添加
+            forced = segment_end <= position
+            segment_end[forced] = position[forced] + 1
+            # 退回到段内最后一个可断位置，没有时在溢出处强制断开
+            overflow = np.flatnonzero(~forced & (segment_end < end))
+            break_at = last_break[segment_end[overflow]]
+            movable = break_at > position[overflow]
+            segment_end[overflow[movable]] = break_at[movable]
+
+            segment_starts.append(position)
+            segment_ends.append(segment_end)
+            remaining = segment_end < end
+            position = segment_end[remaining]
+            end = end[remaining]
+
+        # 各段互不重叠且起始偏移各不相同，按起始偏移排序即为显示顺序
+        starts = np.concatenate(segment_starts)
+        order = np.argsort(starts, kind='stable')
+        return starts[order], np.concatenate(segment_ends)[order]
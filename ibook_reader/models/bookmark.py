@@ -15,6 +15,7 @@ class Bookmark:
     preview_text: str                # 预览文本（最多50字符）
     created_at: str = field(default_factory=lambda: datetime.now().isoformat())  # 创建时间
     note: Optional[str] = None       # 用户备注（可选）
+    chapter_offset: Optional[int] = None  # 书签页在章节内容中的起始字符偏移（与终端尺寸无关）
     
     def __post_init__(self):
         if self.page_number < 1:
@@ -33,7 +34,8 @@ class Bookmark:
             'chapter_name': self.chapter_name,
             'preview_text': self.preview_text,
             'created_at': self.created_at,
-            'note': self.note
+            'note': self.note,
+            'chapter_offset': self.chapter_offset
         }
     
     @classmethod
@@ -46,5 +48,6 @@ class Bookmark:
             chapter_name=data['chapter_name'],
             preview_text=data['preview_text'],
             created_at=data.get('created_at', datetime.now().isoformat()),
-            note=data.get('note')
+            note=data.get('note'),
+            chapter_offset=data.get('chapter_offset')
         )
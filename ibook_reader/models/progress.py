@@ -17,6 +17,7 @@ class ReadingProgress:
     total_chapters: int              # 总章节数
     last_read_time: str              # 最后阅读时间
     read_percentage: float = 0.0     # 阅读百分比
+    chapter_offset: Optional[int] = None  # 当前页在章节内容中的起始字符偏移（与终端尺寸无关）
     
     def __post_init__(self):
         if self.current_page < 1:
@@ -41,7 +42,8 @@ class ReadingProgress:
             'total_pages': self.total_pages,
             'total_chapters': self.total_chapters,
             'last_read_time': self.last_read_time,
-            'read_percentage': self.read_percentage
+            'read_percentage': self.read_percentage,
+            'chapter_offset': self.chapter_offset
         }
     
     @classmethod
@@ -56,12 +58,22 @@ class ReadingProgress:
             total_pages=data['total_pages'],
             total_chapters=data['total_chapters'],
             last_read_time=data['last_read_time'],
-            read_percentage=data.get('read_percentage', 0.0)
+            read_percentage=data.get('read_percentage', 0.0),
+            chapter_offset=data.get('chapter_offset')
         )
     
-    def update_position(self, page: int, chapter: int) -> None:
-        """更新阅读位置"""
+    def update_position(
+        self,
+        page: int,
+        chapter: int,
+        chapter_offset: Optional[int] = None,
+        total_pages: Optional[int] = None
+    ) -> None:
+        """更新阅读位置（提供总页数时同时更新，如排版完成后换成实际页数）"""
+        if total_pages is not None and total_pages >= 1:
+            self.total_pages = total_pages
         self.current_page = max(1, min(page, self.total_pages))
         self.current_chapter = max(0, min(chapter, self.total_chapters - 1))
+        self.chapter_offset = chapter_offset
         self.read_percentage = round((self.current_page / self.total_pages) * 100, 1)
         self.last_read_time = datetime.now().isoformat()
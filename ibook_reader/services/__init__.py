@@ -2,7 +2,8 @@
 
 from .auth_service import AuthService
 from .bookmark_service import BookmarkService
+from .layout_cache_service import LayoutCacheService
 from .progress_service import ProgressService
 from .reader_service import ReaderService
 
-__all__ = ['AuthService', 'BookmarkService', 'ProgressService', 'ReaderService']
+__all__ = ['AuthService', 'BookmarkService', 'LayoutCacheService', 'ProgressService', 'ReaderService']
@@ -129,7 +129,8 @@ class BookmarkService:
             chapter_name=chapter_name,
             preview_text=preview_text,
             created_at=datetime.now().isoformat(),
-            note=note
+            note=note,
+            chapter_offset=page.start_offset
         )
         
         # 添加到列表
@@ -0,0 +1,155 @@
+"""排版缓存服务"""
+
+import hashlib
+import os
+from pathlib import Path
+from typing import Optional
+
+from ..core.page_table import PageTable
+from ..core.paginator import Paginator
+from ..config import Config
+from ..utils.file_utils import atomic_write, ensure_dir, get_file_fingerprint
+
+
+class LayoutCacheService:
+    """
+    排版缓存服务
+
+    把页表持久化到配置目录，按文件指纹、可用行列数和排版算法版本区分。
+    任一条件变化都会得到不同的缓存项，旧项按最近使用时间淘汰。
+    """
+    
+    # 缓存总大小上限（字节）
+    MAX_CACHE_BYTES = 64 * 1024 * 1024
+    
+    def __init__(self, config: Optional[Config] = None, max_bytes: Optional[int] = None):
+        """
+        初始化排版缓存服务
+        
+        Args:
+            config: 配置管理器实例
+            max_bytes: 缓存总大小上限（默认 MAX_CACHE_BYTES）
+        """
+        self.config = config or Config()
+        self.max_bytes = self.MAX_CACHE_BYTES if max_bytes is None else max_bytes
+    
+    def _get_cache_file(self, file_hash: str, paginator: Paginator) -> Path:
+        """
+        获取缓存文件路径
+        
+        Args:
+            file_hash: 文档文件指纹
+            paginator: 分页器
+            
+        Returns:
+            缓存文件路径
+        """
+        key = "{}:{}x{}:v{}:{}".format(
+            file_hash,
+            paginator.available_rows,
+            paginator.available_cols,
+            Paginator.LAYOUT_VERSION,
+            sum(len(chapter.content) for chapter in paginator.document.chapters)
+        )
+        name = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return self.config.layout_cache_dir / f"{name}.bin"
+    
+    def load(self, file_path: Path, paginator: Paginator, file_hash: Optional[str] = None) -> bool:
+        """
+        加载缓存的页表并交给分页器，命中时分页器不再排版
+        
+        Args:
+            file_path: 文档文件路径
+            paginator: 分页器
+            file_hash: 文档文件指纹（默认按 get_file_fingerprint 计算）
+            
+        Returns:
+            是否命中缓存
+        """
+        cache_file = self._get_cache_file(file_hash or get_file_fingerprint(file_path), paginator)
+        if not cache_file.exists():
+            return False
+        
+        try:
+            table = PageTable.from_bytes(cache_file.read_bytes())
+            paginator.set_page_table(table)
+        except (OSError, ValueError):
+            # 缓存损坏，删除后按未命中处理
+            try:
+                cache_file.unlink()
+            except OSError:
+                pass
+            return False
+        
+        # 更新访问时间，用于按最近使用淘汰
+        try:
+            os.utime(cache_file)
+        except OSError:
+            pass
+        
+        return True
+    
+    def save(self, file_path: Path, paginator: Paginator, file_hash: Optional[str] = None) -> None:
+        """
+        保存分页器的页表（尚未排版时先完成排版），已有相同缓存项时不重复写入
+        
+        Args:
+            file_path: 文档文件路径
+            paginator: 分页器
+            file_hash: 文档文件指纹（默认按 get_file_fingerprint 计算）
+        """
+        cache_file = self._get_cache_file(file_hash or get_file_fingerprint(file_path), paginator)
+        if cache_file.exists():
+            # 相同条件下的页表相同，只更新访问时间
+            try:
+                os.utime(cache_file)
+            except OSError:
+                pass
+            return
+        
+        data = paginator.get_page_table().to_bytes()
+        if len(data) > self.max_bytes:
+            return
+        
+        ensure_dir(cache_file.parent)
+        atomic_write(cache_file, data, backup=False)
+        self._evict()
+    
+    def _evict(self) -> None:
+        """淘汰最久未使用的缓存项，直到总大小不超过上限"""
+        entries = []
+        for cache_file in self.config.layout_cache_dir.glob('*.bin'):
+            try:
+                stat = cache_file.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, cache_file))
+        
+        total_size = sum(size for _, size, _ in entries)
+        entries.sort()
+        
+        for _, size, cache_file in entries:
+            if total_size <= self.max_bytes:
+                break
+            try:
+                cache_file.unlink()
+            except OSError:
+                continue
+            total_size -= size
+    
+    def clear(self) -> int:
+        """
+        清空排版缓存
+        
+        Returns:
+            删除的缓存项数量
+        """
+        count = 0
+        if self.config.layout_cache_dir.exists():
+            for cache_file in self.config.layout_cache_dir.glob('*.bin'):
+                try:
+                    cache_file.unlink()
+                    count += 1
+                except OSError:
+                    pass
+        return count
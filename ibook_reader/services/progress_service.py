@@ -91,7 +91,8 @@ class ProgressService:
         document: Document,
         current_page: int,
         current_chapter: int,
-        total_pages: int
+        total_pages: int,
+        chapter_offset: Optional[int] = None
     ) -> ReadingProgress:
         """
         创建阅读进度
@@ -102,6 +103,7 @@ class ProgressService:
             current_page: 当前页码
             current_chapter: 当前章节索引
             total_pages: 总页数
+            chapter_offset: 当前页在章节内容中的起始字符偏移
             
         Returns:
             阅读进度对象
@@ -119,7 +121,8 @@ class ProgressService:
             current_chapter=current_chapter,
             total_pages=total_pages,
             total_chapters=document.total_chapters,
-            last_read_time=datetime.now().isoformat()
+            last_read_time=datetime.now().isoformat(),
+            chapter_offset=chapter_offset
         )
         
         return progress
@@ -128,7 +131,9 @@ class ProgressService:
         self,
         file_path: Path,
         current_page: int,
-        current_chapter: int
+        current_chapter: int,
+        chapter_offset: Optional[int] = None,
+        total_pages: Optional[int] = None
     ) -> None:
         """
         更新阅读位置
@@ -137,11 +142,13 @@ class ProgressService:
             file_path: 文档文件路径
             current_page: 当前页码
             current_chapter: 当前章节索引
+            chapter_offset: 当前页在章节内容中的起始字符偏移
+            total_pages: 总页数（默认沿用保存的总页数）
         """
         progress = self.load_progress(file_path)
         
         if progress:
-            progress.update_position(current_page, current_chapter)
+            progress.update_position(current_page, current_chapter, chapter_offset, total_pages)
             self.save_progress(progress)
     
     def remove_progress(self, file_path: Path) -> bool:
@@ -1,10 +1,11 @@
 """阅读控制服务 - 核心控制器"""
 
-from typing import Optional
+from typing import Optional, Tuple
 from pathlib import Path
 
 from ..models.document import Document
 from ..core.paginator import Paginator, Page
+from ..core.layout_manager import LayoutManager
 from ..parsers.factory import ParserFactory
 from .bookmark_service import BookmarkService
 from .progress_service import ProgressService
@@ -16,7 +17,9 @@ class ReaderService:
     def __init__(
         self,
         bookmark_service: Optional[BookmarkService] = None,
-        progress_service: Optional[ProgressService] = None
+        progress_service: Optional[ProgressService] = None,
+        layout_manager: Optional[LayoutManager] = None,
+        memory_budget: Optional[int] = None
     ):
         """
         初始化阅读控制服务
@@ -24,16 +27,22 @@ class ReaderService:
         Args:
             bookmark_service: 书签服务实例
             progress_service: 进度服务实例
+            layout_manager: 多尺寸排版管理（多个会话共享时同一尺寸只排版一次）
+            memory_budget: 分页器的内存预算（字节），默认不限制
         """
         self.bookmark_service = bookmark_service or BookmarkService()
         self.progress_service = progress_service or ProgressService()
+        self.layout_manager = layout_manager
+        self.memory_budget = memory_budget
         
         # 当前状态
         self.file_path: Optional[Path] = None
         self.document: Optional[Document] = None
         self.paginator: Optional[Paginator] = None
         self.current_page: int = 1
-        self.total_pages: int = 0
+        
+        # 阅读位置锚点 (页码, 章节索引, 章内字符偏移)，页码变化后失效
+        self._anchor: Optional[Tuple[int, int, int]] = None
     
     def load_document(self, file_path: Path, rows: Optional[int] = None, cols: Optional[int] = None) -> bool:
         """
@@ -62,8 +71,8 @@ class ReaderService:
             return False
         
         # 创建分页器
-        self.paginator = Paginator(self.document, rows=rows, cols=cols)
-        self.total_pages = self.paginator.get_total_pages()
+        self.paginator = self._create_paginator(rows, cols)
+        self._anchor = None
         
         # 保存文件路径
         self.file_path = file_path
@@ -71,14 +80,74 @@ class ReaderService:
         # 尝试加载阅读进度
         progress = self.progress_service.load_progress(file_path)
         if progress:
-            # 恢复进度
-            self.current_page = min(progress.current_page, self.total_pages)
+            # 恢复进度（优先按章内字符偏移定位，终端尺寸变化后仍落在同一位置）
+            self.current_page = self._find_position_page(
+                progress.current_chapter, progress.chapter_offset, progress.current_page
+            )
         else:
             # 从第一页开始
             self.current_page = 1
         
         return True
     
+    def _find_position_page(self, chapter_index: int, chapter_offset: Optional[int], page_number: int) -> int:
+        """
+        查找保存的位置对应的页码
+        
+        Args:
+            chapter_index: 章节索引
+            chapter_offset: 章内字符偏移（旧数据没有时为None）
+            page_number: 保存时的页码
+            
+        Returns:
+            当前尺寸下的页码
+        """
+        if chapter_offset is not None:
+            found = self.paginator.find_page_by_offset(chapter_index, chapter_offset)
+            if found is not None:
+                return found
+        if self.paginator.has_page(page_number):
+            return page_number
+        return 1 if page_number < 1 else max(1, self.paginator.get_total_pages())
+    
+    def _create_paginator(self, rows: Optional[int], cols: Optional[int]) -> Paginator:
+        """
+        创建当前文档的分页器，有排版管理时复用已缓存的页表
+        
+        Args:
+            rows: 终端行数
+            cols: 终端列数
+            
+        Returns:
+            分页器
+        """
+        if self.layout_manager is not None:
+            paginator = self.layout_manager.get_paginator(self.document, rows=rows, cols=cols)
+            if self.memory_budget is not None:
+                paginator.memory_budget = self.memory_budget
+            return paginator
+        return Paginator(self.document, rows=rows, cols=cols, memory_budget=self.memory_budget)
+    
+    def _sync_page(self) -> None:
+        """分页器改为实际页码后（见 Paginator.sync_page_number）换算当前页码和锚点"""
+        if self.paginator is None:
+            return
+        page_number = self.paginator.sync_page_number(self.current_page)
+        if page_number != self.current_page:
+            if self._anchor is not None and self._anchor[0] == self.current_page:
+                self._anchor = (page_number, *self._anchor[1:])
+            self.current_page = page_number
+    
+    @property
+    def total_pages(self) -> int:
+        """总页数（排版未完成时为估算值，不小于当前页码，不会排版剩余章节）"""
+        if self.paginator is None:
+            return 0
+        if self.paginator.is_layout_complete():
+            return self.paginator.get_total_pages()
+        total_pages, _ = self.paginator.estimate_total_pages()
+        return max(total_pages, self.current_page)
+    
     def get_current_page(self) -> Optional[Page]:
         """
         获取当前页面
@@ -89,6 +158,7 @@ class ReaderService:
         if self.paginator is None:
             return None
         
+        self._sync_page()
         return self.paginator.get_page(self.current_page)
     
     def next_page(self) -> bool:
@@ -98,7 +168,9 @@ class ReaderService:
         Returns:
             是否成功翻页
         """
-        if self.current_page < self.total_pages:
+        # 只需对到下一页为止的章节换行
+        self._sync_page()
+        if self.paginator is not None and self.paginator.has_page(self.current_page + 1):
             self.current_page += 1
             self._update_progress()
             return True
@@ -111,6 +183,7 @@ class ReaderService:
         Returns:
             是否成功翻页
         """
+        self._sync_page()
         if self.current_page > 1:
             self.current_page -= 1
             self._update_progress()
@@ -127,7 +200,8 @@ class ReaderService:
         Returns:
             是否成功跳转
         """
-        if 1 <= page_number <= self.total_pages:
+        self._sync_page()
+        if self.paginator is not None and self.paginator.has_page(page_number):
             self.current_page = page_number
             self._update_progress()
             return True
@@ -143,20 +217,21 @@ class ReaderService:
         if self.document is None or self.paginator is None:
             return False
         
-        current_page_obj = self.get_current_page()
-        if current_page_obj is None:
+        self._sync_page()
+        position = self.paginator.find_page_position(self.current_page)
+        if position is None:
             return False
         
         # 获取下一章的索引
-        next_chapter_index = current_page_obj.chapter_index + 1
+        next_chapter_index = position[0] + 1
         
         if next_chapter_index >= self.document.total_chapters:
             return False  # 已经是最后一章
         
         # 跳转到下一章的第一页
-        next_chapter_page = self.paginator.get_page_by_chapter(next_chapter_index)
+        next_chapter_page = self.paginator.get_chapter_start_page(next_chapter_index)
         if next_chapter_page:
-            self.current_page = next_chapter_page.page_number
+            self.current_page = next_chapter_page
             self._update_progress()
             return True
         
@@ -172,20 +247,21 @@ class ReaderService:
         if self.document is None or self.paginator is None:
             return False
         
-        current_page_obj = self.get_current_page()
-        if current_page_obj is None:
+        self._sync_page()
+        position = self.paginator.find_page_position(self.current_page)
+        if position is None:
             return False
         
         # 获取上一章的索引
-        prev_chapter_index = current_page_obj.chapter_index - 1
+        prev_chapter_index = position[0] - 1
         
         if prev_chapter_index < 0:
             return False  # 已经是第一章
         
         # 跳转到上一章的第一页
-        prev_chapter_page = self.paginator.get_page_by_chapter(prev_chapter_index)
+        prev_chapter_page = self.paginator.get_chapter_start_page(prev_chapter_index)
         if prev_chapter_page:
-            self.current_page = prev_chapter_page.page_number
+            self.current_page = prev_chapter_page
             self._update_progress()
             return True
         
@@ -202,12 +278,17 @@ class ReaderService:
     
     def jump_to_end(self) -> bool:
         """
-        跳到结尾
+        跳到结尾（需要完整排版才能确定最后一页）
         
         Returns:
             是否成功跳转
         """
-        return self.jump_to_page(self.total_pages)
+        if self.paginator is None:
+            return False
+        # 完整排版后改为实际页码，先换算当前页码再跳转
+        total_pages = self.paginator.get_total_pages()
+        self._sync_page()
+        return self.jump_to_page(total_pages)
     
     def add_bookmark(self, note: Optional[str] = None):
         """
@@ -250,11 +331,13 @@ class ReaderService:
         if bookmark is None:
             return False
         
-        return self.jump_to_page(bookmark.page_number)
+        return self.jump_to_page(
+            self._find_position_page(bookmark.chapter_index, bookmark.chapter_offset, bookmark.page_number)
+        )
     
     def update_terminal_size(self, rows: int, cols: int) -> None:
         """
-        更新终端尺寸并重新分页
+        更新终端尺寸并重新分页，停留在包含同一字符的页面
         
         Args:
             rows: 新的行数
@@ -263,21 +346,27 @@ class ReaderService:
         if self.paginator is None or self.document is None:
             return
         
-        # 记录当前位置（通过内容位置而不是页码）
-        current_page_obj = self.get_current_page()
-        if current_page_obj is None:
-            return
-        
-        current_chapter = current_page_obj.chapter_index
-        
-        # 更新分页器
-        self.paginator.update_terminal_size(rows, cols)
-        self.total_pages = self.paginator.get_total_pages()
-        
-        # 恢复到相同章节的第一页
-        new_page = self.paginator.get_page_by_chapter(current_chapter)
+        # 记录当前位置（章节和章内字符偏移，连续调整尺寸时沿用最初的锚点）
+        self._sync_page()
+        anchor = self._anchor
+        if anchor is None or anchor[0] != self.current_page:
+            current_page_obj = self.get_current_page()
+            if current_page_obj is None:
+                return
+            anchor = (self.current_page, current_page_obj.chapter_index, current_page_obj.start_offset)
+        
+        _, chapter_index, offset = anchor
+        
+        # 有排版管理时从共享的缓存获取新尺寸的分页器（同一尺寸只排版一次），
+        # 否则更新分页器，只对当前章节换行（之前的内容较多时不换行，页码从估计值开始）
+        if self.layout_manager is not None:
+            self.paginator = self._create_paginator(rows, cols)
+        else:
+            self.paginator.update_terminal_size(rows, cols)
+        new_page = self.paginator.find_page_by_offset(chapter_index, offset)
         if new_page:
-            self.current_page = new_page.page_number
+            self.current_page = new_page
+            self._anchor = (new_page, chapter_index, offset)
     
     def _update_progress(self) -> None:
         """更新阅读进度"""
@@ -288,8 +377,10 @@ class ReaderService:
         if current_page_obj is None:
             return
         
-        # 创建或更新进度
+        # 创建或更新进度（排版未完成时总页数使用估算值，每次更新时刷新，
+        # 排版完成后换成实际页数）
         progress = self.progress_service.load_progress(self.file_path)
+        total_pages = self.total_pages
         
         if progress is None:
             # 创建新进度
@@ -298,11 +389,14 @@ class ReaderService:
                 self.document,
                 self.current_page,
                 current_page_obj.chapter_index,
-                self.total_pages
+                total_pages,
+                current_page_obj.start_offset
             )
         else:
             # 更新现有进度
-            progress.update_position(self.current_page, current_page_obj.chapter_index)
+            progress.update_position(
+                self.current_page, current_page_obj.chapter_index, current_page_obj.start_offset, total_pages
+            )
         
         self.progress_service.save_progress(progress)
     
@@ -1,11 +1,11 @@
 """工具函数模块"""
 
 from .crypto import hash_password, verify_password, generate_salt
-from .file_utils import ensure_dir, atomic_write, get_file_hash, get_config_dir
+from .file_utils import ensure_dir, atomic_write, get_file_hash, get_file_fingerprint, get_config_dir
 from .text_utils import truncate_text, get_display_width, normalize_text
 
 __all__ = [
     'hash_password', 'verify_password', 'generate_salt',
-    'ensure_dir', 'atomic_write', 'get_file_hash', 'get_config_dir',
+    'ensure_dir', 'atomic_write', 'get_file_hash', 'get_file_fingerprint', 'get_config_dir',
     'truncate_text', 'get_display_width', 'normalize_text'
 ]
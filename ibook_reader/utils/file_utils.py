@@ -6,7 +6,7 @@ import os
 import shutil
 import tempfile
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Optional, Union
 
 
 def get_config_dir() -> Path:
@@ -38,13 +38,13 @@ def ensure_dir(path: Path) -> None:
             pass
 
 
-def atomic_write(file_path: Path, content: str, backup: bool = True) -> None:
+def atomic_write(file_path: Path, content: Union[str, bytes], backup: bool = True) -> None:
     """
     原子写入文件（先写入临时文件，再重命名）
     
     Args:
         file_path: 目标文件路径
-        content: 要写入的内容
+        content: 要写入的内容（bytes 按二进制写入）
         backup: 是否备份原文件
     """
     # 确保父目录存在
@@ -64,8 +64,12 @@ def atomic_write(file_path: Path, content: str, backup: bool = True) -> None:
     
     try:
         # 写入临时文件
-        with os.fdopen(fd, 'w', encoding='utf-8') as f:
-            f.write(content)
+        if isinstance(content, bytes):
+            with os.fdopen(fd, 'wb') as f:
+                f.write(content)
+        else:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(content)
         
         # 原子替换
         shutil.move(temp_path, file_path)
@@ -99,6 +103,35 @@ def get_file_hash(file_path: Path) -> str:
     return md5_hash.hexdigest()
 
 
+def get_file_fingerprint(file_path: Path, block_size: int = 65536) -> str:
+    """
+    计算文件的快速指纹：文件大小、修改时间与首尾两块内容的MD5
+    
+    只读取文件首尾各一块，打开大文件时不必读完整个文件，适合作为可重建缓存
+    （如页表缓存）的键；需要精确识别内容时使用 get_file_hash。
+    
+    Args:
+        file_path: 文件路径
+        block_size: 首尾各读取的字节数
+        
+    Returns:
+        指纹（十六进制字符串）
+    """
+    if not file_path.exists():
+        raise FileNotFoundError(f"文件不存在: {file_path}")
+    
+    stat = file_path.stat()
+    md5_hash = hashlib.md5(f"{stat.st_size}:{stat.st_mtime_ns}:".encode('ascii'))
+    
+    with open(file_path, 'rb') as f:
+        md5_hash.update(f.read(block_size))
+        if stat.st_size > block_size:
+            f.seek(max(block_size, stat.st_size - block_size))
+            md5_hash.update(f.read(block_size))
+    
+    return md5_hash.hexdigest()
+
+
 def read_json_file(file_path: Path, default: Any = None) -> Any:
     """
     读取JSON文件
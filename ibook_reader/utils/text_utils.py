@@ -1,37 +1,289 @@
 """文本处理工具模块"""
 
+import re
 import unicodedata
-from typing import Optional
+from typing import Dict, Optional, Tuple
 
 
-def get_char_width(char: str) -> int:
+# BMP 宽度表覆盖的码位数量
+_BMP_SIZE = 0x10000
+
+# 辅助平面按块缓存宽度，每块的码位数量
+_ASTRAL_BLOCK_SIZE = 0x100
+
+# 不占显示宽度的格式字符（零宽空格、零宽连接符等）
+_ZERO_WIDTH_CHARS = frozenset('\u200b\u200c\u200d\u2060\ufeff')
+
+# 断行类别（参照 UAX #14 简化），0 表示文本开头
+_BREAK_AL = 1      # 字母、数字等普通字符
+_BREAK_SP = 2      # 空格
+_BREAK_ID = 3      # 表意文字、假名、谚文、全角字母
+_BREAK_CL = 4      # 中日文结束标点及不能出现在行首的字符（避头）
+_BREAK_IS = 5      # 西文结束标点，前面不能断行
+_BREAK_OP = 6      # 中日文开始标点（避尾）
+_BREAK_OP_ASCII = 7  # 西文开始括号
+_BREAK_HY = 8      # 连字符
+_BREAK_CM = 9      # 组合字符，前面不能断行
+_BREAK_ZW = 10     # 零宽空格，后面可以断行
+_BREAK_WJ = 11     # 不换行空格、连接符，前后都不能断行
+_BREAK_B2 = 12     # 破折号，前后可以断行，但两个之间不能断开
+
+_BREAK_CLASS_CHARS = {
+    _BREAK_SP: ' \t',
+    _BREAK_CL: (
+        '、。，．：；！？）］｝〉》」』】〕〗〙〛｠”’…‥〜～ー々〻ゝゞヽヾ・'
+        'ぁぃぅぇぉっゃゅょゎゕゖァィゥェォッャュョヮヵヶ｡｣､･'
+    ),
+    _BREAK_IS: ',.;:!?)]}%',
+    _BREAK_OP: '（［｛〈《「『【〔〖〘〚｟“‘｢',
+    _BREAK_OP_ASCII: '([{',
+    _BREAK_HY: '-\u2010',
+    _BREAK_CM: '\u200c\u200d',
+    _BREAK_ZW: '\u200b',
+    _BREAK_WJ: '\u00a0\u202f\u2060\ufeff',
+    _BREAK_B2: '\u2014\u2015\u2e3a',
+}
+
+# 可以断开的相邻类别组合：下标为 (前一字符类别 << 4) | 后一字符类别
+_break_pair_table: Optional[bytes] = None
+_break_class_table: Optional[str] = None
+_astral_pattern = re.compile('[\U00010000-\U0010ffff]')
+
+_bmp_width_table: Optional[bytearray] = None
+_astral_width_blocks: Dict[int, bytearray] = {}
+_non_narrow_pattern: Optional['re.Pattern[str]'] = None
+
+
+def _compute_char_width(char: str) -> int:
     """
-    获取单个字符的显示宽度
+    根据 Unicode 属性计算单个字符的显示宽度
     
     Args:
         char: 单个字符
         
     Returns:
-        显示宽度（1或2）
+        显示宽度（0、1或2）
     """
-    if not char:
+    # 组合附加符号和零宽字符不占宽度
+    if char in _ZERO_WIDTH_CHARS or unicodedata.category(char) in ('Mn', 'Me'):
         return 0
     
     # 获取Unicode East Asian Width属性
     width = unicodedata.east_asian_width(char)
     
     # F(Fullwidth)和W(Wide)占2个宽度
-    if width in ('F', 'W'):
-        return 2
-    # Na(Narrow)和H(Halfwidth)占1个宽度
-    elif width in ('Na', 'H'):
-        return 1
     # A(Ambiguous)在东亚环境中通常占2个宽度
-    elif width == 'A':
+    if width in ('F', 'W', 'A'):
         return 2
-    # N(Neutral)占1个宽度
-    else:
-        return 1
+    # Na(Narrow)、H(Halfwidth)和N(Neutral)占1个宽度
+    return 1
+
+
+def get_width_table() -> bytearray:
+    """
+    获取 BMP 字符宽度表（首次调用时构建，之后复用）
+    
+    Returns:
+        按码位索引的宽度表
+    """
+    global _bmp_width_table
+    
+    if _bmp_width_table is None:
+        _bmp_width_table = bytearray(
+            _compute_char_width(chr(code_point)) for code_point in range(_BMP_SIZE)
+        )
+    
+    return _bmp_width_table
+
+
+def get_code_point_width(code_point: int) -> int:
+    """
+    按码位获取字符显示宽度
+    
+    Args:
+        code_point: Unicode 码位
+        
+    Returns:
+        显示宽度（0、1或2）
+    """
+    if code_point < _BMP_SIZE:
+        return get_width_table()[code_point]
+    
+    # 辅助平面按块构建宽度表
+    block_index = code_point // _ASTRAL_BLOCK_SIZE
+    block = _astral_width_blocks.get(block_index)
+    if block is None:
+        block_start = block_index * _ASTRAL_BLOCK_SIZE
+        block = bytearray(
+            _compute_char_width(chr(block_start + i)) for i in range(_ASTRAL_BLOCK_SIZE)
+        )
+        _astral_width_blocks[block_index] = block
+    
+    return block[code_point % _ASTRAL_BLOCK_SIZE]
+
+
+def _get_non_narrow_pattern() -> 're.Pattern[str]':
+    """
+    获取匹配非单宽字符的正则（首次调用时根据宽度表构建）
+    
+    Returns:
+        匹配宽度不为1的字符的正则表达式
+    """
+    global _non_narrow_pattern
+    
+    if _non_narrow_pattern is None:
+        table = get_width_table()
+        ranges = []
+        code_point = 0
+        while code_point < _BMP_SIZE:
+            if table[code_point] == 1:
+                code_point += 1
+                continue
+            range_start = code_point
+            while code_point < _BMP_SIZE and table[code_point] != 1:
+                code_point += 1
+            ranges.append(f'\\u{range_start:04x}-\\u{code_point - 1:04x}')
+        # 辅助平面字符一律按非单宽处理
+        ranges.append('\\U00010000-\\U0010ffff')
+        _non_narrow_pattern = re.compile('[' + ''.join(ranges) + ']')
+    
+    return _non_narrow_pattern
+
+
+def is_narrow_text(text: str) -> bool:
+    """
+    判断文本是否只包含单宽字符（每个字符显示宽度都为1）
+    
+    Args:
+        text: 文本内容
+        
+    Returns:
+        是否全部为单宽字符
+    """
+    return text.isascii() or _get_non_narrow_pattern().search(text) is None
+
+
+def _get_break_class(code_point: int) -> int:
+    """
+    计算单个码位的断行类别
+    
+    Args:
+        code_point: Unicode 码位
+    
+    Returns:
+        断行类别
+    """
+    char = chr(code_point)
+    for break_class, chars in _BREAK_CLASS_CHARS.items():
+        if char in chars:
+            return break_class
+    
+    if unicodedata.category(char) in ('Mn', 'Me', 'Mc'):
+        return _BREAK_CM
+    if unicodedata.east_asian_width(char) in ('W', 'F'):
+        return _BREAK_ID
+    return _BREAK_AL
+
+
+def _is_break_allowed(before: int, after: int) -> bool:
+    """
+    判断两个相邻字符之间能否断行
+    
+    Args:
+        before: 前一字符的断行类别
+        after: 后一字符的断行类别
+    
+    Returns:
+        能否断行
+    """
+    if before == 0 or after in (_BREAK_CL, _BREAK_IS, _BREAK_CM, _BREAK_WJ, _BREAK_ZW):
+        return False
+    if before in (_BREAK_OP, _BREAK_OP_ASCII, _BREAK_WJ):
+        return False
+    if before == _BREAK_ZW:
+        return True
+    # 空格留在行尾，在空格串之后断行
+    if after == _BREAK_SP:
+        return False
+    if before == _BREAK_SP:
+        return True
+    if before == _BREAK_B2 and after == _BREAK_B2:
+        return False
+    # 表意文字前后、中日文结束标点之后、开始标点之前都可以断行
+    if before in (_BREAK_ID, _BREAK_CL, _BREAK_B2) or after in (_BREAK_ID, _BREAK_OP, _BREAK_B2):
+        return True
+    # 西文单词内部不断开，连字符之后可以断行
+    return before == _BREAK_HY and after == _BREAK_AL
+
+
+def _get_break_tables() -> Tuple[str, bytes]:
+    """
+    获取断行类别表和相邻类别断行表（首次调用时构建）
+    
+    Returns:
+        (BMP 码位到类别字符的转换表, 相邻类别断行表) 元组
+    """
+    global _break_class_table, _break_pair_table
+    
+    if _break_class_table is None:
+        classes = bytearray(_get_break_class(code_point) for code_point in range(_BMP_SIZE))
+        _break_class_table = classes.decode('latin-1')
+        _break_pair_table = bytes(
+            _is_break_allowed(pair >> 4, pair & 0x0f) for pair in range(256)
+        )
+    
+    return _break_class_table, _break_pair_table
+
+
+def _astral_break_class(match: 're.Match[str]') -> str:
+    """辅助平面字符的断行类别（作为 re.sub 的替换函数）"""
+    return chr(_get_break_class(ord(match.group())))
+
+
+def get_break_flags(text: str) -> bytes:
+    """
+    计算文本中每个位置能否断行
+    
+    先把每个字符转换为断行类别，再按相邻两个字符的类别查表，整个过程都由
+    str.translate、大整数移位和 bytes.translate 完成，不逐字符循环。
+    结果只与文本有关，任意列宽换行时都可以重复使用。
+    
+    Args:
+        text: 文本内容
+    
+    Returns:
+        与文本等长的字节串，第 i 个字节为1表示可以在第 i 个字符之前断行
+    """
+    class_table, pair_table = _get_break_tables()
+    
+    mapped = text.translate(class_table)
+    try:
+        classes = mapped.encode('latin-1')
+    except UnicodeEncodeError:
+        # 辅助平面字符不在转换表中，单独分类
+        classes = _astral_pattern.sub(_astral_break_class, mapped).encode('latin-1')
+    
+    # 类别都小于16：左移一个字节再左移4位后与原值按位或，
+    # 每个字节的高4位是前一字符的类别，低4位是当前字符的类别
+    packed = int.from_bytes(classes, 'little')
+    pairs = ((packed << 12) | packed).to_bytes(len(classes) + 2, 'little')[:len(classes)]
+    return pairs.translate(pair_table)
+
+
+def get_char_width(char: str) -> int:
+    """
+    获取单个字符的显示宽度
+    
+    Args:
+        char: 单个字符
+        
+    Returns:
+        显示宽度（0、1或2）
+    """
+    if not char:
+        return 0
+    
+    return get_code_point_width(ord(char))
 
 
 def get_display_width(text: str) -> int:
@@ -44,7 +296,15 @@ def get_display_width(text: str) -> int:
     Returns:
         显示宽度
     """
-    return sum(get_char_width(char) for char in text)
+    if text.isascii():
+        return len(text)
+    
+    table = get_width_table()
+    try:
+        return sum(map(table.__getitem__, map(ord, text)))
+    except IndexError:
+        # 包含辅助平面字符
+        return sum(get_code_point_width(ord(char)) for char in text)
 
 
 def truncate_text(text: str, max_width: int, suffix: str = '...') -> str:
@@ -65,11 +325,13 @@ def truncate_text(text: str, max_width: int, suffix: str = '...') -> str:
     suffix_width = get_display_width(suffix)
     target_width = max_width - suffix_width
     
+    table = get_width_table()
     current_width = 0
     result = []
     
     for char in text:
-        char_width = get_char_width(char)
+        code_point = ord(char)
+        char_width = table[code_point] if code_point < _BMP_SIZE else get_code_point_width(code_point)
         if current_width + char_width > target_width:
             break
         result.append(char)
@@ -112,12 +374,24 @@ def wrap_text(text: str, max_width: int) -> list[str]:
     if not text:
         return ['']
     
+    # 只含单宽字符时按固定步长切片
+    if max_width > 0 and is_narrow_text(text):
+        pieces = text.split('\n')
+        last_piece = pieces.pop()
+        lines = []
+        for piece in pieces:
+            lines.extend([piece[i:i + max_width] for i in range(0, len(piece), max_width)] or [''])
+        lines.extend(last_piece[i:i + max_width] for i in range(0, len(last_piece), max_width))
+        return lines if lines else ['']
+    
+    table = get_width_table()
     lines = []
     current_line = []
     current_width = 0
     
     for char in text:
-        char_width = get_char_width(char)
+        code_point = ord(char)
+        char_width = table[code_point] if code_point < _BMP_SIZE else get_code_point_width(code_point)
         
         # 如果当前字符是换行符
         if char == '\n':
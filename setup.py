@@ -40,6 +40,9 @@ setup(
         'beautifulsoup4>=4.11.0',
         'lxml>=4.9.0',
     ],
+    extras_require={
+        'fast': ['numpy>=1.20'],
+    },
     entry_points={
         'console_scripts': [
             'ibook=ibook_reader.cli:main',
@@ -9,6 +9,7 @@ from ibook_reader.utils.file_utils import (
     ensure_dir,
     atomic_write,
     get_file_hash,
+    get_file_fingerprint,
     read_json_file,
     write_json_file,
     get_file_size,
@@ -113,6 +114,45 @@ class TestFileUtils:
         with pytest.raises(FileNotFoundError):
             get_file_hash(test_file)
     
+    def test_get_file_fingerprint(self, tmp_path, monkeypatch):
+        """测试快速指纹只读取首尾两块，随大小、修改时间和首尾内容变化"""
+        import os
+        import builtins
+        
+        test_file = tmp_path / 'book.txt'
+        test_file.write_bytes(b'a' * 100 + b'b' * 1000 + b'c' * 100)
+        os.utime(test_file, ns=(1, 1))
+        fingerprint = get_file_fingerprint(test_file, block_size=100)
+        assert fingerprint == get_file_fingerprint(test_file, block_size=100)
+        
+        # 只读取首尾两块
+        reads = []
+        original_open = builtins.open
+        
+        def tracking_open(*args, **kwargs):
+            f = original_open(*args, **kwargs)
+            original_read = f.read
+            f.read = lambda size=-1: reads.append(size) or original_read(size)
+            return f
+        
+        monkeypatch.setattr(builtins, 'open', tracking_open)
+        get_file_fingerprint(test_file, block_size=100)
+        monkeypatch.undo()
+        assert reads == [100, 100]
+        
+        # 末尾内容变化
+        test_file.write_bytes(b'a' * 100 + b'b' * 1000 + b'd' * 100)
+        os.utime(test_file, ns=(1, 1))
+        assert get_file_fingerprint(test_file, block_size=100) != fingerprint
+        
+        # 修改时间变化
+        test_file.write_bytes(b'a' * 100 + b'b' * 1000 + b'c' * 100)
+        os.utime(test_file, ns=(2, 2))
+        assert get_file_fingerprint(test_file, block_size=100) != fingerprint
+        
+        with pytest.raises(FileNotFoundError):
+            get_file_fingerprint(tmp_path / 'not_exist.txt')
+    
     def test_read_json_file(self, tmp_path):
         """测试读取JSON文件"""
         test_file = tmp_path / 'test.json'
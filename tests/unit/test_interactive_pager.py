@@ -0,0 +1,316 @@
+"""测试交互式分页器"""
+
+import pytest
+from ibook_reader.core.interactive_pager import InteractivePager
+
+
+@pytest.fixture
+def pager():
+    """创建 40 行终端的分页器"""
+    pager = InteractivePager([f"第{i}行" + "内容" * 30 for i in range(200)])
+    pager.terminal_height = 40
+    pager.terminal_width = 80
+    pager.display_lines = 39
+    return pager
+
+
+class TestInteractivePager:
+    """交互式分页器测试类"""
+
+    def test_display_page(self, pager, capsys):
+        """测试整屏重绘"""
+        pager.display_page()
+        output = capsys.readouterr().out
+
+        assert output.startswith('\033[2J')
+        assert '\033[1;1H\033[2K第0行' in output
+        assert '\033[39;1H\033[2K第38行' in output
+        assert '第39行内' not in output
+        assert '\033[40;1H' in output
+
+    def test_next_line_scrolls(self, pager, capsys):
+        """测试下移一行时只输出新露出的行和状态栏"""
+        pager.display_page()
+        full = capsys.readouterr().out
+
+        assert pager.next_line()
+        pager.render()
+        output = capsys.readouterr().out
+
+        assert '\033[2J' not in output
+        assert output.startswith('\033[1;1H\033[1M')
+        assert '\033[39;1H\033[2K第39行' in output
+        assert '第1行内' not in output
+        assert len(output.encode()) * 10 < len(full.encode())
+
+    def test_prev_line_scrolls(self, pager, capsys):
+        """测试上移一行时在顶部插入新行"""
+        pager.current_line = 10
+        pager.display_page()
+        capsys.readouterr()
+
+        assert pager.prev_line()
+        pager.render()
+        output = capsys.readouterr().out
+
+        assert output.startswith('\033[1;1H\033[1L')
+        assert '\033[1;1H\033[2K第9行' in output
+        assert '第10行内' not in output
+
+    def test_page_move_redraws_changed_rows(self, pager, capsys):
+        """测试翻页时只重绘内容变化的行"""
+        # 两屏的第 11-20 行内容相同
+        for i in range(10, 20):
+            pager.lines[i] = pager.lines[i + 39] = ""
+        pager.display_page()
+        capsys.readouterr()
+
+        assert pager.next_page()
+        pager.render()
+        output = capsys.readouterr().out
+
+        assert '\033[2J' not in output
+        assert '\033[1;1H\033[2K第39行' in output
+        assert '\033[11;1H' not in output
+        assert '\033[20;1H' not in output
+        assert '\033[21;1H\033[2K第59行' in output
+
+    def test_jump_redraws(self, pager, capsys):
+        """测试跳转时重绘变化的行"""
+        pager.display_page()
+        capsys.readouterr()
+
+        assert pager.goto_end()
+        pager.render()
+        output = capsys.readouterr().out
+
+        assert '\033[1;1H\033[2K第161行' in output
+        assert '第199行' in output
+
+    def test_handle_keys_coalesced(self, pager, capsys):
+        """测试一批按键合并处理后只刷新一次"""
+        pager.display_page()
+        capsys.readouterr()
+
+        assert not pager.handle_keys("jjjjjk")
+        assert pager.current_line == 4
+        pager.render()
+        output = capsys.readouterr().out
+        assert output.startswith('\033[1;1H\033[4M')
+        assert output.count('\033[2K') == 5
+
+        # 退出键之后的按键不再处理
+        assert pager.handle_keys("jjqjj")
+        assert pager.current_line == 6
+
+    def test_read_keys_drains_pending_input(self, pager):
+        """测试读取按键时读出所有已排队的按键"""
+        import os
+
+        read_fd, write_fd = os.pipe()
+        try:
+            os.write(write_fd, b"j" * 30 + b" ")
+            assert pager._read_keys(read_fd) == "j" * 30 + " "
+
+            os.close(write_fd)
+            write_fd = None
+            assert pager._read_keys(read_fd) == ""
+        finally:
+            os.close(read_fd)
+            if write_fd is not None:
+                os.close(write_fd)
+
+    def test_handle_resize(self, capsys):
+        """测试终端尺寸变化后重新排版并停留在同一段文字上"""
+        from ibook_reader.core.background_layout import BackgroundLayout
+        from ibook_reader.core.paginator import Paginator
+        from ibook_reader.models.document import Document, Chapter
+
+        content = "".join(f"第{j}段的内容，" * 10 + "\n" for j in range(100))
+        doc = Document("文档", chapters=[Chapter(0, "第一章", content)])
+        layout = BackgroundLayout(Paginator(doc, rows=24, cols=80))
+        layout.run()
+
+        pager = InteractivePager(layout)
+        pager.terminal_height, pager.terminal_width = 24, 80
+        pager.current_line = next(i for i, text in enumerate(layout) if text.startswith("第50段"))
+        pager.display_page()
+        capsys.readouterr()
+
+        assert not pager.handle_resize(24, 80)
+        assert pager.handle_resize(30, 120)
+        output = capsys.readouterr().out
+
+        assert pager.display_lines == 29
+        assert layout[pager.current_line].startswith("第50段")
+        assert output.startswith('\033[1;29r')
+        assert '\033[2J' in output
+
+
+    def test_sync_lines_keeps_screen(self, capsys):
+        """测试提前排版的部分换成实际行号后屏幕内容不变，只重绘状态栏"""
+        from ibook_reader.core.background_layout import BackgroundLayout
+        from ibook_reader.core.paginator import Paginator
+        from ibook_reader.models.document import Document, Chapter
+
+        chapters = [
+            Chapter(i, f"第{i + 1}章", "".join(f"第{i + 1}章第{j}段的内容，" * 8 + "\n" for j in range(40)))
+            for i in range(4)
+        ]
+        doc = Document("文档", chapters=chapters)
+        layout = BackgroundLayout(Paginator(doc, rows=24, cols=80))
+        layout.start = lambda: None
+        line = layout.start_at(2, chapters[2].content.index("第3章第10段"))
+
+        pager = InteractivePager(layout, start_line=line)
+        pager.terminal_height, pager.terminal_width, pager.display_lines = 24, 80, 23
+        pager.display_page()
+        capsys.readouterr()
+
+        # 顺序排版追上之前行号不变
+        assert not pager._sync_lines()
+        layout.run()
+        assert pager._sync_lines()
+        assert pager.current_line != line
+        assert layout[pager.current_line].startswith("第3章第10段")
+
+        pager.render()
+        output = capsys.readouterr().out
+        assert output.count('\033[2K') == 1
+        assert '\033[24;1H' in output
+
+    def test_status_refreshed_when_layout_completes(self, capsys):
+        """测试两次刷新之间排版完成时，状态栏立即改为实际的总行数"""
+        from ibook_reader.core.background_layout import BackgroundLayout
+        from ibook_reader.core.paginator import Paginator
+        from ibook_reader.models.document import Document, Chapter
+
+        chapters = [Chapter(i, f"第{i + 1}章", f"第{i + 1}章的内容\n" * 40) for i in range(3)]
+        layout = BackgroundLayout(Paginator(Document("文档", chapters=chapters), rows=24, cols=80))
+        layout.start = lambda: None
+
+        pager = InteractivePager(layout)
+        pager.terminal_height, pager.terminal_width, pager.display_lines = 24, 80, 23
+        pager.display_page()
+        assert '/~' in capsys.readouterr().out
+        assert not pager._status_outdated()
+
+        # 排版完成后行号不变，但状态栏过时
+        layout.run()
+        assert not pager._sync_lines()
+        assert pager._status_outdated()
+
+        pager.render()
+        output = capsys.readouterr().out
+        assert '/~' not in output
+        assert f"/{len(layout)} " in output
+        assert not pager._status_outdated()
+
+    def test_wait_resize_settled(self, pager):
+        """测试连续的终端尺寸变化信号合并为一次"""
+        import os
+
+        read_fd, write_fd = os.pipe()
+        os.set_blocking(read_fd, False)
+        try:
+            os.write(write_fd, b"\x1c" * 5)
+            pager._wait_resize_settled(read_fd)
+            with pytest.raises(BlockingIOError):
+                os.read(read_fd, 64)
+        finally:
+            os.close(read_fd)
+            os.close(write_fd)
+
+
+class TestFrameRenderer:
+    """差量帧渲染测试类"""
+
+    def _read_all(self, fd):
+        """读取管道中已写入的全部数据"""
+        import os
+        return os.read(fd, 1 << 20).decode('utf-8')
+
+    def test_render_changed_rows_in_one_write(self):
+        """测试只输出变化的行且每帧只写一次"""
+        import os
+        from ibook_reader.core.frame_renderer import FrameRenderer
+
+        read_fd, write_fd = os.pipe()
+        try:
+            renderer = FrameRenderer(fd=write_fd)
+            renderer.render(["第一行", "", "第三行", "状态"])
+            first = self._read_all(read_fd)
+            assert first.startswith('\033[2J')
+            assert '\033[2;1H' not in first
+            assert renderer.writes == 1
+
+            renderer.render(["第一行", "", "新的第三行", "状态"])
+            second = self._read_all(read_fd)
+            assert second == '\033[3;1H\033[2K新的第三行'
+            assert renderer.writes == 2
+
+            # 内容不变时不写入
+            assert renderer.render(["第一行", "", "新的第三行", "状态"]) == 0
+            assert renderer.writes == 2
+        finally:
+            os.close(read_fd)
+            os.close(write_fd)
+
+    def test_encoding_follows_stdout(self, monkeypatch):
+        """测试默认按标准输出的编码输出（非 UTF-8 终端）"""
+        import io
+        import os
+        import sys
+        from ibook_reader.core.frame_renderer import FrameRenderer
+
+        monkeypatch.setattr(sys, 'stdout', io.TextIOWrapper(io.BytesIO(), encoding='gb18030'))
+        read_fd, write_fd = os.pipe()
+        try:
+            renderer = FrameRenderer(fd=write_fd)
+            assert renderer.encoding == 'gb18030'
+            renderer.render(["第一行"])
+            assert os.read(read_fd, 1024) == '\033[2J\033[1;1H\033[2K第一行'.encode('gb18030')
+        finally:
+            os.close(read_fd)
+            os.close(write_fd)
+
+    def test_clip_rows_to_terminal_width(self):
+        """测试超出终端宽度的行被截断（按显示宽度，保留控制序列）"""
+        import os
+        from ibook_reader.core.frame_renderer import FrameRenderer
+
+        read_fd, write_fd = os.pipe()
+        try:
+            renderer = FrameRenderer(fd=write_fd)
+            renderer.render(["中文内容很长", "short", "\033[7m 状态栏 \033[0m"], width=6)
+            first = self._read_all(read_fd)
+            assert '\033[1;1H\033[2K中文内\033[2;1H' in first
+            assert first.endswith('\033[3;1H\033[2K\033[7m 状态\033[0m')
+
+            # 截断后的内容相同时不重绘
+            assert renderer.render(["中文内容很长很长", "short", "\033[7m 状态栏 \033[0m"], width=6) == 0
+        finally:
+            os.close(read_fd)
+            os.close(write_fd)
+
+    def test_scroll_keeps_screen_model(self):
+        """测试滚动后只输出新露出的行"""
+        import os
+        from ibook_reader.core.frame_renderer import FrameRenderer
+
+        read_fd, write_fd = os.pipe()
+        try:
+            renderer = FrameRenderer(fd=write_fd)
+            renderer.render(["a", "b", "c", "状态1"])
+            self._read_all(read_fd)
+
+            prefix = renderer.scroll(1, 3)
+            renderer.render(["b", "c", "d", "状态2"], prefix)
+            assert self._read_all(read_fd) == '\033[1;1H\033[1M\033[3;1H\033[2Kd\033[4;1H\033[2K状态2'
+
+            prefix = renderer.scroll(-1, 3)
+            renderer.render(["a", "b", "c", "状态1"], prefix)
+            assert self._read_all(read_fd) == '\033[1;1H\033[1L\033[1;1H\033[2Ka\033[4;1H\033[2K状态1'
+        finally:
+            os.close(read_fd)
+            os.close(write_fd)
@@ -293,6 +293,26 @@ class TestReadingProgress:
         assert progress.current_chapter == 5
         assert progress.read_percentage == 50.0
     
+    def test_progress_update_position_total_pages(self):
+        """测试更新位置时刷新总页数"""
+        progress = ReadingProgress(
+            file_path="/path",
+            file_hash="hash",
+            file_name="file",
+            current_page=1,
+            current_chapter=0,
+            total_pages=100,
+            total_chapters=10,
+            last_read_time=datetime.now().isoformat()
+        )
+        
+        # 估算的总页数偏小时，超过它的页码不会被截断
+        progress.update_position(150, 5, total_pages=200)
+        
+        assert progress.current_page == 150
+        assert progress.total_pages == 200
+        assert progress.read_percentage == 75.0
+    
     def test_progress_update_position_boundary(self):
         """测试更新位置边界处理"""
         progress = ReadingProgress(
@@ -357,3 +377,24 @@ class TestReadingProgress:
         assert progress.file_path == "/path/to/book.epub"
         assert progress.current_page == 25
         assert progress.current_chapter == 5
+        assert progress.chapter_offset is None
+    
+    def test_progress_chapter_offset(self):
+        """测试章内字符偏移的保存与恢复"""
+        progress = ReadingProgress(
+            file_path="/path/to/book.epub",
+            file_hash="abc123",
+            file_name="book.epub",
+            current_page=10,
+            current_chapter=2,
+            total_pages=100,
+            total_chapters=10,
+            last_read_time="2024-01-01T12:00:00"
+        )
+        progress.update_position(12, 3, 4567)
+        
+        restored = ReadingProgress.from_dict(progress.to_dict())
+        
+        assert restored.current_page == 12
+        assert restored.current_chapter == 3
+        assert restored.chapter_offset == 4567
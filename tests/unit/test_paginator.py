@@ -261,3 +261,1056 @@ class TestPaginator:
         all_content = '\n'.join(page.content for page in pages)
         assert "中文" in all_content
         assert "English" in all_content
+    
+    def test_page_table_offsets(self):
+        """测试页表只记录章节偏移"""
+        content = "第一行\n" + "很长的一行内容" * 30 + "\n\n最后一行\n\n\n"
+        chapters = [Chapter(0, "章节", content)]
+        doc = Document("文档", chapters=chapters)
+        
+        paginator = Paginator(doc, rows=16, cols=46)
+        table = paginator._get_page_table()
+        
+        assert len(table) == paginator.get_total_pages()
+        assert table.start_offsets.typecode == 'q'
+        assert table.get(0)[1] == 0
+        
+        # 页面内容去掉换行后应与章节内容的切片一致
+        for i in range(len(table)):
+            chapter_index, start, end = table.get(i)
+            page = paginator.get_page(i + 1)
+            assert page.content.replace('\n', '') == content[start:end].replace('\n', '')
+        
+        # 末尾多余的空行不计入最后一页
+        assert paginator.get_page(len(table)).content.endswith("最后一行")
+    
+    def test_page_split_inside_line(self):
+        """测试页面边界落在一行中间"""
+        content = "a" * 40 * 25
+        chapters = [Chapter(0, "章节", content)]
+        doc = Document("文档", chapters=chapters)
+        
+        paginator = Paginator(doc, rows=16, cols=46)
+        pages = paginator.paginate()
+        
+        assert len(pages) == 3
+        assert pages[0].content.split('\n') == ["a" * 40] * 10
+        assert pages[-1].content.split('\n') == ["a" * 40] * 5
+        assert ''.join(page.content.replace('\n', '') for page in pages) == content
+    
+    def test_large_doc_page_cache_window(self, monkeypatch):
+        """测试大文档只排版一次并只缓存窗口内的页面"""
+        content = "\n".join(f"第{i}行" for i in range(3000))
+        chapters = [Chapter(0, "章节", content)]
+        doc = Document("文档", chapters=chapters)
+        
+        paginator = Paginator(doc, rows=24, cols=80)
+        
+        layout_calls = []
+        original = paginator._wrap_chapter
+        monkeypatch.setattr(
+            paginator, '_wrap_chapter',
+            lambda *args: layout_calls.append(1) or original(*args)
+        )
+        
+        total = paginator.get_total_pages()
+        assert not paginator._is_small_doc
+        
+        for page_number in range(1, 30):
+            page = paginator.get_page(page_number)
+            assert page.page_number == page_number
+            assert paginator.get_total_pages() == total
+        
+        assert len(layout_calls) == 1
+        window = paginator.CACHE_WINDOW * 2 + 1
+        assert len(paginator._page_cache) <= window
+        
+        # 向前阅读时预取后续页面
+        assert 30 in paginator._page_cache
+        assert 29 - paginator.CACHE_WINDOW in paginator._page_cache
+        
+        # 向回翻页时预取前面的页面
+        paginator.get_page(10)
+        paginator.get_page(9)
+        assert 9 - paginator.CACHE_WINDOW in paginator._page_cache
+    
+    def test_chapter_start_page_index(self):
+        """测试章节起始页索引"""
+        chapters = [
+            Chapter(0, "第一章", "第一章内容\n" * 40),
+            Chapter(1, "第二章", ""),
+            Chapter(2, "第三章", "第三章内容\n" * 20),
+        ]
+        doc = Document("文档", chapters=chapters)
+        
+        paginator = Paginator(doc, rows=24, cols=80)
+        
+        assert paginator.get_chapter_start_page(0) == 1
+        # 空章节没有页面
+        assert paginator.get_chapter_start_page(1) is None
+        assert paginator.get_page_by_chapter(1) is None
+        
+        third_start = paginator.get_chapter_start_page(2)
+        assert third_start == 4
+        assert paginator.get_page(third_start).chapter_index == 2
+        assert paginator.find_page_position(third_start + 1) == (2, 2)
+        assert paginator.get_chapter_start_page(3) is None
+    
+    def test_wrap_line_ascii(self):
+        """测试纯ASCII长行换行"""
+        chapters = [Chapter(0, "章节", "内容")]
+        doc = Document("文档", chapters=chapters)
+        
+        paginator = Paginator(doc, rows=24, cols=46)
+        wrapped = paginator._wrap_line("abcd" * 25)
+        
+        assert wrapped == ["abcd" * 10, "abcd" * 10, "abcd" * 5]
+    
+    def test_wrap_line_break_opportunities(self):
+        """测试换行不拆开单词且标点不出现在行首"""
+        chapters = [Chapter(0, "章节", "内容")]
+        doc = Document("文档", chapters=chapters)
+        
+        paginator = Paginator(doc, rows=24, cols=46)
+        
+        # 单词不拆开，空格留在行尾
+        wrapped = paginator._wrap_line("hello wonderful world " * 3)
+        assert wrapped == ["hello wonderful world hello wonderful ", "world hello wonderful world "]
+        
+        # 句号不出现在行首，前一个字随句号一起换到下一行
+        wrapped = paginator._wrap_line("天地玄黄宇宙洪荒日月盈昃辰宿列张寒来暑往。秋收冬藏")
+        assert wrapped == ["天地玄黄宇宙洪荒日月盈昃辰宿列张寒来暑", "往。秋收冬藏"]
+        
+        # 没有可断位置时在溢出处强制断开
+        assert paginator._wrap_line("a" * 90) == ["a" * 40, "a" * 40, "a" * 10]
+    
+    def test_stream_wrap_giant_line(self):
+        """测试超长行按窗口流式换行与整行换行结果一致"""
+        content = "短行\n" + "天地玄黄，宇宙洪荒。hello wonderful world " * 200 + "\n   \n末行"
+        doc = Document("文档", chapters=[Chapter(0, "章节", content)])
+        
+        expected = Paginator(doc, rows=20, cols=60)
+        
+        paginator = Paginator(doc, rows=20, cols=60)
+        paginator.STREAM_WRAP_THRESHOLD = 1000
+        paginator.STREAM_WRAP_WINDOW = 100
+        
+        chapter = doc.chapters[0]
+        assert list(paginator._iter_chapter_lines(chapter)) == list(expected._iter_chapter_lines(chapter))
+        assert [p.content for p in paginator.iter_pages()] == [p.content for p in expected.paginate()]
+        assert paginator._break_flags == {}
+        
+        line = content.split('\n')[1]
+        assert paginator._wrap_line(line) == expected._wrap_line(line)
+    
+    def test_vectorized_layout_matches(self):
+        """测试NumPy排版与逐字符排版结果一致"""
+        pytest.importorskip("numpy")
+        
+        content = "\n".join([
+            "",
+            "这是中文This is English混合内容" * 5,
+            "",
+            "é" * 60 + "😀" * 30,
+            "   ",
+            "纯中文段落。" * 20,
+            "plain English words " * 8,
+            "零\u200b宽\u0301字符「引号」，标点。" * 6,
+            "",
+        ])
+        chapters = [Chapter(0, "章节", content), Chapter(1, "章节", content * 3)]
+        doc = Document("文档", chapters=chapters)
+        
+        expected = [page.content for page in Paginator(doc, rows=12, cols=46, vectorized=False).paginate()]
+        
+        paginator = Paginator(doc, rows=12, cols=46, vectorized=True)
+        assert paginator.vectorized
+        assert [page.content for page in paginator.paginate()] == expected
+        assert set(paginator._width_indexes) == {0, 1}
+        
+        # 列宽小于单个宽字符时强制每段一个字符
+        narrow = Paginator(doc, rows=12, cols=7, vectorized=True)
+        narrow.available_cols = 1
+        reference = Paginator(doc, rows=12, cols=7, vectorized=False)
+        reference.available_cols = 1
+        for chapter in chapters:
+            assert narrow._wrap_chapter(chapter) == reference._wrap_chapter(chapter)
+            assert list(narrow._iter_chapter_lines(chapter)) == list(reference._iter_chapter_lines(chapter))
+        
+        # 调整宽度后复用累计宽度索引重新换行
+        width_indexes = dict(paginator._width_indexes)
+        paginator.update_terminal_size(12, 60)
+        expected = [page.content for page in Paginator(doc, rows=12, cols=60, vectorized=False).paginate()]
+        assert [page.content for page in paginator.paginate()] == expected
+        assert all(paginator._width_indexes[i] is index for i, index in width_indexes.items())
+    
+    def test_height_change_keeps_line_index(self, monkeypatch):
+        """测试只改变行数时不重新换行"""
+        content = "\n".join(f"第{i}段" + "内容" * (i % 40) for i in range(300))
+        chapters = [Chapter(0, "第一章", content), Chapter(1, "第二章", content + "\n\n\n")]
+        doc = Document("文档", chapters=chapters)
+        
+        paginator = Paginator(doc, rows=24, cols=80)
+        paginator.get_total_pages()
+        
+        layout_calls = []
+        original = paginator._wrap_chapter
+        monkeypatch.setattr(
+            paginator, '_wrap_chapter',
+            lambda *args: layout_calls.append(1) or original(*args)
+        )
+        
+        for rows in (30, 17, 40):
+            paginator.update_terminal_size(rows, 80)
+            expected = [page.content for page in Paginator(doc, rows=rows, cols=80).paginate()]
+            assert [page.content for page in paginator.paginate()] == expected
+        
+        assert layout_calls == []
+        
+        # 列宽变化时重新换行
+        paginator.update_terminal_size(40, 60)
+        paginator.get_total_pages()
+        assert len(layout_calls) == 2
+    
+    def test_iter_pages_lazy(self, monkeypatch):
+        """测试按需生成页面，只排版需要的章节"""
+        chapters = [Chapter(i, f"第{i + 1}章", f"第{i + 1}章的内容\n" * 50) for i in range(10)]
+        doc = Document("文档", chapters=chapters)
+        
+        expected = [page.content for page in Paginator(doc, rows=24, cols=80).paginate()]
+        
+        # 逐字符换行时才经过 _iter_chapter_lines
+        paginator = Paginator(doc, rows=24, cols=80, vectorized=False)
+        wrapped = []
+        original = paginator._iter_chapter_lines
+        monkeypatch.setattr(
+            paginator, '_iter_chapter_lines',
+            lambda chapter: wrapped.append(chapter.index) or original(chapter)
+        )
+        
+        pages = paginator.get_pages(1, 3)
+        assert [page.page_number for page in pages] == [1, 2, 3]
+        assert [page.content for page in pages] == expected[:3]
+        assert wrapped == [0]
+        
+        pages = paginator.get_pages(5, 2)
+        assert [page.content for page in pages] == expected[4:6]
+        assert wrapped == [0, 1]
+        
+        assert paginator.get_chapter_start_page(3) == 10
+        assert wrapped == [0, 1, 2, 3]
+        
+        # 完整排版后结果一致，已换行的章节不再重复换行
+        assert [page.content for page in paginator.iter_pages()] == expected
+        assert paginator.get_total_pages() == len(expected)
+        assert wrapped == list(range(10))
+        assert paginator.get_pages(len(expected), 5)[0].content == expected[-1]
+    
+    def test_iter_pages_stops_inside_chapter(self):
+        """测试只需要前几页时不会对整章换行"""
+        chapters = [Chapter(0, "章节", "很长的一章\n" * 5000)]
+        doc = Document("文档", chapters=chapters)
+        
+        paginator = Paginator(doc, rows=24, cols=80)
+        pages = paginator.get_pages(2, 2)
+        
+        assert [page.page_number for page in pages] == [2, 3]
+        assert pages[0].content == "\n".join(["很长的一章"] * 18)
+        assert paginator._line_index.chapter_count == 0
+    
+    def test_iter_render_pages_headings(self):
+        """测试显示行中的章节标题"""
+        chapters = [
+            Chapter(0, "第一章", "第一章的内容\n" * 30),
+            Chapter(1, "第二章", "第二章的内容\n" * 30),
+        ]
+        doc = Document("文档", chapters=chapters)
+        paginator = Paginator(doc, rows=24, cols=80)
+        
+        rendered = list(paginator.iter_render_pages())
+        pages = [page for page, _ in rendered]
+        assert [page.content for page in pages] == [page.content for page in paginator.paginate()]
+        
+        # 输出中的第一个标题前不加空行，之后每章第一页前加入标题
+        assert rendered[0][1][:2] == ["第一章", ""]
+        assert rendered[1][1] == pages[1].content.split('\n')
+        second = next(lines for page, lines in rendered if page.chapter_index == 1)
+        assert second[:3] == ["", "第二章", ""]
+        
+        # 从章节中间开始输出时同样先输出所在章节的标题
+        page, lines = next(paginator.iter_render_pages(2))
+        assert lines == ["第一章", ""] + page.content.split('\n')
+    
+    def test_page_start_prefix_sums(self):
+        """测试排版完成前按页数前缀和查找页面，空章节不占页码"""
+        chapters = [
+            Chapter(i, f"第{i + 1}章", "" if i % 3 == 1 else f"第{i + 1}章的内容\n" * (20 + i * 7))
+            for i in range(9)
+        ]
+        doc = Document("文档", chapters=chapters)
+        pages = list(Paginator(doc, rows=12, cols=60).paginate())
+        
+        paginator = Paginator(doc, rows=12, cols=60)
+        for page in pages[:-1]:
+            located = paginator.get_page(page.page_number)
+            assert (located.chapter_index, located.content) == (page.chapter_index, page.content)
+        
+        line_index = paginator._line_index
+        page_starts = line_index.page_starts(12)
+        assert len(page_starts) == line_index.chapter_count + 1
+        assert paginator.get_chapter_start_page(1) is None
+        assert paginator.get_chapter_start_page(2) == page_starts[2] + 1
+        
+        # 行数变化后前缀和重新计算
+        for rows in (24, 12):
+            assert list(line_index.page_starts(rows)) == [
+                sum(line_index.chapter_page_count(j, rows) for j in range(i))
+                for i in range(line_index.chapter_count + 1)
+            ]
+    
+    def test_find_page_by_offset(self):
+        """测试按章内偏移查找页码，尚未排版时不对之后的章节换行"""
+        chapters = [Chapter(i, f"第{i + 1}章", "章节内容的一行\n" * 100) for i in range(4)]
+        doc = Document("文档", chapters=chapters)
+        
+        reference = Paginator(doc, rows=24, cols=80)
+        pages = reference.paginate()
+        
+        paginator = Paginator(doc, rows=24, cols=80)
+        for page in pages:
+            offset = (page.start_offset + page.end_offset) // 2
+            assert reference.find_page_by_offset(page.chapter_index, offset) == page.page_number
+        
+        page = pages[reference.get_chapter_start_page(1)]
+        assert paginator.find_page_by_offset(1, page.start_offset + 5) == page.page_number
+        assert paginator._line_index.chapter_count == 2
+    
+    def test_find_page_by_offset_far_chapter(self):
+        """测试之前的内容较多时按估计页码定位，向前翻页逐章换行后改为实际页码"""
+        chapters = [
+            Chapter(i, f"第{i + 1}章", "".join(f"第{i + 1}章第{n}段，" * (1 + n % 5) + "\n" for n in range(60)))
+            for i in range(12)
+        ]
+        doc = Document("文档", chapters=chapters)
+        reference = Paginator(doc, rows=20, cols=50)
+        pages = list(reference.paginate())
+        offset = len(chapters[9].content) // 2
+        expected = pages[reference.find_page_by_offset(9, offset) - 1]
+        
+        paginator = Paginator(doc, rows=20, cols=50)
+        paginator.ANCHOR_GAP_CHARS = 0
+        page_number = paginator.find_page_by_offset(9, offset)
+        assert paginator._line_index.chapter_count == 0
+        assert set(paginator._wrapped_ahead) == {9}
+        assert page_number != expected.page_number
+        
+        page = paginator.get_page(page_number)
+        assert (page.chapter_index, page.start_offset, page.content) == (9, expected.start_offset, expected.content)
+        assert paginator.find_page_position(page_number)[0] == 9
+        assert paginator.get_chapter_start_page(10) - page_number == (
+            reference.get_chapter_start_page(10) - expected.page_number
+        )
+        
+        # 向后翻页只对经过的章节换行
+        for step in range(1, 10):
+            assert paginator.get_page(page_number + step).content == pages[expected.page_number - 1 + step].content
+        assert paginator._line_index.chapter_count == 0
+        
+        # 向前逐页翻到之前的章节全部换行为止，之后页码换成实际页码
+        current = page_number
+        step = 0
+        while paginator._anchor is not None:
+            current -= 1
+            step += 1
+            assert paginator.get_page(current).content == pages[expected.page_number - 1 - step].content
+            current = paginator.sync_page_number(current)
+        
+        assert current == expected.page_number - step
+        assert paginator._line_index.chapter_count == 10
+        assert paginator.sync_page_number(current) == current
+        assert paginator.get_page(expected.page_number).content == expected.content
+    
+    def test_sequential_layout_reuses_chapters_wrapped_ahead(self, monkeypatch):
+        """测试顺序排版复用并释放提前换行的章节"""
+        import os
+        
+        monkeypatch.setattr(os, 'cpu_count', lambda: 4)
+        chapters = [
+            Chapter(i, f"第{i + 1}章", "".join(f"第{i + 1}章第{n}段，" * (1 + n % 5) + "\n" for n in range(40)))
+            for i in range(8)
+        ]
+        doc = Document("文档", chapters=chapters)
+        expected = [page.content for page in Paginator(doc, rows=20, cols=50).paginate()]
+        reference = Paginator(doc, rows=20, cols=50)
+        reference.get_total_pages()
+        
+        for parallel in (False, True):
+            paginator = Paginator(doc, rows=20, cols=50, parallel=parallel)
+            paginator.ANCHOR_GAP_CHARS = 0
+            page_number = paginator.find_page_by_offset(5, 0)
+            paginator.get_page(paginator.get_chapter_start_page(6) + 1)
+            assert set(paginator._wrapped_ahead) == {5, 6}
+            
+            assert [page.content for page in paginator.iter_pages()] == expected
+            assert paginator._wrapped_ahead == {}
+            assert paginator.memory_usage()['line_index'] == reference.memory_usage()['line_index']
+            assert paginator.sync_page_number(page_number) == reference.get_chapter_start_page(5)
+    
+    def test_estimate_total_pages(self):
+        """测试不排版时估算总页数及误差界"""
+        lines = ["很长的一段中文内容" * (n % 17) for n in range(2000)]
+        chapters = [Chapter(i, f"第{i + 1}章", "\n".join(lines)) for i in range(2)]
+        doc = Document("文档", chapters=chapters)
+        
+        paginator = Paginator(doc, rows=24, cols=80)
+        estimate, bound = paginator.estimate_total_pages()
+        assert paginator._line_index.chapter_count == 0
+        
+        total_pages = paginator.get_total_pages()
+        assert 0 < bound < total_pages // 10
+        assert abs(estimate - total_pages) <= bound
+        assert paginator.estimate_total_pages() == (total_pages, 0)
+    
+    def test_parallel_layout_matches(self, monkeypatch):
+        """测试并行换行与顺序换行结果一致"""
+        import os
+        
+        # 单核环境下也走进程池
+        monkeypatch.setattr(os, 'cpu_count', lambda: 4)
+        chapters = [
+            Chapter(i, f"第{i + 1}章", f"第{i + 1}章的内容，" * 40 + "\n" + "english words " * 30 + "\n")
+            for i in range(6)
+        ]
+        doc = Document("文档", chapters=chapters)
+        
+        sequential = Paginator(doc, rows=10, cols=40, parallel=False).paginate()
+        parallel = Paginator(doc, rows=10, cols=40, parallel=True)
+        
+        executors = []
+        create_executor = parallel._create_layout_executor
+        monkeypatch.setattr(
+            parallel, '_create_layout_executor',
+            lambda chapters: executors.append(create_executor(chapters)) or executors[-1]
+        )
+        
+        assert [p.content for p in parallel.paginate()] == [p.content for p in sequential]
+        # 换行在工作进程中完成，本分页器没有换行
+        assert executors and all(executor is not None for executor in executors)
+        assert parallel.get_wrap_cache_stats()['entries'] == 0
+        assert [p.content for p in parallel.iter_pages()] == [p.content for p in sequential]
+        assert parallel.get_chapter_start_page(5) == Paginator(doc, rows=10, cols=40).get_chapter_start_page(5)
+    
+    def test_thread_pool_layout_uses_worker_paginators(self, monkeypatch):
+        """测试无 GIL 时线程池中的换行不共享分页器的缓存"""
+        import os
+        import sys
+        from concurrent.futures import ThreadPoolExecutor
+        
+        monkeypatch.setattr(sys, '_is_gil_enabled', lambda: False, raising=False)
+        monkeypatch.setattr(os, 'cpu_count', lambda: 4)
+        chapters = [
+            Chapter(i, f"第{i + 1}章", "* * *\n" + f"第{i + 1}章的内容，" * 40 + "\n" + "english words " * 30 + "\n")
+            for i in range(8)
+        ]
+        doc = Document("文档", chapters=chapters)
+        
+        sequential = Paginator(doc, rows=10, cols=40, parallel=False).paginate()
+        parallel = Paginator(doc, rows=10, cols=40, parallel=True)
+        executor = parallel._create_layout_executor(chapters)
+        assert isinstance(executor, ThreadPoolExecutor)
+        executor.shutdown()
+        
+        assert [p.content for p in parallel.paginate()] == [p.content for p in sequential]
+        assert parallel.get_wrap_cache_stats()['entries'] == 0
+
+    def test_parallel_layout_off_main_thread_uses_thread_pool(self, monkeypatch):
+        """测试在后台线程中并行换行时使用线程池，任务只携带章节文本"""
+        import os
+        import threading
+        from concurrent.futures import ThreadPoolExecutor
+        from ibook_reader.core import paginator as paginator_module
+        
+        monkeypatch.setattr(os, 'cpu_count', lambda: 4)
+        chapters = [
+            Chapter(i, f"第{i + 1}章", f"第{i + 1}章的内容，" * 40 + "\n" + "english words " * 30 + "\n")
+            for i in range(6)
+        ]
+        doc = Document("文档", chapters=chapters)
+        sequential = [p.content for p in Paginator(doc, rows=10, cols=40, parallel=False).paginate()]
+        
+        batches = []
+        wrap_task = paginator_module._wrap_chapters_task
+        monkeypatch.setattr(
+            paginator_module, '_wrap_chapters_task',
+            lambda batch: batches.append(batch) or wrap_task(batch)
+        )
+        
+        parallel = Paginator(doc, rows=10, cols=40, parallel=True)
+        results = {}
+        
+        def layout():
+            executor = parallel._create_layout_executor(chapters)
+            results['executor'] = type(executor)
+            executor.shutdown()
+            results['pages'] = [p.content for p in parallel.paginate()]
+        
+        thread = threading.Thread(target=layout)
+        thread.start()
+        thread.join()
+        
+        assert results['executor'] is ThreadPoolExecutor
+        assert results['pages'] == sequential
+        assert sorted(item for batch in batches for item in batch) == [
+            (chapter.index, chapter.content) for chapter in chapters
+        ]
+    
+    def test_wrap_cache_reuses_repeated_lines(self):
+        """测试重复的行复用换行结果"""
+        content = "\n".join(["* * *", "这是一段比较长的测试内容，" * 8, "", "* * *", ""] * 10)
+        doc = Document("文档", chapters=[Chapter(0, "章节", content)])
+        
+        # 换行缓存只用于逐字符换行
+        paginator = Paginator(doc, rows=20, cols=40, vectorized=False)
+        pages = [page.content for page in paginator.paginate()]
+        stats = paginator.get_wrap_cache_stats()
+        
+        # 每种行只换行一次，较长的段落不进入缓存
+        assert stats['misses'] == 2
+        assert stats['hits'] == 38
+        assert stats['hit_rate'] == pytest.approx(0.95)
+        
+        uncached = Paginator(doc, rows=20, cols=40, vectorized=False)
+        uncached.WRAP_CACHE_MAX_LINE = -1
+        assert [page.content for page in uncached.paginate()] == pages
+        assert uncached.get_wrap_cache_stats()['hit_rate'] == 0.0
+    
+    def test_get_page_wraps_only_needed_chapters(self):
+        """测试尚未排版时获取页面只对到该页为止的章节换行"""
+        chapters = [
+            Chapter(i, f"第{i + 1}章", "".join(f"第{i + 1}章第{n}行的内容\n" for n in range(100)))
+            for i in range(4)
+        ]
+        doc = Document("文档", chapters=chapters)
+        pages = list(Paginator(doc, rows=24, cols=80).paginate())
+        
+        paginator = Paginator(doc, rows=24, cols=80)
+        chapter_start = paginator.get_chapter_start_page(1)
+        page = paginator.get_page(chapter_start + 2)
+        
+        assert paginator._line_index.chapter_count == 2
+        assert not paginator.is_layout_complete()
+        assert page.content == pages[chapter_start + 1].content
+        assert paginator.find_page_position(chapter_start + 2) == (1, 3)
+        assert paginator.has_page(chapter_start + 2)
+        assert not paginator.has_page(0)
+        
+        # 已换行章节中的页面与完整排版一致
+        for page_number in range(1, chapter_start + 5):
+            assert paginator.get_page(page_number).content == pages[page_number - 1].content
+        assert not paginator.has_page(len(pages) + 1)
+        assert paginator.is_layout_complete()
+    
+    def test_iter_chapter_pages(self):
+        """测试从章节开头或中间逐页换行，不对之前的内容换行"""
+        chapters = [
+            Chapter(i, f"第{i + 1}章", "".join(f"第{i + 1}章第{n}段的内容，" * 6 + "\n" for n in range(50)))
+            for i in range(4)
+        ]
+        doc = Document("文档", chapters=chapters)
+        full = Paginator(doc, rows=24, cols=60)
+        rendered = [(page, lines) for page, lines in full.iter_render_pages() if page.chapter_index == 2]
+        heading = len(full.get_heading_lines(2))
+        
+        # 从章节开头开始时与顺序排版的分页相同，显示行数不含章节标题
+        paginator = Paginator(doc, rows=24, cols=60)
+        assert list(paginator.iter_chapter_pages(2)) == [
+            (page.start_offset, page.end_offset, len(lines) - (heading if i == 0 else 0))
+            for i, (page, lines) in enumerate(rendered)
+        ]
+        assert paginator._line_index is None or paginator._line_index.chapter_count == 0
+        
+        # 从章节中间开始时显示行与顺序排版相同，分页从起始行算起
+        expected = [text for _, lines in rendered for text in lines]
+        start = chapters[2].content.index("第3章第20段")
+        pages = paginator.iter_chapter_pages(2, start)
+        first_start, first_end, first_count = next(pages)
+        lines = paginator._build_page(2, first_start, first_end, 1).content.split('\n')
+        
+        assert first_start == start
+        assert first_count == len(lines) == paginator.available_rows
+        first = expected.index(lines[0])
+        assert expected[first:first + len(lines)] == lines
+        assert sum(count for _, _, count in pages) + first_count == len(expected) - first
+    
+    def test_memory_usage(self):
+        """测试内存统计"""
+        chapters = [Chapter(i, f"第{i + 1}章", "这是一段测试内容。" * 200) for i in range(3)]
+        doc = Document("文档", chapters=chapters)
+        
+        paginator = Paginator(doc, rows=20, cols=60)
+        assert paginator.memory_usage()['total'] == 0
+        
+        paginator.get_total_pages()
+        paginator.get_page(1)
+        usage = paginator.memory_usage()
+        assert usage['page_table'] > 0
+        assert usage['line_index'] > 0
+        assert usage['pages'] > 0
+        assert usage['wrap_caches'] > 0
+        assert usage['total'] == sum(v for k, v in usage.items() if k != 'total')
+    
+    def test_memory_budget_evicts_pages(self):
+        """测试超出内存预算时只保留页表偏移"""
+        chapters = [Chapter(i, f"第{i + 1}章", "这是一段测试内容。" * 200) for i in range(3)]
+        doc = Document("文档", chapters=chapters)
+        
+        unlimited = Paginator(doc, rows=20, cols=60)
+        total = unlimited.get_total_pages()
+        for page_number in range(1, total + 1):
+            unlimited.get_page(page_number)
+        
+        paginator = Paginator(doc, rows=20, cols=60, memory_budget=1)
+        for page_number in range(1, total + 1):
+            page = paginator.get_page(page_number)
+            assert page.content == unlimited.get_page(page_number).content
+        
+        usage = paginator.memory_usage()
+        assert len(paginator._page_cache) == 1
+        assert usage['pages'] < unlimited.memory_usage()['pages']
+        assert usage['page_table'] == unlimited.memory_usage()['page_table']
+        assert paginator.get_total_pages() == total
+
+    
+    def test_memory_budget_keeps_current_chapter_caches(self, monkeypatch):
+        """测试内存预算小于一章的断行标记时，翻页不重新计算当前章节的断行标记"""
+        import ibook_reader.core.paginator as paginator_module
+        
+        chapters = [Chapter(i, f"第{i + 1}章", "这是一段测试内容，English words. " * 400 + "\n") for i in range(3)]
+        doc = Document("文档", chapters=chapters)
+        expected = [page.content for page in Paginator(doc, rows=20, cols=60).paginate()]
+        
+        paginator = Paginator(doc, rows=20, cols=60, memory_budget=1)
+        computed = []
+        original = paginator_module.get_break_flags
+        monkeypatch.setattr(
+            paginator_module, 'get_break_flags',
+            lambda text: computed.append(len(text)) or original(text)
+        )
+        
+        for page_number in range(1, len(expected) + 1):
+            assert paginator.get_page(page_number).content == expected[page_number - 1]
+            assert paginator._active_chapter in paginator._break_flags
+        
+        # 每章的断行标记只计算一次，超出预算时不预取页面
+        assert computed.count(len(chapters[0].content)) == len(chapters)
+        assert len(paginator._page_cache) == 1
+
+class TestBackgroundLayout:
+    """后台排版测试类"""
+    
+    def test_background_layout_respects_memory_budget(self):
+        """测试设置内存预算时后台排版不保留全部章节的断行标记和宽度索引"""
+        from ibook_reader.core.background_layout import BackgroundLayout
+        
+        chapters = [Chapter(i, f"第{i + 1}章", "这是一段测试内容，English words. " * 200 + "\n") for i in range(20)]
+        doc = Document("文档", chapters=chapters)
+        
+        unlimited = BackgroundLayout(Paginator(doc, rows=24, cols=80))
+        unlimited.run()
+        assert len(unlimited.paginator._break_flags) == len(chapters)
+        
+        paginator = Paginator(doc, rows=24, cols=80, memory_budget=len(chapters[0].content) * 8)
+        layout = BackgroundLayout(paginator)
+        layout.run()
+        assert list(layout) == list(unlimited)
+        assert len(paginator._break_flags) < len(chapters) // 2
+    
+    def test_background_layout_lines(self):
+        """测试后台排版生成的行与页起始行号"""
+        from ibook_reader.core.background_layout import BackgroundLayout
+        
+        chapters = [
+            Chapter(0, "第一章", "第一章的内容\n" * 30),
+            Chapter(1, "第二章", "第二章的内容\n" * 30),
+        ]
+        doc = Document("文档", chapters=chapters)
+        paginator = Paginator(doc, rows=24, cols=80)
+        pages = list(Paginator(doc, rows=24, cols=80).paginate())
+        
+        layout = BackgroundLayout(paginator)
+        layout.start()
+        assert layout.wait_for_page(2)
+        layout.wait()
+        
+        assert layout.complete
+        assert layout.total_pages == len(pages)
+        assert not layout.wait_for_page(len(pages) + 1)
+        assert layout.estimated_total_lines() == len(layout)
+        
+        # 章节标题出现在每章第一页之前
+        assert layout[0] == "第一章"
+        positions = layout.positions
+        start_line = positions.page_start_line(3)
+        assert layout[start_line:start_line + 3] == ["", "第二章", ""]
+        assert list(positions.chapter_indices) == [page.chapter_index for page in pages]
+        
+        # 行号、页码、章内偏移互查
+        assert positions.page_at_line(start_line + 5) == 3
+        assert positions.position_at_line(start_line + 5) == (1, 0)
+        assert positions.page_at_offset(1, pages[3].start_offset + 1) == 4
+        assert positions.line_at_offset(0, 0) == 0
+        assert layout.wait_for_offset(1, pages[3].start_offset) == 4
+
+    def test_background_layout_from_cached_table(self):
+        """测试缓存命中时直接由页表得到行号，不再重新换行"""
+        from ibook_reader.core.background_layout import BackgroundLayout
+        from ibook_reader.core.page_table import PageTable
+
+        chapters = [
+            Chapter(0, "第一章", "第一章的内容\n" * 30),
+            Chapter(1, "第二章", "很长的一行" * 40 + "\n" + "内容\n" * 50),
+            Chapter(2, "第三章", ""),
+        ]
+        doc = Document("文档", chapters=chapters)
+        reference = BackgroundLayout(Paginator(doc, rows=24, cols=80))
+        reference.run()
+
+        source = Paginator(doc, rows=24, cols=80)
+        table = PageTable.from_bytes(source.get_page_table().to_bytes())
+        assert table.has_line_counts()
+        rows = source.available_rows
+        for index, (page, lines) in enumerate(source.iter_render_pages()):
+            heading = source.get_heading_lines(page.chapter_index, first=index == 0) if page.start_offset == 0 else []
+            assert table.page_line_count(index, rows) == len(lines) - len(heading)
+
+        paginator = Paginator(doc, rows=24, cols=80)
+        paginator.set_page_table(table)
+
+        def fail(chapter):
+            raise AssertionError("缓存命中时不应重新换行")
+
+        paginator._iter_chapter_lines = fail
+        layout = BackgroundLayout(paginator)
+        layout.run()
+
+        assert layout.complete
+        assert list(layout.positions.start_lines) == list(reference.positions.start_lines)
+        assert len(layout) == len(reference)
+
+    def test_position_at_line_round_trip(self):
+        """测试显示行与章内字符偏移互查"""
+        from ibook_reader.core.background_layout import BackgroundLayout
+        
+        chapters = [
+            Chapter(0, "第一章", "这是第一章的一段比较长的内容，" * 20 + "\n\n短行\n" * 20),
+            Chapter(1, "第二章", "english words and more words " * 30 + "\n" + "第二章的内容\n" * 20),
+        ]
+        doc = Document("文档", chapters=chapters)
+        layout = BackgroundLayout(Paginator(doc, rows=24, cols=60))
+        layout.run()
+        
+        for line in range(len(layout)):
+            position = layout.position_at_line(line)
+            chapter_index, offset = position
+            text = layout[line]
+            if text and text != doc.chapters[chapter_index].title:
+                assert doc.chapters[chapter_index].content.startswith(text, offset)
+                assert layout.line_at_position(chapter_index, offset) == line
+    
+    def test_resize_keeps_position(self):
+        """测试列宽变化后重新排版并停留在同一段文字上"""
+        from ibook_reader.core.background_layout import BackgroundLayout
+        
+        chapters = [
+            Chapter(i, f"第{i + 1}章", "".join(f"第{i + 1}章第{j}段的内容，" * 8 + "\n" for j in range(40)))
+            for i in range(3)
+        ]
+        doc = Document("文档", chapters=chapters)
+        layout = BackgroundLayout(Paginator(doc, rows=24, cols=60))
+        layout.start()
+        layout.wait()
+        
+        line = next(i for i, text in enumerate(layout) if text.startswith("第2章第20段"))
+        new_line = layout.resize(30, 100, line)
+        
+        assert layout.paginator.available_cols == 94
+        assert layout[new_line].startswith("第2章第20段")
+        layout.wait()
+        assert list(layout) == [
+            text for _, lines in Paginator(doc, rows=30, cols=100).iter_render_pages() for text in lines
+        ]
+        
+        # 只改变行数时显示行不变
+        assert layout.resize(40, 100, new_line) == new_line
+    
+    def test_start_at_lays_out_anchor_chapter_first(self):
+        """测试从书的中间开始时先排版所在的章节，顺序排版追上后合并"""
+        from ibook_reader.core.background_layout import BackgroundLayout
+        
+        chapters = [
+            Chapter(i, f"第{i + 1}章", "".join(f"第{i + 1}章第{j}段的内容，" * 8 + "\n" for j in range(40)))
+            for i in range(5)
+        ]
+        doc = Document("文档", chapters=chapters)
+        expected = [text for _, lines in Paginator(doc, rows=24, cols=60).iter_render_pages() for text in lines]
+        offset = chapters[3].content.index("第4章第20段")
+        
+        layout = BackgroundLayout(Paginator(doc, rows=24, cols=60))
+        layout.start = lambda: None
+        line = layout.start_at(3, offset)
+        
+        # 之前的章节尚未换行，所在位置已可显示
+        assert layout.paginator._line_index.chapter_count == 0
+        assert layout[line].startswith("第4章第20段")
+        assert layout.position_at_line(line) == (3, offset)
+        assert layout.page_at_line(line) > 1
+        assert not layout.complete
+        
+        # 顺序排版追上之前不合并，追上后换成实际行号
+        assert layout.sync(line) == line
+        layout.run()
+        assert not layout.complete
+        new_line = layout.sync(line)
+        assert layout.complete
+        assert list(layout) == expected
+        assert layout[new_line].startswith("第4章第20段")
+        assert layout.page_at_line(new_line) == layout.positions.page_at_offset(3, offset)
+
+    def test_ahead_segment_extends_near_end(self):
+        """测试阅读位置接近片段末尾时片段继续向后排版"""
+        from ibook_reader.core.background_layout import BackgroundLayout
+
+        chapters = [
+            Chapter(i, f"第{i + 1}章", "".join(f"第{i + 1}章第{j}段的内容，" * 8 + "\n" for j in range(40)))
+            for i in range(5)
+        ]
+        doc = Document("文档", chapters=chapters)
+        expected = [text for _, lines in Paginator(doc, rows=24, cols=60).iter_render_pages() for text in lines]
+
+        layout = BackgroundLayout(Paginator(doc, rows=24, cols=60))
+        layout.start = lambda: None
+        line = layout.start_at(1, chapters[1].content.index("第2章第20段"))
+
+        # 离片段末尾较远时不继续排版
+        length = len(layout)
+        assert layout.sync(line) == line
+        assert len(layout) == length
+
+        # 读到片段末尾附近时继续排版，直到书的末尾
+        length_before = length
+        while layout._ahead_pages is not None:
+            length = len(layout)
+            assert layout.sync(length - 1) == length - 1
+            assert len(layout) > length or layout._ahead_pages is None
+        assert len(layout) > length_before
+        assert layout[layout._ahead_line:] == expected[len(expected) - layout._ahead_line_count:]
+
+        layout.run()
+        layout.sync(len(layout) - 1)
+        assert layout.complete
+        assert list(layout) == expected
+
+    def test_merge_ahead_segment_ending_in_blank_lines(self):
+        """测试在以空行结尾的章节末尾附近恢复时，顺序排版完成后片段仍能合并"""
+        from ibook_reader.core.background_layout import BackgroundLayout
+
+        for blank_lines in range(1, 13):
+            content = "\n\n".join(["这是一段内容，" * 7] * 200) + "\n" * blank_lines
+            doc = Document("文档", chapters=[Chapter(0, "第一章", content)])
+            expected = [text for _, lines in Paginator(doc, rows=24, cols=60).iter_render_pages() for text in lines]
+
+            layout = BackgroundLayout(Paginator(doc, rows=24, cols=60))
+            layout.AHEAD_CHARS = 500
+            layout.start = lambda: None
+            line = layout.start_at(0, len(content) - 300)
+
+            layout.run()
+            new_line = layout.sync(line)
+            assert layout.complete
+            assert list(layout) == expected
+            assert layout.position_at_line(new_line)[0] == 0
+
+    def test_start_at_middle_of_long_chapter(self):
+        """测试阅读位置在长章节中靠后时，片段从阅读位置之前的原始行开始"""
+        from ibook_reader.core.background_layout import BackgroundLayout
+        
+        content = "".join(f"第{j}段的内容，" * 8 + "\n" for j in range(300))
+        doc = Document("文档", chapters=[Chapter(0, "第一章", content)])
+        expected = [text for _, lines in Paginator(doc, rows=24, cols=60).iter_render_pages() for text in lines]
+        offset = content.index("第200段")
+        
+        layout = BackgroundLayout(Paginator(doc, rows=24, cols=60))
+        layout.AHEAD_CHARS = 1000
+        layout.start = lambda: None
+        line = layout.start_at(0, offset)
+        
+        start_line = layout._ahead_line
+        segment_start = layout._ahead.get(0)[1]
+        assert 0 < segment_start < offset - 1000
+        assert layout[start_line].startswith(content[segment_start:segment_start + 4])
+        assert layout[line].startswith("第200段")
+        assert layout.line_at_position(0, offset) == line
+        
+        # 片段之前尚未排版的部分对应片段的起始位置，读取时片段向前扩展，已有行的行号不变
+        assert layout.position_at_line(start_line - 1) == (0, segment_start)
+        previous = layout[start_line - 1]
+        assert previous and content[:segment_start - 1].endswith(previous)
+        assert layout._ahead.get(0)[1] < segment_start
+        assert layout[line].startswith("第200段")
+        
+        # 一直扩展到书的开头时片段的行号整体平移，由 sync() 换算
+        assert layout[0] == "第一章"
+        line = layout.sync(line)
+        assert layout[line].startswith("第200段")
+        assert layout[:line] == expected[:line]
+        
+        layout.run()
+        new_line = layout.sync(line)
+        assert list(layout) == expected
+        assert layout[new_line].startswith("第200段")
+    
+    def test_paginator_not_shared_between_threads(self, monkeypatch):
+        """测试后台排版与读取显示行不会同时使用分页器"""
+        import threading
+        import time
+        from ibook_reader.core.background_layout import BackgroundLayout
+
+        chapters = [
+            Chapter(i, f"第{i + 1}章", "".join(f"第{i + 1}章第{j}段的内容，" * 8 + "\n" for j in range(60)))
+            for i in range(6)
+        ]
+        doc = Document("文档", chapters=chapters)
+        paginator = Paginator(doc, rows=24, cols=60)
+
+        active = []
+        overlaps = []
+        original = paginator._wrap_offsets
+
+        def wrap_offsets(*args, **kwargs):
+            active.append(threading.get_ident())
+            if len(set(active)) > 1:
+                overlaps.append(True)
+            # 让出 GIL，给另一个线程插入的机会
+            time.sleep(0.0001)
+            try:
+                return original(*args, **kwargs)
+            finally:
+                active.remove(threading.get_ident())
+
+        monkeypatch.setattr(paginator, '_wrap_offsets', wrap_offsets)
+        layout = BackgroundLayout(paginator)
+        layout.start()
+        while not layout.complete:
+            # 读取最早的几页，已淘汰的页面由分页器重新生成
+            for line in range(0, min(len(layout), 200), 20):
+                layout._page_lines.clear()
+                layout[line]
+        layout.wait()
+
+        assert not overlaps
+
+    def test_lines_generated_on_demand(self):
+        """测试显示行按需从页表生成，只缓存最近使用的几页"""
+        from ibook_reader.core.background_layout import BackgroundLayout
+        
+        chapters = [
+            Chapter(i, f"第{i + 1}章", "".join(f"第{i + 1}章第{j}段的内容，" * 8 + "\n" for j in range(60)))
+            for i in range(3)
+        ]
+        doc = Document("文档", chapters=chapters)
+        expected = [text for _, lines in Paginator(doc, rows=24, cols=60).iter_render_pages() for text in lines]
+        
+        layout = BackgroundLayout(Paginator(doc, rows=24, cols=60))
+        layout.run()
+        
+        assert layout.total_pages > layout.PAGE_CACHE_SIZE
+        assert len(layout._page_lines) <= layout.PAGE_CACHE_SIZE
+        assert len(layout) == len(expected)
+        
+        # 倒序读取，已淘汰的页面重新生成
+        assert [layout[i] for i in range(len(layout) - 1, -1, -1)] == expected[::-1]
+        assert layout[-1] == expected[-1]
+        assert layout[10:20] == expected[10:20]
+        assert len(layout._page_lines) <= layout.PAGE_CACHE_SIZE
+        with pytest.raises(IndexError):
+            layout[len(layout)]
+    
+    def test_estimated_total_lines(self):
+        """测试排版未完成时估算总行数"""
+        from ibook_reader.core.background_layout import BackgroundLayout
+        
+        chapters = [Chapter(0, "章节", "一行内容\n" * 100)]
+        doc = Document("文档", chapters=chapters)
+        paginator = Paginator(doc, rows=24, cols=80)
+        
+        layout = BackgroundLayout(paginator)
+        layout._append_page(*next(paginator.iter_render_pages()))
+        
+        assert not layout.complete
+        estimate = layout.estimated_total_lines()
+        assert 100 <= estimate <= 120
+
+
+class TestLayoutManager:
+    """多尺寸排版管理测试类"""
+    
+    @pytest.fixture
+    def document(self):
+        """创建测试文档"""
+        chapters = [
+            Chapter(0, "第一章", "第一章的内容\n" * 100),
+            Chapter(1, "第二章", "第二章的内容\n" * 100),
+        ]
+        return Document("文档", chapters=chapters)
+    
+    def test_reuse_page_table_per_geometry(self, document):
+        """测试同一尺寸只排版一次"""
+        from ibook_reader.core.layout_manager import LayoutManager
+        
+        manager = LayoutManager()
+        first = manager.get_paginator(document, rows=24, cols=80)
+        second = manager.get_paginator(document, rows=24, cols=80)
+        other = manager.get_paginator(document, rows=40, cols=120)
+        
+        assert second._line_index is None  # 命中时没有换行
+        assert [p.content for p in second.paginate()] == [p.content for p in first.paginate()]
+        assert other.get_total_pages() == Paginator(document, rows=40, cols=120).get_total_pages()
+        assert manager.get_stats()['hits'] == 1
+        assert manager.get_stats()['misses'] == 2
+        assert manager.get_stats()['entries'] == 2
+    
+    def test_evict_by_byte_budget(self, document):
+        """测试超过字节预算时淘汰最久未使用的页表"""
+        from ibook_reader.core.layout_manager import LayoutManager
+        
+        manager = LayoutManager()
+        manager.get_paginator(document, rows=24, cols=80)
+        manager.max_bytes = manager.total_bytes * 2
+        
+        manager.get_paginator(document, rows=30, cols=80)
+        manager.get_paginator(document, rows=24, cols=80)
+        manager.get_paginator(document, rows=40, cols=80)
+        
+        # 24 行最近使用过，30 行被淘汰
+        assert manager.get_stats()['entries'] == 2
+        manager.get_paginator(document, rows=24, cols=80)
+        assert manager.get_stats()['hits'] == 2
+        manager.get_paginator(document, rows=30, cols=80)
+        assert manager.get_stats()['misses'] == 4
+    
+    def test_release_collected_documents(self):
+        """测试只保存文档的弱引用，文档被回收后其页表随之淘汰"""
+        import gc
+        from ibook_reader.core.layout_manager import LayoutManager
+        
+        manager = LayoutManager()
+        document = Document("文档", chapters=[Chapter(0, "第一章", "内容\n" * 100)])
+        manager.get_paginator(document, rows=24, cols=80)
+        assert manager.get_stats()['entries'] == 1
+        
+        del document
+        gc.collect()
+        
+        stats = manager.get_stats()
+        assert stats['entries'] == 0
+        assert stats['bytes'] == 0
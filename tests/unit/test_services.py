@@ -385,6 +385,25 @@ class TestReaderService:
         assert service.paginator is not None
         assert service.total_pages > 0
     
+    def test_load_document_uses_vectorized_layout(self, temp_txt_file):
+        """测试 NumPy 可用时默认使用累计宽度排版，结果与逐字符排版一致"""
+        pytest.importorskip("numpy")
+        from ibook_reader.core.paginator import Paginator
+        
+        service = ReaderService()
+        service.load_document(temp_txt_file, rows=24, cols=80)
+        assert service.paginator.vectorized
+        
+        pages = []
+        while True:
+            pages.append(service.get_current_page().content)
+            if not service.next_page():
+                break
+        assert service.paginator._width_indexes
+        
+        expected = Paginator(service.document, rows=24, cols=80, vectorized=False)
+        assert pages == [page.content for page in expected.paginate()]
+    
     def test_get_current_page(self, temp_txt_file):
         """测试获取当前页面"""
         service = ReaderService()
@@ -457,3 +476,238 @@ class TestReaderService:
         
         assert result is True
         assert service.current_page == service.total_pages
+
+    
+    def test_progress_total_pages_refreshed(self, temp_config, temp_txt_file):
+        """测试保存的总页数偏小时，更新进度会刷新总页数而不截断页码"""
+        progress_service = ProgressService(config=temp_config)
+        service = ReaderService(progress_service=progress_service)
+        service.load_document(temp_txt_file, rows=24, cols=80)
+        
+        progress = progress_service.create_progress(temp_txt_file, service.document, 1, 0, 2)
+        progress_service.save_progress(progress)
+        
+        assert service.jump_to_page(3)
+        saved = progress_service.load_progress(temp_txt_file)
+        assert saved.current_page == 3
+        assert saved.total_pages == service.total_pages > 3
+        assert saved.read_percentage < 100
+    
+    def test_update_terminal_size_keeps_anchor(self):
+        """测试调整尺寸后停留在包含同一字符的页面"""
+        from ibook_reader.core.paginator import Paginator
+        
+        chapters = [
+            Chapter(i, f"第{i + 1}章", "".join(f"第{i + 1}章第{n}行的内容\n" for n in range(200)))
+            for i in range(3)
+        ]
+        document = Document("文档", chapters=chapters)
+        
+        service = ReaderService()
+        service.document = document
+        service.paginator = Paginator(document, rows=24, cols=80)
+        service.current_page = service.paginator.get_chapter_start_page(1) + 3
+        page = service.get_current_page()
+        
+        for rows, cols in [(40, 80), (16, 60), (24, 80)]:
+            service.update_terminal_size(rows, cols)
+            resized = service.get_current_page()
+            assert resized.chapter_index == page.chapter_index
+            assert resized.start_offset <= page.start_offset < resized.end_offset
+        
+        # 回到原尺寸时回到原来的页面
+        assert service.current_page == page.page_number
+    
+    def test_resize_does_not_lay_out_remaining_chapters(self):
+        """测试调整尺寸后翻页不排版后面的章节"""
+        from ibook_reader.core.paginator import Paginator
+        
+        chapters = [
+            Chapter(i, f"第{i + 1}章", "".join(f"第{i + 1}章第{n}行的内容\n" for n in range(200)))
+            for i in range(4)
+        ]
+        document = Document("文档", chapters=chapters)
+        
+        service = ReaderService()
+        service.document = document
+        service.paginator = Paginator(document, rows=24, cols=80)
+        service.current_page = service.paginator.get_chapter_start_page(1) + 3
+        service.update_terminal_size(30, 100)
+        
+        assert service.get_current_page().chapter_index == 1
+        assert service.next_page()
+        assert service.jump_to_page(service.current_page - 2)
+        assert service.total_pages >= service.current_page
+        assert service.paginator._line_index.chapter_count == 2
+        
+        assert service.jump_to_end()
+        assert service.current_page == service.paginator.get_total_pages()
+        assert not service.next_page()
+    
+    def test_resize_far_into_book_keeps_page_numbers_consistent(self):
+        """测试调整尺寸后不补齐之前的章节，之后改为实际页码时当前页随之换算"""
+        from ibook_reader.core.paginator import Paginator
+        
+        chapters = [
+            Chapter(i, f"第{i + 1}章", "".join(f"第{i + 1}章第{n}段，" * (1 + n % 5) + "\n" for n in range(60)))
+            for i in range(12)
+        ]
+        document = Document("文档", chapters=chapters)
+        
+        service = ReaderService()
+        service.document = document
+        service.paginator = Paginator(document, rows=24, cols=80)
+        service.paginator.ANCHOR_GAP_CHARS = 0
+        service.current_page = service.paginator.get_chapter_start_page(9) + 2
+        page = service.get_current_page()
+        
+        service.update_terminal_size(24, 60)
+        assert service.paginator._line_index.chapter_count == 0
+        resized = service.get_current_page()
+        assert resized.chapter_index == 9
+        assert resized.start_offset <= page.start_offset < resized.end_offset
+        
+        # 完整排版后当前页码换成实际页码，仍是同一页
+        estimated_page = service.current_page
+        assert service.jump_to_page(estimated_page)
+        total_pages = service.paginator.get_total_pages()
+        assert service.get_current_page().start_offset == resized.start_offset
+        assert service.current_page == Paginator(document, rows=24, cols=60).find_page_by_offset(9, page.start_offset)
+        assert service.current_page != estimated_page
+        assert service.total_pages == total_pages
+    
+    def test_update_terminal_size_shares_layout(self):
+        """测试有排版管理时调整尺寸使用共享的页表缓存"""
+        from ibook_reader.core.layout_manager import LayoutManager
+        
+        chapters = [
+            Chapter(i, f"第{i + 1}章", "".join(f"第{i + 1}章第{n}行的内容\n" for n in range(200)))
+            for i in range(3)
+        ]
+        document = Document("文档", chapters=chapters)
+        manager = LayoutManager()
+        
+        first = ReaderService(layout_manager=manager)
+        first.document = document
+        first.paginator = manager.get_paginator(document, rows=24, cols=80)
+        first.current_page = first.paginator.get_chapter_start_page(1) + 3
+        page = first.get_current_page()
+        first.update_terminal_size(40, 100)
+        
+        # 另一个会话调整到同一尺寸时不再排版
+        second = ReaderService(layout_manager=manager)
+        second.document = document
+        second.paginator = manager.get_paginator(document, rows=24, cols=80)
+        second.update_terminal_size(40, 100)
+        
+        assert manager.get_stats()['misses'] == 2
+        assert manager.get_stats()['hits'] == 2
+        resized = first.get_current_page()
+        assert resized.chapter_index == page.chapter_index
+        assert resized.start_offset <= page.start_offset < resized.end_offset
+
+
+class TestLayoutCacheService:
+    """排版缓存服务测试类"""
+    
+    @pytest.fixture
+    def temp_config(self):
+        """创建临时配置目录"""
+        temp_dir = Path(tempfile.mkdtemp())
+        config = Config()
+        config.config_dir = temp_dir
+        config.layout_cache_dir = temp_dir / 'layout_cache'
+        
+        yield config
+        
+        # 清理
+        if temp_dir.exists():
+            shutil.rmtree(temp_dir)
+    
+    @pytest.fixture
+    def temp_file(self):
+        """创建临时文档文件"""
+        temp_dir = Path(tempfile.mkdtemp())
+        file_path = temp_dir / "test.txt"
+        file_path.write_text("测试内容")
+        
+        yield file_path
+        
+        # 清理
+        if temp_dir.exists():
+            shutil.rmtree(temp_dir)
+    
+    @pytest.fixture
+    def document(self):
+        """创建测试文档"""
+        chapters = [
+            Chapter(0, "第一章", "第一章的内容\n" * 50),
+            Chapter(1, "第二章", "第二章的内容\n" * 50),
+        ]
+        return Document("测试文档", chapters=chapters)
+    
+    def test_save_and_load(self, temp_config, temp_file, document):
+        """测试保存后按相同尺寸命中缓存"""
+        from ibook_reader.core.paginator import Paginator
+        from ibook_reader.services.layout_cache_service import LayoutCacheService
+        
+        service = LayoutCacheService(config=temp_config)
+        paginator = Paginator(document, rows=24, cols=80)
+        assert not service.load(temp_file, paginator)
+        service.save(temp_file, paginator)
+        
+        cached = Paginator(document, rows=24, cols=80)
+        cached._wrap_chapter = None  # 命中缓存时不应换行
+        assert service.load(temp_file, cached)
+        assert [p.content for p in cached.paginate()] == [p.content for p in paginator.paginate()]
+        assert cached.get_chapter_start_page(1) == paginator.get_chapter_start_page(1)
+    
+    def test_invalidated_by_size_and_content(self, temp_config, temp_file, document):
+        """测试尺寸或文件变化后不命中缓存"""
+        from ibook_reader.core.paginator import Paginator
+        from ibook_reader.services.layout_cache_service import LayoutCacheService
+        
+        service = LayoutCacheService(config=temp_config)
+        service.save(temp_file, Paginator(document, rows=24, cols=80))
+        
+        assert not service.load(temp_file, Paginator(document, rows=30, cols=80))
+        assert not service.load(temp_file, Paginator(document, rows=24, cols=100))
+        
+        temp_file.write_text("修改后的内容")
+        assert not service.load(temp_file, Paginator(document, rows=24, cols=80))
+    
+    def test_save_existing_entry_ignores_utime_error(self, temp_config, temp_file, document, monkeypatch):
+        """测试已有缓存项时无法更新访问时间（如只读目录）不影响保存"""
+        import os
+        from ibook_reader.core.paginator import Paginator
+        from ibook_reader.services.layout_cache_service import LayoutCacheService
+        
+        service = LayoutCacheService(config=temp_config)
+        service.save(temp_file, Paginator(document, rows=24, cols=80))
+        
+        def deny(*args, **kwargs):
+            raise PermissionError("只读")
+        
+        monkeypatch.setattr(os, 'utime', deny)
+        service.save(temp_file, Paginator(document, rows=24, cols=80))
+    
+    def test_evict_least_recently_used(self, temp_config, temp_file, document):
+        """测试超过大小上限时淘汰最久未使用的缓存项"""
+        import os
+        from ibook_reader.core.paginator import Paginator
+        from ibook_reader.services.layout_cache_service import LayoutCacheService
+        
+        service = LayoutCacheService(config=temp_config)
+        service.save(temp_file, Paginator(document, rows=24, cols=80))
+        entry_size = sum(f.stat().st_size for f in temp_config.layout_cache_dir.glob('*.bin'))
+        
+        service.max_bytes = entry_size * 2
+        for i, rows in enumerate((30, 40)):
+            for cache_file in temp_config.layout_cache_dir.glob('*.bin'):
+                os.utime(cache_file, (i, i))
+            service.load(temp_file, Paginator(document, rows=24, cols=80))
+            service.save(temp_file, Paginator(document, rows=rows, cols=80))
+        
+        assert len(list(temp_config.layout_cache_dir.glob('*.bin'))) == 2
+        assert service.load(temp_file, Paginator(document, rows=24, cols=80))
+        assert not service.load(temp_file, Paginator(document, rows=30, cols=80))
@@ -7,7 +7,9 @@ from ibook_reader.utils.text_utils import (
     truncate_text,
     normalize_text,
     wrap_text,
-    extract_preview
+    extract_preview,
+    is_narrow_text,
+    get_break_flags
 )
 
 
@@ -27,6 +29,19 @@ class TestTextUtils:
         assert get_char_width('文') == 2
         assert get_char_width('测') == 2
     
+    def test_get_char_width_zero_width(self):
+        """测试组合符号和零宽字符"""
+        assert get_char_width('\u0301') == 0  # 组合重音符
+        assert get_char_width('\u200d') == 0  # 零宽连接符
+        assert get_char_width('\u200b') == 0  # 零宽空格
+        assert get_display_width("e\u0301") == 1
+    
+    def test_get_char_width_astral(self):
+        """测试辅助平面字符宽度"""
+        assert get_char_width('\U0001F600') == 2  # emoji
+        assert get_char_width('\U00020000') == 2  # CJK扩展B
+        assert get_display_width("a\U0001F600中") == 5
+    
     def test_get_char_width_empty(self):
         """测试空字符"""
         assert get_char_width('') == 0
@@ -131,6 +146,32 @@ class TestTextUtils:
         # "Hello中" = 7, "文World" 超过8，需要拆分
         assert all(get_display_width(line) <= 8 for line in result)
     
+    def test_is_narrow_text(self):
+        """测试单宽文本判断"""
+        assert is_narrow_text("Hello World")
+        assert is_narrow_text("Dvořk ăš")
+        assert not is_narrow_text("Hello中文")
+        assert not is_narrow_text("e\u0301")
+        assert not is_narrow_text("\U0001F600")
+    
+    def test_wrap_text_narrow_fast_path(self):
+        """测试单宽文本按固定步长换行"""
+        result = wrap_text("abcdefghij\n\nšăÿ", max_width=4)
+        assert result == ["abcd", "efgh", "ij", "", "šăÿ"]
+    
+    def test_get_break_flags(self):
+        """测试断行位置标记"""
+        def split(text):
+            flags = get_break_flags(text)
+            assert len(flags) == len(text)
+            starts = [i for i in range(len(text)) if flags[i]] + [len(text)]
+            return [text[a:b] for a, b in zip([0] + starts, starts) if a < b]
+        
+        assert split("hello world foo-bar") == ["hello ", "world ", "foo-", "bar"]
+        # 句末标点不出现在行首，开引号不出现在行尾
+        assert split("天地，“你好”。") == ["天", "地，", "“你", "好”。"]
+        assert get_break_flags("") == b""
+    
     def test_extract_preview_short(self):
         """测试提取短预览"""
         text = "这是一个简短的文本"